@@ -14,14 +14,17 @@ import {
     useTheme,
     Tooltip,
     Stack,
+    Badge,
 } from '@mui/material';
 import {
     Menu as MenuIcon,
     Logout as LogoutIcon,
     AccountCircle as AccountCircleIcon,
     Settings as SettingsIcon,
+    Notifications as NotificationsIcon,
 } from '@mui/icons-material';
 import { useAuth } from './contexts/AuthContext';
+import { useApp } from './contexts/AppContext';
 
 interface AppHeaderProps {
     onMenuClick: () => void;
@@ -30,6 +33,7 @@ interface AppHeaderProps {
 
 const AppHeader: React.FC<AppHeaderProps> = ({ onMenuClick, appName = 'SincIt' }) => {
     const { user, logout } = useAuth();
+    const { unreadCount } = useApp();
     const [anchorEl, setAnchorEl] = useState<null | HTMLElement>(null);
     const theme = useTheme();
 
@@ -76,7 +80,14 @@ const AppHeader: React.FC<AppHeaderProps> = ({ onMenuClick, appName = 'SincIt' }
                     </Box>
                 </Stack>
                 {user && (
-                    <Box>
+                    <Box display="flex" alignItems="center" gap={2}>
+                        <Tooltip title="Notifications">
+                            <IconButton aria-label={`${unreadCount} unread notifications`}>
+                                <Badge badgeContent={unreadCount} color="error" max={99}>
+                                    <NotificationsIcon sx={{ color: '#fff' }} />
+                                </Badge>
+                            </IconButton>
+                        </Tooltip>
                         <Tooltip title="Open user menu">
                             <IconButton
                                 edge="end"
@@ -68,7 +68,7 @@ const GroupDetails: React.FC = () => {
             </Tabs>
             <TabPanel value={tabValue} index={0}>
                 <List>
-                    {group.members.map((member: User) => (
+                    {(group.members ?? []).map((member: User) => (
                         <ListItem key={member.id}>
                             <ListItemAvatar>
                                 <Avatar>
@@ -89,7 +89,7 @@ const GroupList: React.FC = () => {
                         </ListItemAvatar>
                         <ListItemText
                             primary={group.name}
-                            secondary={`${group.members.length} members`}
+                            secondary={`${group.member_count} members`}
                         />
                     </ListItem>
                 ))}
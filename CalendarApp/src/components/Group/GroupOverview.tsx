@@ -135,7 +135,7 @@ const GroupOverview: React.FC = () => {
                                         secondary={
                                             <Chip
                                                 size="small"
-                                                label={`${group.members.length} members`}
+                                                label={`${group.member_count} members`}
                                                 sx={{ fontSize: '0.7rem' }}
                                             />
                                         }
@@ -1,6 +1,8 @@
-import React, { createContext, useState, useContext, ReactNode } from 'react';
+import React, { createContext, useState, useContext, useEffect, ReactNode } from 'react';
 import { Theme } from '../types/types';
 import { Notifications } from '../types/event';
+import { useAuth } from './AuthContext';
+import { notificationApi } from '../services/api/notificationApi';
 
 interface AppContextType {
     theme: Theme;
@@ -9,6 +11,7 @@ interface AppContextType {
     addNotification: (notification: Notifications) => void;
     removeNotification: (id: number) => void;
     clearNotifications: () => void;
+    unreadCount: number;
 }
 
 const AppContext = createContext<AppContextType | undefined>(undefined);
@@ -16,6 +19,22 @@ const AppContext = createContext<AppContextType | undefined>(undefined);
 export const AppProvider: React.FC<{ children: ReactNode }> = ({ children }) => {
     const [theme, setTheme] = useState<Theme>('light');
     const [notifications, setNotifications] = useState<Notifications[]>([]);
+    const [unreadCount, setUnreadCount] = useState<number>(0);
+    const { isAuthenticated } = useAuth();
+
+    useEffect(() => {
+        if (!isAuthenticated) {
+            return;
+        }
+        return notificationApi.connectNotificationStream({
+            // A digest update reuses the id of a notification already shown and replaces it.
+            onNotifications: (incoming) => {
+                const ids = new Set(incoming.map(notif => notif.id));
+                setNotifications(prev => [...incoming, ...prev.filter(notif => !ids.has(notif.id))]);
+            },
+            onUnreadCount: setUnreadCount,
+        });
+    }, [isAuthenticated]);
 
     const addNotification = (notification: Notifications) => {
         setNotifications(prev => [...prev, notification]);
@@ -36,6 +55,7 @@ export const AppProvider: React.FC<{ children: ReactNode }> = ({ children }) =>
         addNotification,
         removeNotification,
         clearNotifications,
+        unreadCount,
     };
 
     return <AppContext.Provider value={value}>{children}</AppContext.Provider>;
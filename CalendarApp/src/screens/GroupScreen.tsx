@@ -40,12 +40,13 @@ import { useAuth } from '../hooks/useAuth';
 import { groupApi } from '../services/api/groupApi';
 import { Group } from '../types/group';
 import { Events } from '../types/event';
+import { User } from '../types/user';
 import { formatDate } from '../utils/dateHelpers';
 import { useNavigate } from 'react-router-dom';
 import CreateGroupDialog from '../components/Dialogs/CreateGroupDialog';
 
 const GroupScreen: React.FC = () => {
-    const { getGroups, getGroupEvents } = groupApi;
+    const { getGroups, getGroupEvents, getGroupMembers } = groupApi;
     const theme = useTheme();
     const isMobile = useMediaQuery(theme.breakpoints.down('sm'));
     const { user } = useAuth();
@@ -163,6 +164,70 @@ const GroupScreen: React.FC = () => {
         );
     };
 
+    const GroupMembers: React.FC<{ groupId: number; memberCount: number }> = ({ groupId, memberCount }) => {
+        const [members, setMembers] = useState<User[]>([]);
+        const [isLoadingMembers, setIsLoadingMembers] = useState(true);
+        const [error, setError] = useState<string | null>(null);
+
+        useEffect(() => {
+            const fetchGroupMembers = async () => {
+                setIsLoadingMembers(true);
+                try {
+                    // Only the first few members are shown; the rest are summarized from member_count.
+                    const response = await getGroupMembers(groupId, { page_size: '5' });
+                    setMembers(response.results.flat());
+                } catch (err) {
+                    setError('Error loading members');
+                } finally {
+                    setIsLoadingMembers(false);
+                }
+            };
+
+            fetchGroupMembers();
+        }, [groupId]);
+
+        if (isLoadingMembers) {
+            return (
+                <Box display="flex" justifyContent="center" mt={2}>
+                    <CircularProgress size={24} />
+                </Box>
+            );
+        }
+
+        if (error) {
+            return (
+                <Typography color="error" align="center" mt={2}>
+                    {error}
+                </Typography>
+            );
+        }
+
+        return (
+            <List disablePadding>
+                {members.map((member) => (
+                    <ListItem key={member.id} disableGutters>
+                        <ListItemAvatar>
+                            <Avatar sx={{ borderRadius: 0 }}>
+                                <PersonIcon />
+                            </Avatar>
+                        </ListItemAvatar>
+                        <ListItemText
+                            primary={`${member.firstName} ${member.lastName}`}
+                            secondary={member.email}
+                        />
+                    </ListItem>
+                ))}
+                {memberCount > members.length && (
+                    <ListItem disableGutters>
+                        <ListItemText
+                            primary={`+${memberCount - members.length} more members`}
+                        />
+                    </ListItem>
+                )}
+            </List>
+        );
+    };
+
     return (
         <Container maxWidth="lg" sx={{ pb: 4 }}>
             <Paper
@@ -280,7 +345,7 @@ const GroupScreen: React.FC = () => {
                                         }
                                         subheader={
                                             <Typography variant="body2" color="text.secondary">
-                                                {group.members.length} members
+                                                {group.member_count} members
                                             </Typography>
                                         }
                                         sx={{
@@ -315,28 +380,7 @@ const GroupScreen: React.FC = () => {
                                             <Typography variant="subtitle1" gutterBottom color="text.primary">
                                                 Members:
                                             </Typography>
-                                            <List disablePadding>
-                                                {group.members.slice(0, 5).map((member) => (
-                                                    <ListItem key={member.id} disableGutters>
-                                                        <ListItemAvatar>
-                                                            <Avatar sx={{ borderRadius: 0 }}>
-                                                                <PersonIcon />
-                                                            </Avatar>
-                                                        </ListItemAvatar>
-                                                        <ListItemText
-                                                            primary={`${member.firstName} ${member.lastName}`}
-                                                            secondary={member.email}
-                                                        />
-                                                    </ListItem>
-                                                ))}
-                                                {group.members.length > 5 && (
-                                                    <ListItem disableGutters>
-                                                        <ListItemText
-                                                            primary={`+${group.members.length - 5} more members`}
-                                                        />
-                                                    </ListItem>
-                                                )}
-                                            </List>
+                                            <GroupMembers groupId={group.id} memberCount={group.member_count} />
                                             <Typography variant="subtitle1" gutterBottom color="text.primary" sx={{ mt: 2 }}>
                                                 Upcoming Events:
                                             </Typography>
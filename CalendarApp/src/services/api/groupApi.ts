@@ -216,22 +216,16 @@ export const groupApi = {
     },
 
     /**
-     * Fetch members of a specific group
+     * Fetch one page of the members of a specific group
      * @param groupId - ID of the group to fetch members for
-     * @returns Promise with an array of User objects
+     * @param params - Optional query parameters such as page and page_size
+     * @returns Promise with a paginated response of User objects
      */
-    getGroupMembers: async (groupId: number): Promise<ApiResponse<User[]>> => {
+    getGroupMembers: async (groupId: number, params?: Record<string, string>): Promise<PaginatedResponse<User[]>> => {
         try {
-            const response = await apiRequest<User[]>(`/groups/${groupId}/members/`, 'GET');
-            return {
-                data: response.data,
-                message: 'Group members fetched successfully',
-            };
+            return await getPaginatedResults<User>(`/groups/${groupId}/members/`, params);
         } catch (error) {
-            return {
-                data: [],
-                error: handleApiError(error),
-            };
+            throw new Error(handleApiError(error).join(', '));
         }
     },
 
@@ -1,6 +1,6 @@
 import { ApiResponse, PaginatedResponse, Notifications, UserDeviceToken } from '../../types/event';
 import { NotificationPreferences } from '../../types/user';
-import { apiRequest, getPaginatedResults, handleApiError } from '../../utils/apiHelpers';
+import { apiRequest, getPaginatedResults, handleApiError, webSocketUrl } from '../../utils/apiHelpers';
 
 /**
  * notificationApi.ts
@@ -10,7 +10,75 @@ import { apiRequest, getPaginatedResults, handleApiError } from '../../utils/api
  * and device token management for push notifications.
  */
 
+export interface NotificationStreamHandlers {
+    onNotifications: (notifications: Notifications[]) => void;
+    onUnreadCount: (unreadCount: number) => void;
+}
+
+// Closed by the server when the token is missing or invalid; reconnecting will not help.
+const UNAUTHORIZED_CLOSE_CODE = 4401;
+const MAX_RECONNECT_DELAY_MS = 30000;
+
+const toNotification = (notification: any): Notifications => ({
+    id: notification.id,
+    recipient: { id: notification.recipient } as Notifications['recipient'],
+    notificationType: notification.notification_type,
+    message: notification.message,
+    isRead: notification.is_read,
+    createdAt: notification.created_at,
+    deliveryMethod: 'in_app',
+});
+
 export const notificationApi = {
+    /**
+     * Subscribe to new notifications and the unread count over the ws/notifications/ WebSocket,
+     * reconnecting with backoff when the connection drops
+     * @param handlers - Callbacks for new or digest-updated notifications and the unread count
+     * @returns Function that closes the connection
+     */
+    connectNotificationStream: (handlers: NotificationStreamHandlers): (() => void) => {
+        let socket: WebSocket | null = null;
+        let reconnectTimer: ReturnType<typeof setTimeout> | undefined;
+        let attempts = 0;
+        let closed = false;
+
+        const connect = () => {
+            const url = webSocketUrl('/ws/notifications/');
+            if (!url || closed) {
+                return;
+            }
+            socket = new WebSocket(url);
+            socket.onopen = () => {
+                attempts = 0;
+            };
+            socket.onmessage = (message) => {
+                const frame = JSON.parse(message.data);
+                if (frame.type === 'notifications' && frame.notifications.length) {
+                    handlers.onNotifications(frame.notifications.map(toNotification));
+                }
+                if (typeof frame.unread_count === 'number') {
+                    handlers.onUnreadCount(frame.unread_count);
+                }
+            };
+            socket.onclose = (event) => {
+                if (closed || event.code === UNAUTHORIZED_CLOSE_CODE) {
+                    return;
+                }
+                const delay = Math.min(1000 * 2 ** attempts, MAX_RECONNECT_DELAY_MS);
+                attempts += 1;
+                reconnectTimer = setTimeout(connect, delay);
+            };
+        };
+
+        connect();
+        return () => {
+            closed = true;
+            clearTimeout(reconnectTimer);
+            socket?.close();
+        };
+    },
+
+
     /**
      * Fetch notifications based on provided parameters
      * @param params - Optional query parameters for filtering notifications
@@ -5,7 +5,9 @@ export interface Group {
     id: number;
     name: string;
     description?: string;
-    members: User[];
+    // Only on a single group; listings carry member_count instead.
+    members?: User[];
+    member_count: number;
     createdAt: string;
     updatedAt: string;
     admin: number;
@@ -3,6 +3,18 @@ import { authApi } from "../services/api/authApi";
 import { FieldErrors } from "../types/types";
 
 const API_BASE_URL = process.env.REACT_APP_API_BASE_URL || 'http://localhost:8000/api';
+const WS_BASE_URL = process.env.REACT_APP_WS_BASE_URL || API_BASE_URL.replace(/^http/, 'ws').replace(/\/api\/?$/, '');
+
+/**
+ * Build an authenticated WebSocket URL; the access token goes in the query string because
+ * browsers cannot set headers on a WebSocket
+ * @param path - WebSocket path, e.g. '/ws/notifications/'
+ * @returns WebSocket URL, or null when there is no access token
+ */
+export const webSocketUrl = (path: string): string | null => {
+    const accessToken = localStorage.getItem('access_token');
+    return accessToken ? `${WS_BASE_URL}${path}?token=${encodeURIComponent(accessToken)}` : null;
+};
 
 /**
  * Generic function to make API requests
@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "calendar_app.settings")
 
-application = get_asgi_application()
+# HTTP and WebSocket routing live in the app; its consumers and auth middleware import models,
+# so Django is set up first.
+django.setup(set_prefix=False)
+
+from schedules import asgi  # noqa: E402
+
+application = asgi.application
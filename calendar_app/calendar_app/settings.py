@@ -1,4 +1,5 @@
 import os
+from importlib.util import find_spec
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -41,6 +42,8 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "schedules.middleware.ReplicaRoutingMiddleware",
+    "schedules.middleware.ProfileCacheMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -64,6 +67,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "calendar_app.wsgi.application"
+ASGI_APPLICATION = "calendar_app.asgi.application"
 
 # Database
 DATABASES = {
@@ -77,6 +81,132 @@ DATABASES = {
     }
 }
 
+# Read replicas, e.g. DB_REPLICA_HOSTS=replica-1.internal,replica-2.internal
+# Safe-method API reads and heavy read-only tasks use them; writers stay pinned to the
+# primary for REPLICA_STICKY_SECONDS so they read their own writes.
+DATABASE_REPLICAS = []
+for index, replica_host in enumerate(host.strip() for host in os.getenv('DB_REPLICA_HOSTS', '').split(',') if host.strip()):
+    alias = f"replica_{index}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": replica_host,
+        "PORT": os.getenv('DB_REPLICA_PORT', DATABASES["default"]["PORT"]),
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['schedules.db_router.ReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 5))
+
+# Cache
+# A shared backend (Redis) is required in production so every worker sees the same entries.
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Channel layer for WebSocket pushes; like the cache, it must be shared (Redis) in production so
+# messages published by any process reach clients connected to another. channels_redis is optional;
+# without it each process only reaches its own clients.
+if REDIS_URL and find_spec('channels_redis'):
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {"hosts": [REDIS_URL]},
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+        }
+    }
+# How long NotificationConsumer collects a burst of notifications before sending them as one frame
+NOTIFICATION_STREAM_COALESCE_SECONDS = float(os.getenv('NOTIFICATION_STREAM_COALESCE_SECONDS', 0.5))
+
+PUBLIC_GROUP_DIRECTORY_TIMEOUT = int(os.getenv('PUBLIC_GROUP_DIRECTORY_TIMEOUT', 300))
+CALENDAR_RANGE_CACHE_TIMEOUT = int(os.getenv('CALENDAR_RANGE_CACHE_TIMEOUT', 300))
+# Short, because "upcoming" also changes as time passes, not only when data does.
+DASHBOARD_CACHE_TIMEOUT = int(os.getenv('DASHBOARD_CACHE_TIMEOUT', 60))
+
+# Minimum seconds between calendar warm-ups for one user on login or token refresh (see schedules.cache_warming)
+CALENDAR_WARM_INTERVAL = int(os.getenv('CALENDAR_WARM_INTERVAL', 60))
+
+# Event delta sync (/api/events/sync/). Tokens older than the retention window force a full sync.
+EVENT_SYNC_RETENTION_DAYS = int(os.getenv('EVENT_SYNC_RETENTION_DAYS', 30))
+EVENT_SYNC_SETTLE_SECONDS = int(os.getenv('EVENT_SYNC_SETTLE_SECONDS', 10))
+EVENT_SYNC_PAGE_SIZE = int(os.getenv('EVENT_SYNC_PAGE_SIZE', 500))
+
+# Rows locked and recounted per transaction by reconcile_counters (see schedules.counters)
+COUNTER_RECONCILE_BATCH_SIZE = int(os.getenv('COUNTER_RECONCILE_BATCH_SIZE', 1000))
+
+# Per-process UserProfile LRU (see schedules.profile_cache)
+PROFILE_CACHE_SIZE = int(os.getenv('PROFILE_CACHE_SIZE', 2048))
+PROFILE_CACHE_TTL = int(os.getenv('PROFILE_CACHE_TTL', 60))
+
+# Cross-process eviction of process-local caches over PostgreSQL LISTEN/NOTIFY (see schedules.invalidation_bus)
+INVALIDATION_BUS_ENABLED = os.getenv('INVALIDATION_BUS_ENABLED', 'True') == 'True'
+INVALIDATION_CHANNEL = os.getenv('INVALIDATION_CHANNEL', 'schedules_invalidation')
+INVALIDATION_POLL_SECONDS = int(os.getenv('INVALIDATION_POLL_SECONDS', 5))
+
+# Optional per-user agenda index (see schedules.agenda_store). Empty disables it; otherwise a backend
+# class such as schedules.agenda_store.RedisAgendaBackend or schedules.agenda_store.InMemoryAgendaBackend.
+AGENDA_STORE_BACKEND = os.getenv('AGENDA_STORE_BACKEND', '')
+AGENDA_STORE_URL = os.getenv('AGENDA_STORE_URL', REDIS_URL or 'redis://localhost:6379/0')
+AGENDA_MAX_SPAN_HOURS = int(os.getenv('AGENDA_MAX_SPAN_HOURS', 48))
+AGENDA_STORE_REBUILD_SECONDS = int(os.getenv('AGENDA_STORE_REBUILD_SECONDS', 86400))
+
+# Single-flight coalescing of identical expensive reads (see schedules.single_flight)
+SINGLE_FLIGHT_RESULT_SECONDS = int(os.getenv('SINGLE_FLIGHT_RESULT_SECONDS', 5))
+SINGLE_FLIGHT_LOCK_SECONDS = int(os.getenv('SINGLE_FLIGHT_LOCK_SECONDS', 30))
+SINGLE_FLIGHT_WAIT_SECONDS = int(os.getenv('SINGLE_FLIGHT_WAIT_SECONDS', 10))
+
+# Listing pagination without COUNT(*) per page (see schedules.pagination): none, estimate, cached or exact
+PAGINATION_COUNT_MODE = os.getenv('PAGINATION_COUNT_MODE', 'estimate')
+PAGINATION_COUNT_CACHE_SECONDS = int(os.getenv('PAGINATION_COUNT_CACHE_SECONDS', 60))
+PAGINATION_EXACT_COUNT_BELOW = int(os.getenv('PAGINATION_EXACT_COUNT_BELOW', 1000))
+
+# Reminder dispatcher (see schedules.reminders)
+REMINDER_DISPATCH_BATCH_SIZE = int(os.getenv('REMINDER_DISPATCH_BATCH_SIZE', 500))
+REMINDER_MAX_LATENESS_MINUTES = int(os.getenv('REMINDER_MAX_LATENESS_MINUTES', 60))
+
+# In-app notification fan-out (see schedules.notification_fanout)
+NOTIFICATION_BULK_BATCH_SIZE = int(os.getenv('NOTIFICATION_BULK_BATCH_SIZE', 500))
+
+# Notification digests (see schedules.notification_digest); 0 sends every notification on its own
+NOTIFICATION_DIGEST_WINDOW_SECONDS = int(os.getenv('NOTIFICATION_DIGEST_WINDOW_SECONDS', 300))
+
+# Notification outbox (see schedules.outbox); rates are messages per second per channel, 0 for unlimited
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 100))
+OUTBOX_LEASE_SECONDS = int(os.getenv('OUTBOX_LEASE_SECONDS', 300))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 5))
+OUTBOX_RETRY_BACKOFF_SECONDS = int(os.getenv('OUTBOX_RETRY_BACKOFF_SECONDS', 30))
+OUTBOX_RETENTION_DAYS = int(os.getenv('OUTBOX_RETENTION_DAYS', 7))
+OUTBOX_CHANNEL_RATE = {
+    'in_app': int(os.getenv('OUTBOX_IN_APP_RATE', 0)),
+    'email': int(os.getenv('OUTBOX_EMAIL_RATE', 20)),
+    'push': int(os.getenv('OUTBOX_PUSH_RATE', 0)),
+}
+OUTBOX_CHANNEL_CONCURRENCY = {
+    'in_app': int(os.getenv('OUTBOX_IN_APP_CONCURRENCY', 1)),
+    'email': int(os.getenv('OUTBOX_EMAIL_CONCURRENCY', 2)),
+    'push': int(os.getenv('OUTBOX_PUSH_CONCURRENCY', 4)),
+}
+
+# Weekly summary emails (see schedules.weekly_summary)
+WEEKLY_SUMMARY_PARTITION_SIZE = int(os.getenv('WEEKLY_SUMMARY_PARTITION_SIZE', 5000))
+WEEKLY_SUMMARY_LEASE_SECONDS = int(os.getenv('WEEKLY_SUMMARY_LEASE_SECONDS', 600))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -140,6 +270,7 @@ EMAIL_PORT = int(os.getenv('EMAIL_PORT', 587))
 EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'True') == 'True'
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
+EMAIL_BATCH_SIZE = int(os.getenv('EMAIL_BATCH_SIZE', 100))  # messages per reused SMTP connection (see schedules.email_delivery)
 
 # External Calendar API settings
 GOOGLE_MAPS_API_KEY = os.getenv('GOOGLE_MAPS_API_KEY')
@@ -151,6 +282,16 @@ OUTLOOK_CLIENT_ID = os.getenv('OUTLOOK_CLIENT_ID')
 OUTLOOK_CLIENT_SECRET = os.getenv('OUTLOOK_CLIENT_SECRET')
 OUTLOOK_REDIRECT_URI = os.getenv('OUTLOOK_REDIRECT_URI')
 
+# Push notifications (see schedules.push_delivery); point FCM_ENDPOINT at `manage.py fcm_stub` locally
+FCM_SERVER_KEY = os.getenv('FCM_SERVER_KEY')
+FCM_ENDPOINT = os.getenv('FCM_ENDPOINT', 'https://fcm.googleapis.com/fcm/send')
+PUSH_TIMEOUT_SECONDS = float(os.getenv('PUSH_TIMEOUT_SECONDS', 5))
+PUSH_MAX_WORKERS = int(os.getenv('PUSH_MAX_WORKERS', 8))
+PUSH_MULTICAST_SIZE = int(os.getenv('PUSH_MULTICAST_SIZE', 500))
+PUSH_MAX_RETRIES = int(os.getenv('PUSH_MAX_RETRIES', 3))
+PUSH_RETRY_BACKOFF_SECONDS = float(os.getenv('PUSH_RETRY_BACKOFF_SECONDS', 0.5))
+PUSH_TOKEN_RETENTION_DAYS = int(os.getenv('PUSH_TOKEN_RETENTION_DAYS', 30))
+
 # Logging configuration
 LOGGING = {
     'version': 1,
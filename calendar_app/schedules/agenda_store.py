@@ -0,0 +1,265 @@
+import bisect
+import logging
+import threading
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .models import EventAccess
+
+logger = logging.getLogger(__name__)
+
+OPEN_ENDED = float('inf')
+
+
+class InMemoryAgendaBackend:
+    """
+    Sorted sets held in this process. Meant for tests and single-process development.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._scores = {}
+        self._ordered = {}
+        self._flags = {}
+
+    def apply(self, adds, removes):
+        with self._lock:
+            for key, members in removes.items():
+                for member in members:
+                    self._discard(key, str(member))
+            for key, members in adds.items():
+                for member, score in members.items():
+                    self._discard(key, str(member))
+                    self._scores.setdefault(key, {})[str(member)] = score
+                    bisect.insort(self._ordered.setdefault(key, []), (score, str(member)))
+
+    def _discard(self, key, member):
+        score = self._scores.get(key, {}).pop(member, None)
+        if score is not None:
+            ordered = self._ordered[key]
+            del ordered[bisect.bisect_left(ordered, (score, member))]
+
+    def range_by_score(self, key, low, high):
+        with self._lock:
+            ordered = self._ordered.get(key, [])
+            start = bisect.bisect_left(ordered, (low, ''))
+            return [member for score, member in ordered[start:] if score <= high]
+
+    def has_flag(self, key):
+        return key in self._flags
+
+    def set_flag(self, key, timeout):
+        # Expiry only matters to long-lived processes, which should use Redis.
+        self._flags[key] = timeout
+
+    def delete(self, keys):
+        with self._lock:
+            for key in keys:
+                self._scores.pop(key, None)
+                self._ordered.pop(key, None)
+                self._flags.pop(key, None)
+
+    def delete_all(self, prefix):
+        with self._lock:
+            for store in (self._scores, self._ordered, self._flags):
+                for key in [key for key in store if key.startswith(prefix)]:
+                    del store[key]
+
+
+class RedisAgendaBackend:
+    """
+    Sorted sets in Redis, shared by every process. The instance should not evict keys
+    (maxmemory-policy noeviction), or evicted agendas silently lose events until their next rebuild.
+    """
+
+    def __init__(self):
+        import redis
+        self._client = redis.Redis.from_url(settings.AGENDA_STORE_URL, decode_responses=True)
+
+    def apply(self, adds, removes):
+        pipe = self._client.pipeline(transaction=False)
+        for key, members in removes.items():
+            if members:
+                pipe.zrem(key, *members)
+        for key, members in adds.items():
+            if members:
+                pipe.zadd(key, members)
+        pipe.execute()
+
+    def range_by_score(self, key, low, high):
+        return self._client.zrangebyscore(key, low, high)
+
+    def has_flag(self, key):
+        return bool(self._client.exists(key))
+
+    def set_flag(self, key, timeout):
+        self._client.set(key, 1, ex=timeout)
+
+    def delete(self, keys):
+        if keys:
+            self._client.delete(*keys)
+
+    def delete_all(self, prefix):
+        keys = list(self._client.scan_iter(match=f"{prefix}*", count=1000))
+        for index in range(0, len(keys), 1000):
+            self._client.delete(*keys[index:index + 1000])
+
+
+class AgendaStore:
+    """
+    Optional per-user agenda index: the ids of every event a user can see, in two sorted sets.
+
+    'start' holds one-off events scored by their start timestamp. A range read takes the ids
+    starting up to AGENDA_MAX_SPAN_HOURS before the range, so events no longer than that are found
+    with a single ZRANGEBYSCORE. 'open' holds everything that can overlap a range starting long
+    after it begins, scored by the time it stops being relevant: longer events by their end, and
+    recurring events (including rows materialized from a RecurringSchedule) with no bound, since
+    the calendar expands those itself.
+
+    EventAccessManager feeds the index after each commit, the same places it maintains EventAccess.
+    A user's agenda is built from EventAccess on first read and rebuilt every
+    AGENDA_STORE_REBUILD_SECONDS, which bounds drift from writes the backend missed. Ids are only
+    candidates: callers fetch them through visible_events(), so a stale id never leaks an event.
+    """
+    KEY = 'agenda:{user_id}:{kind}'
+    START, OPEN, BUILT = 'start', 'open', 'built'
+
+    _backend = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def enabled():
+        return bool(settings.AGENDA_STORE_BACKEND)
+
+    @staticmethod
+    def backend():
+        if AgendaStore._backend is None:
+            with AgendaStore._lock:
+                if AgendaStore._backend is None:
+                    AgendaStore._backend = import_string(settings.AGENDA_STORE_BACKEND)()
+        return AgendaStore._backend
+
+    @staticmethod
+    def _key(user_id, kind):
+        return AgendaStore.KEY.format(user_id=user_id, kind=kind)
+
+    @staticmethod
+    def _placement(recurring, start_time, end_time):
+        if recurring:
+            return AgendaStore.OPEN, OPEN_ENDED
+        if (end_time - start_time).total_seconds() > settings.AGENDA_MAX_SPAN_HOURS * 3600:
+            return AgendaStore.OPEN, end_time.timestamp()
+        return AgendaStore.START, start_time.timestamp()
+
+    @staticmethod
+    def _changes(entries):
+        """
+        Turn (user_id, event_id, recurring, start_time, end_time) rows into backend adds and removes.
+        Each id is dropped from the set it no longer belongs to, in case the event changed shape.
+        """
+        adds, removes = {}, {}
+        for user_id, event_id, recurring, start_time, end_time in entries:
+            kind, score = AgendaStore._placement(recurring, start_time, end_time)
+            other = AgendaStore.OPEN if kind == AgendaStore.START else AgendaStore.START
+            adds.setdefault(AgendaStore._key(user_id, kind), {})[str(event_id)] = score
+            removes.setdefault(AgendaStore._key(user_id, other), []).append(str(event_id))
+        return adds, removes
+
+    @staticmethod
+    def _apply_on_commit(adds, removes):
+        def apply():
+            try:
+                AgendaStore.backend().apply(adds, removes)
+            except Exception as e:
+                logger.error(f"Agenda store update failed: {e}")
+
+        transaction.on_commit(apply)
+
+    @staticmethod
+    def index(entries):
+        """
+        Add or move (user_id, event_id, recurring, start_time, end_time) entries once the
+        current transaction commits.
+        """
+        if not AgendaStore.enabled():
+            return
+        adds, removes = AgendaStore._changes(entries)
+        if adds:
+            AgendaStore._apply_on_commit(adds, removes)
+
+    @staticmethod
+    def unindex(pairs):
+        """
+        Remove (user_id, event_id) pairs once the current transaction commits.
+        """
+        if not AgendaStore.enabled():
+            return
+        removes = {}
+        for user_id, event_id in pairs:
+            for kind in (AgendaStore.START, AgendaStore.OPEN):
+                removes.setdefault(AgendaStore._key(user_id, kind), []).append(str(event_id))
+        if removes:
+            AgendaStore._apply_on_commit({}, removes)
+
+    @staticmethod
+    def build(user_id):
+        """
+        Load the user's agenda from EventAccess. Entries are overwritten, not cleared first, so
+        an id indexed by a concurrent commit is never lost; ids that went stale stay behind as
+        harmless extra candidates.
+        """
+        rows = EventAccess.objects.filter(user_id=user_id).values_list(
+            'event_id', 'event__recurring', 'start_time', 'end_time'
+        )
+        backend = AgendaStore.backend()
+        batch = []
+        for row in rows.iterator(chunk_size=2000):
+            batch.append((user_id,) + row)
+            if len(batch) == 2000:
+                backend.apply(*AgendaStore._changes(batch))
+                batch = []
+        if batch:
+            backend.apply(*AgendaStore._changes(batch))
+        backend.set_flag(AgendaStore._key(user_id, AgendaStore.BUILT), settings.AGENDA_STORE_REBUILD_SECONDS)
+
+    @staticmethod
+    def range_ids(user_id, start, end):
+        """
+        Candidate ids of events the user may see between start and end, or None when the store
+        is disabled or unavailable and the caller should query the database directly.
+        """
+        if not AgendaStore.enabled():
+            return None
+        try:
+            backend = AgendaStore.backend()
+            if not backend.has_flag(AgendaStore._key(user_id, AgendaStore.BUILT)):
+                AgendaStore.build(user_id)
+            low = start.timestamp() - settings.AGENDA_MAX_SPAN_HOURS * 3600
+            ids = backend.range_by_score(AgendaStore._key(user_id, AgendaStore.START), low, end.timestamp())
+            ids += backend.range_by_score(AgendaStore._key(user_id, AgendaStore.OPEN), start.timestamp(), OPEN_ENDED)
+        except Exception as e:
+            logger.error(f"Agenda store read for user {user_id} failed: {e}")
+            return None
+        return [int(event_id) for event_id in ids]
+
+    @staticmethod
+    def drop_users(user_ids):
+        """
+        Forget the agendas of the given users; they are rebuilt on their next read.
+        """
+        if not AgendaStore.enabled():
+            return
+        AgendaStore.backend().delete([
+            AgendaStore._key(user_id, kind)
+            for user_id in user_ids
+            for kind in (AgendaStore.START, AgendaStore.OPEN, AgendaStore.BUILT)
+        ])
+
+    @staticmethod
+    def reset():
+        """
+        Forget every agenda.
+        """
+        if AgendaStore.enabled():
+            AgendaStore.backend().delete_all('agenda:')
@@ -1,6 +1,13 @@
+from urllib.parse import parse_qs
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ObjectDoesNotExist
 from django.db.models import Q
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
 
 class EmailOrUsernameModelBackend(ModelBackend):
     def authenticate(self, request, username=None, password=None, **kwargs):
@@ -12,4 +19,27 @@ class EmailOrUsernameModelBackend(ModelBackend):
 
         if user.check_password(password):
             return user
-        return None
\ No newline at end of file
+        return None
+
+@database_sync_to_async
+def _jwt_user(raw_token):
+    try:
+        user_id = AccessToken(raw_token)[jwt_settings.USER_ID_CLAIM]
+        return get_user_model().objects.get(**{jwt_settings.USER_ID_FIELD: user_id})
+    except (TokenError, KeyError, ObjectDoesNotExist):
+        return None
+
+
+class JWTQueryStringAuthMiddleware(BaseMiddleware):
+    """
+    WebSocket authentication for the JWT web client, which cannot set headers on a WebSocket:
+    a valid access token in ?token= becomes scope['user']. Without one, the session user set by
+    AuthMiddlewareStack is kept.
+    """
+    async def __call__(self, scope, receive, send):
+        token = parse_qs(scope.get('query_string', b'').decode()).get('token', [None])[0]
+        if token:
+            user = await _jwt_user(token)
+            if user is not None:
+                scope = dict(scope, user=user)
+        return await super().__call__(scope, receive, send)
@@ -0,0 +1,72 @@
+import calendar
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+import zoneinfo
+
+from .profile_cache import ProfileCache
+from .range_cache import CalendarRangeCache
+
+logger = logging.getLogger(__name__)
+
+
+class CalendarWarmer:
+    """
+    Precomputes the calendar ranges a user is about to open, so the first paint after login
+    is a range cache hit. The ranges mirror the app: the home screen always requests a whole month
+    from /api/events/ with start_date, end_date (startOfMonth..endOfMonth) and user_id, whatever
+    the profile's default_view.
+    """
+    THROTTLE_KEY = 'calendar_warm:{user_id}'
+
+    @staticmethod
+    def ranges(today):
+        """
+        The (first day, last day) of the current and the next month.
+        """
+        ranges = []
+        start = today.replace(day=1)
+        for _ in range(2):
+            end = start.replace(day=calendar.monthrange(start.year, start.month)[1])
+            ranges.append((start, end))
+            start = end + timedelta(days=1)
+        return ranges
+
+    @staticmethod
+    def params(user, start, end):
+        """
+        The query parameters the app sends for the range; the range cache is keyed on them.
+        """
+        return {'start_date': start.isoformat(), 'end_date': end.isoformat(), 'user_id': str(user.id)}
+
+    @staticmethod
+    def schedule(user):
+        """
+        Enqueue a warm-up for the user, at most once per CALENDAR_WARM_INTERVAL. Never raises,
+        since it runs on the login path.
+        """
+        if not cache.add(CalendarWarmer.THROTTLE_KEY.format(user_id=user.id), 1, settings.CALENDAR_WARM_INTERVAL):
+            return
+        # Imported here because tasks imports the views that import this module.
+        from .tasks import warm_calendar_cache
+        try:
+            warm_calendar_cache.delay(user.id)
+        except Exception as e:
+            logger.warning(f"Could not enqueue calendar warm-up for user {user.id}: {e}")
+
+    @staticmethod
+    def warm(user):
+        """
+        Compute and cache the user's current and next month.
+        """
+        from .views_organized.event_views import EventViewSet
+
+        today = timezone.now().astimezone(zoneinfo.ZoneInfo(ProfileCache.timezone_name(user))).date()
+        for start, end in CalendarWarmer.ranges(today):
+            params = CalendarWarmer.params(user, start, end)
+            CalendarRangeCache.get_or_compute(
+                user.id, 'list', params, lambda params=params: EventViewSet.compute_list_payload(user, params)
+            )
+        logger.info(f"Warmed calendar months for user {user.id}.")
@@ -1,6 +1,12 @@
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+import asyncio
 import json
 
+from .notification_inbox import NotificationInbox
+from .notification_stream import NotificationStream
+
 class EventConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.event_id = self.scope['url_route']['kwargs']['event_id']
@@ -25,3 +31,68 @@ class EventConsumer(AsyncWebsocketConsumer):
             'eta': event['eta'],
             'message': event['message']
         }))
+
+
+class NotificationConsumer(AsyncWebsocketConsumer):
+    """
+    Streams the user's new notifications and unread count. Bursts are coalesced: everything that
+    arrives within NOTIFICATION_STREAM_COALESCE_SECONDS of the first message goes out as one frame,
+    {'type': 'notifications', 'notifications': [...], 'unread_count': n}. A notification updated
+    by a digest carries an id the client has seen before and replaces it.
+    """
+    async def connect(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close(code=4401)
+            return
+
+        self.user_id = user.id
+        self.group_name = NotificationStream.group_name(self.user_id)
+        self.pending = {}
+        self.unread_count = None
+        self.flush_task = None
+
+        await self.channel_layer.group_add(
+            self.group_name,
+            self.channel_name
+        )
+
+        await self.accept()
+        counts = await database_sync_to_async(NotificationInbox.unread_counts)([self.user_id])
+        await self.send(text_data=json.dumps({
+            'type': 'unread_count',
+            'unread_count': counts[self.user_id]
+        }))
+
+    async def disconnect(self, close_code):
+        if not hasattr(self, 'group_name'):
+            return
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+        await self.channel_layer.group_discard(
+            self.group_name,
+            self.channel_name
+        )
+
+    async def notification_created(self, event):
+        for notification in event['notifications']:
+            self.pending[notification['id']] = notification
+        self.unread_count = event['unread_count']
+        self.schedule_flush()
+
+    async def notification_unread(self, event):
+        self.unread_count = event['unread_count']
+        self.schedule_flush()
+
+    def schedule_flush(self):
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.ensure_future(self.flush())
+
+    async def flush(self):
+        await asyncio.sleep(settings.NOTIFICATION_STREAM_COALESCE_SECONDS)
+        notifications, self.pending = list(self.pending.values()), {}
+        await self.send(text_data=json.dumps({
+            'type': 'notifications',
+            'notifications': notifications,
+            'unread_count': self.unread_count
+        }))
@@ -0,0 +1,190 @@
+import logging
+from itertools import islice
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import CustomUser, Event, Group, Notification, UserStats
+
+logger = logging.getLogger(__name__)
+
+
+def _count_subquery(queryset, field):
+    counts = queryset.order_by().values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def _group_counts():
+    return {
+        'member_count': _count_subquery(Group.members.through.objects.filter(group_id=OuterRef('pk')), 'group_id'),
+        'event_count': _count_subquery(Event.objects.filter(group_id=OuterRef('pk')), 'group_id'),
+    }
+
+
+def _user_counts(user_ref):
+    return {
+        'event_count': _count_subquery(Event.objects.filter(created_by_id=OuterRef(user_ref)), 'created_by_id'),
+        'group_count': _count_subquery(
+            Group.members.through.objects.filter(customuser_id=OuterRef(user_ref)), 'customuser_id'
+        ),
+        'unread_notification_count': _count_subquery(
+            Notification.objects.filter(recipient_id=OuterRef(user_ref), is_read=False), 'recipient_id'
+        ),
+    }
+
+
+def _id_chunks(manager, size):
+    ids = manager.order_by('id').values_list('id', flat=True).iterator(chunk_size=size)
+    while chunk := list(islice(ids, size)):
+        yield chunk
+
+
+def _adjust(queryset, field, delta):
+    if delta:
+        # Greatest() keeps a drifted counter from going negative; reconcile() repairs the value.
+        queryset.update(**{field: Greatest(F(field) + delta, Value(0))})
+
+
+class CounterCache:
+    """
+    Counter columns on Group (member_count, event_count) and UserStats (event_count, group_count,
+    unread_notification_count). Signals adjust them with relative F() updates inside the triggering
+    transaction, as does NotificationInbox for bulk notification writes; reconcile() recounts
+    everything, a locked chunk at a time, to repair drift.
+    """
+
+    @staticmethod
+    def adjust_group_members(group_id, user_ids, delta):
+        """
+        Record that user_ids joined (delta=1) or left (delta=-1) a group.
+        """
+        user_ids = set(user_ids)
+        if not user_ids:
+            return
+        with transaction.atomic():
+            _adjust(Group.objects.filter(id=group_id), 'member_count', delta * len(user_ids))
+            CounterCache.adjust_users({user_id: delta for user_id in user_ids}, 'group_count')
+
+    @staticmethod
+    def adjust_user_groups(user_id, group_ids, delta):
+        """
+        Record that one user joined (delta=1) or left (delta=-1) several groups.
+        """
+        group_ids = set(group_ids)
+        if not group_ids:
+            return
+        with transaction.atomic():
+            CounterCache.adjust_member_counts(group_ids, delta)
+            CounterCache.adjust_users({user_id: delta * len(group_ids)}, 'group_count')
+
+    @staticmethod
+    def adjust_member_counts(group_ids, delta):
+        if group_ids:
+            _adjust(Group.objects.filter(id__in=group_ids), 'member_count', delta)
+
+    @staticmethod
+    def adjust_group_events(group_id, delta):
+        if group_id:
+            _adjust(Group.objects.filter(id=group_id), 'event_count', delta)
+
+    @staticmethod
+    def adjust_users(deltas, field):
+        """
+        Apply {user_id: delta} to a UserStats counter. Rows are created on the first increment only,
+        so a decrement never inserts a row for a user who is being deleted.
+        """
+        deltas = {user_id: delta for user_id, delta in deltas.items() if user_id is not None and delta}
+        if not deltas:
+            return
+        UserStats.objects.bulk_create(
+            [UserStats(user_id=user_id) for user_id, delta in deltas.items() if delta > 0], ignore_conflicts=True
+        )
+        by_delta = {}
+        for user_id, delta in deltas.items():
+            by_delta.setdefault(delta, []).append(user_id)
+        for delta, user_ids in by_delta.items():
+            _adjust(UserStats.objects.filter(user_id__in=user_ids), field, delta)
+
+    @staticmethod
+    def get_user_counts(user):
+        stats = UserStats.objects.filter(user=user).values('event_count', 'group_count').first()
+        return stats or {'event_count': 0, 'group_count': 0}
+
+    @staticmethod
+    def get_unread_counts(user_ids):
+        counts = dict(UserStats.objects.filter(user_id__in=user_ids).values_list('user_id', 'unread_notification_count'))
+        return {user_id: counts.get(user_id, 0) for user_id in user_ids}
+
+    @staticmethod
+    def reconcile(fix=True, batch_size=None):
+        """
+        Recount every counter in chunks of settings.COUNTER_RECONCILE_BATCH_SIZE rows. Returns how many
+        groups and users had drifted; with fix=True the counters are corrected in place.
+        """
+        batch_size = batch_size or settings.COUNTER_RECONCILE_BATCH_SIZE
+        drifted_groups = sum(
+            CounterCache._reconcile_groups(group_ids, fix) for group_ids in _id_chunks(Group.objects, batch_size)
+        )
+        drifted_users = sum(
+            CounterCache._reconcile_users(user_ids, fix) for user_ids in _id_chunks(CustomUser.objects, batch_size)
+        )
+        return drifted_groups, drifted_users
+
+    @staticmethod
+    def _reconcile_groups(group_ids, fix):
+        actual = _group_counts()
+        with transaction.atomic():
+            # Lock the chunk first: a concurrent F() adjustment waits for the recount below instead
+            # of being overwritten by it, and the recount sees everything committed before the lock.
+            groups = Group.objects.filter(id__in=group_ids)
+            list(groups.select_for_update().values_list('id', flat=True))
+            drifted = list(
+                groups.annotate(**{f'actual_{field}': count for field, count in actual.items()})
+                .exclude(member_count=F('actual_member_count'), event_count=F('actual_event_count'))
+                .values_list('id', 'member_count', 'actual_member_count', 'event_count', 'actual_event_count')
+            )
+            for group_id, members, actual_members, events, actual_events in drifted:
+                logger.warning(
+                    f"Group {group_id} counters drifted: members {members} -> {actual_members}, "
+                    f"events {events} -> {actual_events}."
+                )
+            if fix and drifted:
+                Group.objects.filter(id__in=[row[0] for row in drifted]).update(**actual)
+        return len(drifted)
+
+    @staticmethod
+    def _reconcile_users(user_ids, fix):
+        with transaction.atomic():
+            # Users with counts but no stats row yet; with fix=True they get a zeroed row that the
+            # recount below corrects along with the rest of the chunk.
+            missing = list(
+                CustomUser.objects.filter(id__in=user_ids, stats__isnull=True)
+                .annotate(**{f'actual_{field}': count for field, count in _user_counts('pk').items()})
+                .filter(Q(actual_event_count__gt=0) | Q(actual_group_count__gt=0) | Q(actual_unread_notification_count__gt=0))
+                .values_list('id', flat=True)
+            )
+            if fix and missing:
+                UserStats.objects.bulk_create([UserStats(user_id=user_id) for user_id in missing], ignore_conflicts=True)
+
+            actual = _user_counts('user_id')
+            stats = UserStats.objects.filter(user_id__in=user_ids)
+            list(stats.select_for_update().values_list('user_id', flat=True))
+            drifted = list(
+                stats.annotate(**{f'actual_{field}': count for field, count in actual.items()})
+                .exclude(
+                    event_count=F('actual_event_count'), group_count=F('actual_group_count'),
+                    unread_notification_count=F('actual_unread_notification_count'),
+                )
+                .values_list(
+                    'user_id', 'event_count', 'group_count', 'unread_notification_count',
+                    'actual_event_count', 'actual_group_count', 'actual_unread_notification_count',
+                )
+            )
+            for user_id, *counts in drifted:
+                logger.warning(f"User {user_id} counters drifted: {tuple(counts[:3])} -> {tuple(counts[3:])}.")
+            if fix and drifted:
+                UserStats.objects.filter(user_id__in=[row[0] for row in drifted]).update(**actual)
+            if not fix and missing:
+                logger.warning(f"Users {missing} have counters but no stats row.")
+        return len({row[0] for row in drifted} | set(missing))
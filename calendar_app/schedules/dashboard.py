@@ -0,0 +1,70 @@
+import copy
+import logging
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .serializers import EventSerializer, GroupListSerializer
+from .event_access import visible_events
+from .group_directory import groups_joined_by
+from .range_cache import CalendarRangeCache
+from .counters import CounterCache
+from .recurrence import next_occurrence
+
+logger = logging.getLogger(__name__)
+
+
+def upcoming_events(user, now, limit):
+    """
+    The user's next `limit` events, with recurring series represented by their next occurrence.
+    """
+    def events(**range_lookups):
+        return visible_events(user, include_groups=False, **range_lookups).select_related(
+            'created_by', 'recurring_schedule'
+        ).prefetch_related('shared_with', 'reminders')
+
+    one_off = list(events(start_time__gte=now).order_by('start_time')[:limit])
+    series = events(start_time__lt=now).filter(
+        Q(recurrence_end_date__isnull=True) | Q(recurrence_end_date__gte=now),
+        recurring=True,
+    )
+
+    occurrences = []
+    for event in series:
+        start = next_occurrence(event, now)
+        if start is None:
+            continue
+        occurrence = copy.copy(event)
+        occurrence.end_time = start + (event.end_time - event.start_time)
+        occurrence.start_time = start
+        occurrences.append(occurrence)
+
+    return sorted(one_off + occurrences, key=lambda event: event.start_time)[:limit]
+
+
+class DashboardSummary:
+    """
+    Per-user dashboard payload, cached under the user's calendar version (see CalendarRangeCache),
+    so any change to their events, shares or groups serves a fresh one.
+    """
+    UPCOMING_LIMIT = 5
+    RECENT_GROUPS_LIMIT = 5
+
+    @staticmethod
+    def compute(user):
+        now = timezone.now()
+        recent_groups = groups_joined_by(user).order_by('-created_at')[:DashboardSummary.RECENT_GROUPS_LIMIT]
+        counts = CounterCache.get_user_counts(user)
+        return {
+            "upcoming_events": EventSerializer(upcoming_events(user, now, DashboardSummary.UPCOMING_LIMIT), many=True).data,
+            "recent_groups": GroupListSerializer(recent_groups, many=True).data,
+            "event_count": counts['event_count'],
+            "group_count": counts['group_count'],
+        }
+
+    @staticmethod
+    def get(user):
+        return CalendarRangeCache.get_or_compute(
+            user.id, 'dashboard', {}, lambda: DashboardSummary.compute(user),
+            timeout=settings.DASHBOARD_CACHE_TIMEOUT
+        )
@@ -0,0 +1,84 @@
+import logging
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'primary'
+REPLICA = 'replica'
+
+_read_mode = ContextVar('schedules_read_mode', default=PRIMARY)
+_has_written = ContextVar('schedules_has_written', default=False)
+
+
+@contextmanager
+def routing_context(read_from_replica):
+    """
+    Open a fresh routing context, e.g. for one request, with writes tracked from zero.
+    """
+    mode_token = _read_mode.set(REPLICA if read_from_replica else PRIMARY)
+    written_token = _has_written.set(False)
+    try:
+        yield
+    finally:
+        _has_written.reset(written_token)
+        _read_mode.reset(mode_token)
+
+
+@contextmanager
+def use_replica():
+    """
+    Route reads inside the block to a replica, e.g. for heavy read-only Celery tasks.
+    A write inside the block switches the rest of it back to the primary.
+    """
+    with routing_context(read_from_replica=True):
+        yield
+
+
+@contextmanager
+def use_primary():
+    """
+    Force reads inside the block to the primary.
+    """
+    token = _read_mode.set(PRIMARY)
+    try:
+        yield
+    finally:
+        _read_mode.reset(token)
+
+
+def has_written():
+    """
+    Whether a write has been routed in the current request or task context.
+    """
+    return _has_written.get()
+
+
+class ReplicaRouter:
+    """
+    Send reads to a configured replica when the current context allows it (see ReplicaRoutingMiddleware
+    and use_replica) and everything else to the primary. Once a write happens, later reads in the same
+    context stay on the primary so they see it.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if not replicas or _read_mode.get() != REPLICA or _has_written.get():
+            return 'default'
+        if connections['default'].in_atomic_block:
+            return 'default'
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        _has_written.set(True)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas mirror the primary, so objects loaded from any of them can be related.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -0,0 +1,98 @@
+import logging
+import smtplib
+from itertools import islice
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+
+logger = logging.getLogger(__name__)
+
+
+class EmailDispatcher:
+    """
+    Outgoing mail in batches of EMAIL_BATCH_SIZE, each sent over one SMTP connection that is
+    opened once and reused for every message in the batch (instead of a connection per send_mail).
+    Messages travel as {'subject', 'body', 'to'} dicts, so they can be handed to a celery task;
+    enqueue() is for request paths, send() for code already running in a worker.
+    """
+
+    @staticmethod
+    def message(subject, body, to):
+        return {'subject': subject, 'body': body, 'to': [to] if isinstance(to, str) else list(to)}
+
+    @staticmethod
+    def batches(messages):
+        messages = iter(messages)
+        while True:
+            batch = list(islice(messages, settings.EMAIL_BATCH_SIZE))
+            if not batch:
+                return
+            yield batch
+
+    @staticmethod
+    def send(messages):
+        """
+        Send the messages (any iterable, consumed batch by batch). A failed message is logged and
+        skipped; a dropped connection is reopened once. Returns how many were sent.
+        """
+        sent = failed = 0
+        for batch in EmailDispatcher.batches(messages):
+            batch_sent = EmailDispatcher.send_batch(batch)
+            sent += batch_sent
+            failed += len(batch) - batch_sent
+        if sent or failed:
+            logger.info(f"Sent {sent} emails, {failed} failed.")
+        return sent
+
+    @staticmethod
+    def send_batch(batch):
+        return sum(1 for error in EmailDispatcher.deliver(batch) if error is None)
+
+    @staticmethod
+    def deliver(batch):
+        """
+        Send one batch over a single connection. Returns one entry per message: None if it was
+        sent, else the error.
+        """
+        connection = get_connection(fail_silently=False)
+        errors = []
+        try:
+            connection.open()
+        except Exception as e:
+            logger.error(f"Could not open an email connection for {len(batch)} messages: {e}")
+            return [str(e) or e.__class__.__name__] * len(batch)
+        try:
+            for message in batch:
+                email = EmailMessage(
+                    message['subject'], message['body'], settings.DEFAULT_FROM_EMAIL, message['to'],
+                    connection=connection
+                )
+                try:
+                    try:
+                        connection.send_messages([email])
+                    except smtplib.SMTPServerDisconnected:
+                        connection.close()
+                        connection.open()
+                        connection.send_messages([email])
+                    errors.append(None)
+                except Exception as e:
+                    logger.error(f"Failed to send email '{message['subject']}' to {', '.join(message['to'])}: {e}")
+                    errors.append(str(e) or e.__class__.__name__)
+        finally:
+            connection.close()
+        return errors
+
+    @staticmethod
+    def enqueue(messages):
+        """
+        Hand the messages to the send_email_batch task, one task per batch. If the broker is
+        unreachable the batch is sent right away instead.
+        """
+        # Imported here because tasks imports this module.
+        from .tasks import send_email_batch
+
+        for batch in EmailDispatcher.batches(messages):
+            try:
+                send_email_batch.delay(batch)
+            except Exception as e:
+                logger.warning(f"Could not enqueue {len(batch)} emails, sending them now: {e}")
+                EmailDispatcher.send_batch(batch)
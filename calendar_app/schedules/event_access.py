@@ -0,0 +1,194 @@
+import logging
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
+
+from .models import Event, EventAccess, EventChange, Group
+from .event_changes import EventChangeLog
+from .agenda_store import AgendaStore
+
+logger = logging.getLogger(__name__)
+
+
+def visible_events(user, include_groups=True, **range_lookups):
+    """
+    Events the user can see, as a single indexed lookup on EventAccess.
+    With include_groups=False only events the user created or that were shared with them are
+    returned, leaving out those visible solely through group membership.
+    Range lookups (e.g. start_time__lt=end) are applied to the same access row, so pass them
+    here rather than chaining another filter on access__.
+    """
+    lookups = {f'access__{lookup}': value for lookup, value in range_lookups.items()}
+    if not include_groups:
+        lookups['access__direct'] = True
+    return Event.objects.filter(access__user=user, **lookups)
+
+
+def visible_among(user, event_ids):
+    """
+    The events among event_ids the user can see, fetched by primary key with one indexed
+    access check per id. Used for candidate ids from AgendaStore, which may be stale.
+    """
+    access = EventAccess.objects.filter(user=user, event_id=OuterRef('pk'))
+    return Event.objects.filter(Exists(access), id__in=event_ids)
+
+
+class EventAccessManager:
+
+    @staticmethod
+    def viewer_ids(event):
+        """
+        Ids of every user who can see the event: creator, share recipients and group members.
+        """
+        direct_ids, group_ids = EventAccessManager._viewers(event)
+        return direct_ids | group_ids
+
+    @staticmethod
+    def _viewers(event):
+        """
+        The event's direct viewers (creator and share recipients) and its group members, as two sets.
+        """
+        direct_ids = {event.created_by_id}
+        direct_ids.update(
+            Event.shared_with.through.objects.filter(event_id=event.id).values_list('customuser_id', flat=True)
+        )
+        group_ids = set()
+        if event.group_id:
+            group_ids.update(
+                Group.members.through.objects.filter(group_id=event.group_id).values_list('customuser_id', flat=True)
+            )
+        return direct_ids, group_ids
+
+    @staticmethod
+    def sync_event(event):
+        """
+        Bring the access rows for a single event in line with its current viewers and times.
+        Returns the set of current viewer ids and the set of user ids that lost access.
+        """
+        direct_ids, group_ids = EventAccessManager._viewers(event)
+        wanted = direct_ids | group_ids
+        existing = set(EventAccess.objects.filter(event_id=event.id).values_list('user_id', flat=True))
+        added = wanted - existing
+        removed = existing - wanted
+
+        with transaction.atomic():
+            if removed:
+                EventAccess.objects.filter(event_id=event.id, user_id__in=removed).delete()
+            EventAccess.objects.filter(event_id=event.id).exclude(
+                start_time=event.start_time, end_time=event.end_time
+            ).update(start_time=event.start_time, end_time=event.end_time)
+            EventAccess.objects.filter(event_id=event.id, user_id__in=direct_ids, direct=False).update(direct=True)
+            EventAccess.objects.filter(event_id=event.id, direct=True).exclude(user_id__in=direct_ids).update(direct=False)
+            EventAccess.objects.bulk_create(
+                [EventAccess(user_id=user_id, event_id=event.id, start_time=event.start_time, end_time=event.end_time,
+                             direct=user_id in direct_ids)
+                 for user_id in added],
+                ignore_conflicts=True
+            )
+            EventChangeLog.record_event(event.id)
+            EventChangeLog.record(removed, event.id, EventChange.REMOVE)
+        AgendaStore.index(
+            (user_id, event.id, event.recurring, event.start_time, event.end_time) for user_id in wanted
+        )
+        AgendaStore.unindex((user_id, event.id) for user_id in removed)
+        return wanted, removed
+
+    @staticmethod
+    def sync_events(event_ids):
+        """
+        Resync a batch of events by id. Returns the ids of every user whose visibility may have changed.
+        """
+        affected = set()
+        for event in Event.objects.filter(id__in=event_ids).only('id', 'created_by_id', 'group_id', 'recurring', 'start_time', 'end_time'):
+            viewers, removed = EventAccessManager.sync_event(event)
+            affected |= viewers | removed
+        return affected
+
+    @staticmethod
+    def grant_group_members(group_id, user_ids):
+        """
+        Give newly added group members access to every event of the group.
+        """
+        if not user_ids:
+            return
+        events = list(Event.objects.filter(group_id=group_id).values_list('id', 'recurring', 'start_time', 'end_time'))
+        with transaction.atomic():
+            EventAccess.objects.bulk_create(
+                [EventAccess(user_id=user_id, event_id=event_id, start_time=start_time, end_time=end_time, direct=False)
+                 for event_id, _, start_time, end_time in events
+                 for user_id in user_ids],
+                ignore_conflicts=True,
+                batch_size=1000
+            )
+            EventChangeLog.record_pairs(
+                ((user_id, event_id) for event_id, _, _, _ in events for user_id in user_ids), EventChange.UPSERT
+            )
+        AgendaStore.index((user_id,) + event for event in events for user_id in user_ids)
+
+    @staticmethod
+    def revoke_group_members(group_id, user_ids):
+        """
+        Remove group-derived access for users who left a group, keeping access they hold
+        as creator or share recipient.
+        """
+        if not user_ids:
+            return
+        shared = Event.shared_with.through.objects.filter(event_id=OuterRef('event_id'), customuser_id=OuterRef('user_id'))
+        revoked = EventAccess.objects.filter(
+            event__group_id=group_id, user_id__in=user_ids
+        ).exclude(
+            Q(event__created_by_id=F('user_id')) | Q(Exists(shared))
+        )
+        with transaction.atomic():
+            rows = list(revoked.values_list('id', 'user_id', 'event_id'))
+            EventAccess.objects.filter(id__in=[row_id for row_id, _, _ in rows]).delete()
+            EventChangeLog.record_pairs(((user_id, event_id) for _, user_id, event_id in rows), EventChange.REMOVE)
+        AgendaStore.unindex((user_id, event_id) for _, user_id, event_id in rows)
+
+    @staticmethod
+    def rebuild(batch_size=500):
+        """
+        Recompute the whole table, one batch of events at a time. Each batch is swapped atomically
+        so readers never see an event without its viewers.
+        """
+        rebuilt = 0
+        last_id = 0
+        while True:
+            batch = list(
+                Event.objects.filter(id__gt=last_id).order_by('id')
+                .values_list('id', 'created_by_id', 'group_id', 'start_time', 'end_time')[:batch_size]
+            )
+            if not batch:
+                break
+            event_ids = [row[0] for row in batch]
+            group_ids = {row[2] for row in batch if row[2]}
+
+            shares = {}
+            for event_id, user_id in Event.shared_with.through.objects.filter(
+                    event_id__in=event_ids).values_list('event_id', 'customuser_id'):
+                shares.setdefault(event_id, set()).add(user_id)
+            members = {}
+            for group_id, user_id in Group.members.through.objects.filter(
+                    group_id__in=group_ids).values_list('group_id', 'customuser_id'):
+                members.setdefault(group_id, set()).add(user_id)
+
+            rows = []
+            for event_id, created_by_id, group_id, start_time, end_time in batch:
+                direct_ids = {created_by_id} | shares.get(event_id, set())
+                user_ids = direct_ids | members.get(group_id, set())
+                rows.extend(
+                    EventAccess(user_id=user_id, event_id=event_id, start_time=start_time, end_time=end_time,
+                                direct=user_id in direct_ids)
+                    for user_id in user_ids
+                )
+
+            with transaction.atomic():
+                EventAccess.objects.filter(event_id__in=event_ids).delete()
+                EventAccess.objects.bulk_create(rows, batch_size=1000)
+
+            rebuilt += len(batch)
+            last_id = event_ids[-1]
+
+        # Agendas are rebuilt from the new rows on their next read.
+        transaction.on_commit(AgendaStore.reset)
+        logger.info(f"Rebuilt event access rows for {rebuilt} events.")
+        return rebuilt
@@ -0,0 +1,146 @@
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import EventAccess, EventChange
+
+logger = logging.getLogger(__name__)
+
+
+class SyncTokenError(Exception):
+    """
+    The sync token is malformed, belongs to another user, or is older than the change log retention.
+    The client has to start over with a full sync.
+    """
+
+
+class EventChangeLog:
+    TOKEN_SALT = 'schedules.event_sync'
+
+    @staticmethod
+    def record_event(event_id):
+        """
+        Log one change of an event, for everyone who can see it when they next sync.
+        """
+        EventChange.objects.create(event_id=event_id, action=EventChange.UPSERT)
+
+    @staticmethod
+    def record(user_ids, event_id, action):
+        """
+        Log one change of an event for every given user.
+        """
+        EventChangeLog.record_pairs(((user_id, event_id) for user_id in user_ids), action)
+
+    @staticmethod
+    def record_pairs(pairs, action):
+        """
+        Log a change for each (user_id, event_id) pair.
+        """
+        EventChange.objects.bulk_create(
+            [EventChange(user_id=user_id, event_id=event_id, action=action) for user_id, event_id in pairs],
+            batch_size=1000
+        )
+
+    @staticmethod
+    def record_deletion(user_ids, event_id):
+        """
+        Log tombstones for a deleted event once the deletion commits. Users deleted in the same
+        transaction (e.g. the creator, when the event goes with them) are skipped.
+        """
+        user_ids = set(user_ids)
+        if not user_ids:
+            return
+
+        def record():
+            existing = get_user_model().objects.filter(id__in=user_ids).values_list('id', flat=True)
+            EventChangeLog.record(existing, event_id, EventChange.REMOVE)
+
+        transaction.on_commit(record)
+
+    @staticmethod
+    def current_cursor():
+        """
+        Cursor for a full sync: the latest settled change (see changes_since).
+        """
+        settled_before = timezone.now() - timedelta(seconds=settings.EVENT_SYNC_SETTLE_SECONDS)
+        changes = EventChange.objects.filter(changed_at__lte=settled_before)
+        return changes.aggregate(cursor=Max('id'))['cursor'] or 0
+
+    @staticmethod
+    def make_token(user, cursor, after=None):
+        """
+        Sign a sync token. `after` is the last event id sent by a full sync still in progress.
+        """
+        payload = {'user': user.pk, 'cursor': cursor}
+        if after is not None:
+            payload['after'] = after
+        return signing.dumps(payload, salt=EventChangeLog.TOKEN_SALT, compress=True)
+
+    @staticmethod
+    def read_token(user, token):
+        """
+        Return the cursor stored in a sync token issued to this user, and the last event id sent
+        if the token continues a full sync (None otherwise).
+        """
+        try:
+            payload = signing.loads(
+                token, salt=EventChangeLog.TOKEN_SALT, max_age=timedelta(days=settings.EVENT_SYNC_RETENTION_DAYS)
+            )
+        except signing.SignatureExpired:
+            raise SyncTokenError("Sync token has expired.")
+        except signing.BadSignature:
+            raise SyncTokenError("Invalid sync token.")
+        after = payload.get('after')
+        if (payload.get('user') != user.pk or not isinstance(payload.get('cursor'), int)
+                or not (after is None or isinstance(after, int))):
+            raise SyncTokenError("Invalid sync token.")
+        return payload['cursor'], after
+
+    @staticmethod
+    def changes_since(user, cursor, limit):
+        """
+        Collapse the user's changes after the cursor into ({event_id: action}, next_cursor, has_more).
+        Those are the user's own access changes plus edits of events the user can currently see.
+        Edits are found from the user's EventAccess rows (event_change_event_cursor), so a sync
+        costs in proportion to the user's events, not to every edit since the cursor.
+
+        Ids are allocated before their transaction commits, so a change may become visible after a
+        higher id already has. The returned cursor therefore stops before the first change newer
+        than EVENT_SYNC_SETTLE_SECONDS; it and what follows are delivered again on the next sync,
+        and has_more stays false until they settle.
+        """
+        own = EventChange.objects.filter(user=user, id__gt=cursor)
+        edits = EventChange.objects.filter(
+            user__isnull=True, id__gt=cursor,
+            event_id__in=EventAccess.objects.filter(user=user).values('event_id'),
+        )
+        fields = ('id', 'event_id', 'action', 'changed_at')
+        changes = list(own.values_list(*fields).union(edits.values_list(*fields), all=True).order_by('id')[:limit + 1])
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+
+        settled_before = timezone.now() - timedelta(seconds=settings.EVENT_SYNC_SETTLE_SECONDS)
+        actions = {}
+        next_cursor = cursor
+        settled = True
+        for change_id, event_id, action, changed_at in changes:
+            actions[event_id] = action
+            settled = settled and changed_at <= settled_before
+            if settled:
+                next_cursor = change_id
+        return actions, next_cursor, has_more and settled
+
+    @staticmethod
+    def prune(older_than_days=None):
+        """
+        Delete change log rows past the retention window. Tokens that old are rejected anyway.
+        """
+        days = older_than_days if older_than_days is not None else settings.EVENT_SYNC_RETENTION_DAYS
+        deleted, _ = EventChange.objects.filter(changed_at__lt=timezone.now() - timedelta(days=days)).delete()
+        logger.info(f"Pruned {deleted} event change log rows older than {days} days.")
+        return deleted
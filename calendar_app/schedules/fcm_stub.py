@@ -0,0 +1,101 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep-alive, like FCM, so connection pooling is visible in benchmarks.
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            return self._reply(400, {'error': 'InvalidJson'})
+        if not (self.headers.get('Authorization') or '').startswith('key='):
+            return self._reply(401, {'error': 'Unauthorized'})
+
+        tokens = payload.get('registration_ids') or ([payload['to']] if payload.get('to') else [])
+        if server.latency:
+            time.sleep(server.latency)
+        results = []
+        for token in tokens:
+            if token.startswith('invalid'):
+                results.append({'error': 'NotRegistered'})
+            elif token.startswith('unavailable'):
+                results.append({'error': 'Unavailable'})
+            elif token.startswith('canonical'):
+                results.append({'message_id': f"0:{uuid.uuid4().hex}", 'registration_id': f"renewed-{token}"})
+            else:
+                results.append({'message_id': f"0:{uuid.uuid4().hex}"})
+
+        with server.stats_lock:
+            server.requests += 1
+            server.messages += len(tokens)
+            server.connections.add(self.client_address)
+        failure = sum(1 for result in results if 'error' in result)
+        self._reply(200, {
+            'multicast_id': int(time.time() * 1000),
+            'success': len(results) - failure,
+            'failure': failure,
+            'canonical_ids': sum(1 for result in results if 'registration_id' in result),
+            'results': results,
+        })
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+class FCMStubServer(ThreadingHTTPServer):
+    """
+    Local stand-in for FCM's legacy HTTP endpoint, for tests and benchmarks. Accepts `to` and
+    `registration_ids` payloads and answers per token: tokens starting with 'invalid' get
+    NotRegistered, 'unavailable' get Unavailable, 'canonical' are delivered with a new
+    registration_id, anything else is delivered. `latency` (seconds)
+    is added to every request. Point FCM_ENDPOINT at `url`.
+    """
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0):
+        super().__init__((host, port), _Handler)
+        self.latency = latency
+        self.stats_lock = threading.Lock()
+        self.requests = 0
+        self.messages = 0
+        self.connections = set()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/fcm/send"
+
+    def start(self):
+        """
+        Serve from a background thread.
+        """
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,55 @@
+import logging
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef, Q
+
+from .models import Group
+from .serializers import GroupListSerializer
+
+logger = logging.getLogger(__name__)
+
+
+def _membership(user):
+    return Exists(Group.members.through.objects.filter(group_id=OuterRef('pk'), customuser_id=user.pk))
+
+
+def groups_joined_by(user):
+    """
+    Groups the user is a member of, filtered with EXISTS so no rows are duplicated.
+    """
+    return Group.objects.filter(_membership(user))
+
+
+def groups_visible_to(user):
+    """
+    Groups the user is a member of plus every public group, without duplicate rows.
+    """
+    return Group.objects.filter(Q(_membership(user)) | Q(is_public=True))
+
+
+class PublicGroupDirectory:
+    """
+    Shared cache of the public group listing. The directory is identical for every user,
+    so it is serialized once and served from the cache until a public group changes.
+    """
+    CACHE_KEY = 'groups:public_directory'
+
+    @staticmethod
+    def get_listing():
+        """
+        Return the serialized public group listing, rebuilding it on a cache miss.
+        """
+        listing = cache.get(PublicGroupDirectory.CACHE_KEY)
+        if listing is None:
+            queryset = Group.objects.filter(is_public=True).order_by('name', 'id')
+            listing = list(GroupListSerializer(queryset, many=True).data)
+            cache.set(PublicGroupDirectory.CACHE_KEY, listing, settings.PUBLIC_GROUP_DIRECTORY_TIMEOUT)
+            logger.debug(f"Rebuilt public group directory with {len(listing)} groups.")
+        return listing
+
+    @staticmethod
+    def invalidate():
+        """
+        Drop the cached listing so the next read rebuilds it.
+        """
+        cache.delete(PublicGroupDirectory.CACHE_KEY)
@@ -1,4 +1,5 @@
 import logging
+from django.db import transaction
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
@@ -21,21 +22,23 @@ class GroupInvitationManager:
             logger.error("Group or user not provided when attempting to send an invitation.")
             raise ValidationError("Group and user are required to send an invitation.")
 
-        if user in group.members.all():
+        if group.members.filter(pk=user.pk).exists():
             logger.warning(f"User {user.username} is already a member of group {group.name}.")
             raise ValidationError("User is already a member of the group.")
 
-        invitation, created = Invitation.objects.get_or_create(
-            sender=group.admin,
-            recipient=user,
-            group=group,
-            invitation_type='group',
-            defaults={'status': 'pending'}
-        )
+        with transaction.atomic():
+            invitation, created = Invitation.objects.get_or_create(
+                sender=group.admin,
+                recipient=user,
+                group=group,
+                invitation_type='group',
+                defaults={'status': 'pending'}
+            )
+            if created:
+                # Queued with the invitation, so a rolled back invitation is never announced
+                NotificationManager(invitation=invitation).send_invitation_notification()
 
         if created:
-            # Send a notification for the newly created invitation
-            NotificationManager().send_event_notification(invitation)
             logger.info(f"Invitation created and notification sent for user {user.username} to join group {group.name}.")
             return invitation
         else:
@@ -60,25 +63,20 @@ class GroupInvitationManager:
             logger.warning(f"Invitation {invitation.id} is no longer pending (current status: {invitation.status}).")
             raise ValidationError("Invitation is no longer pending.")
 
-        invitation.status = response
-        invitation.responded_at = timezone.now()
-        invitation.save()
-
         group = invitation.group
-        if response == 'accepted':
-            group.members.add(invitation.recipient)
-            group.save()
-
-            NotificationManager().send_event_notification(
-                invitation,
-                f"User {invitation.recipient.username} accepted the invitation to join the group '{group.name}'."
+        with transaction.atomic():
+            invitation.status = response
+            invitation.responded_at = timezone.now()
+            invitation.save()
+            if response == 'accepted':
+                group.members.add(invitation.recipient)
+            NotificationManager(invitation=invitation).send_invitation_notification(
+                f"User {invitation.recipient.username} {response} the invitation to join the group '{group.name}'."
             )
+
+        if response == 'accepted':
             logger.info(f"User {invitation.recipient.username} accepted the group invitation {invitation.id}.")
         else:
-            NotificationManager().send_event_notification(
-                invitation,
-                f"User {invitation.recipient.username} declined the invitation to join the group '{group.name}'."
-            )
             logger.info(f"User {invitation.recipient.username} declined the group invitation {invitation.id}.")
 
         return invitation
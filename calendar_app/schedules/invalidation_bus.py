@@ -0,0 +1,201 @@
+import json
+import logging
+import os
+import re
+import select
+import threading
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+# NOTIFY payloads must stay below 8000 bytes.
+MAX_PAYLOAD_BYTES = 7000
+
+
+class InvalidationBus:
+    """
+    Cross-process invalidation of process-local caches over PostgreSQL LISTEN/NOTIFY.
+
+    Caches register a namespace with a handler that evicts keys and one that drops everything.
+    publish() evicts locally right away and sends a NOTIFY in the current transaction, so every
+    process (this one included) evicts again once the change commits and nobody hears about a
+    rolled-back one. Each process runs one listener thread; after a lost connection it resets every
+    registered cache, since notifications sent meanwhile are gone. The thread is started lazily by
+    the first cache write (ensure_listener), so only processes that hold local entries listen.
+    """
+    _handlers = {}
+    _listener = None
+    _stop = None
+    _lock = threading.Lock()
+    _listening = threading.Event()
+
+    @staticmethod
+    def register(namespace, evict, reset):
+        InvalidationBus._handlers[namespace] = (evict, reset)
+
+    @staticmethod
+    def enabled():
+        return settings.INVALIDATION_BUS_ENABLED and settings.DATABASES['default']['ENGINE'].endswith('postgresql')
+
+    @staticmethod
+    def publish(namespace, keys):
+        """
+        Evict keys from the namespace in this process now and in every process on commit.
+        """
+        keys = [str(key) for key in keys]
+        if not keys:
+            return
+        InvalidationBus._dispatch(namespace, keys)
+
+        if not InvalidationBus.enabled():
+            # Single-node setups still need the post-commit eviction for this process.
+            transaction.on_commit(lambda: InvalidationBus._dispatch(namespace, keys))
+            return
+
+        with connection.cursor() as cursor:
+            for payload in InvalidationBus._payloads(namespace, keys):
+                cursor.execute("SELECT pg_notify(%s, %s)", [settings.INVALIDATION_CHANNEL, payload])
+
+    @staticmethod
+    def _payloads(namespace, keys):
+        batch = []
+        for key in keys:
+            candidate = json.dumps({'ns': namespace, 'keys': batch + [key]})
+            if batch and len(candidate.encode('utf-8')) > MAX_PAYLOAD_BYTES:
+                yield json.dumps({'ns': namespace, 'keys': batch})
+                batch = []
+            batch.append(key)
+        if batch:
+            yield json.dumps({'ns': namespace, 'keys': batch})
+
+    @staticmethod
+    def _dispatch(namespace, keys):
+        handlers = InvalidationBus._handlers.get(namespace)
+        if handlers is None:
+            return
+        try:
+            handlers[0](keys)
+        except Exception as e:
+            logger.error(f"Invalidation handler for '{namespace}' failed: {e}")
+
+    @staticmethod
+    def handle_payload(payload):
+        try:
+            message = json.loads(payload)
+            namespace, keys = message['ns'], message['keys']
+        except (ValueError, KeyError, TypeError):
+            logger.warning(f"Ignoring malformed invalidation payload: {payload!r}")
+            return
+        InvalidationBus._dispatch(namespace, keys)
+
+    @staticmethod
+    def reset_all():
+        for namespace, (_, reset) in InvalidationBus._handlers.items():
+            try:
+                reset()
+            except Exception as e:
+                logger.error(f"Invalidation reset for '{namespace}' failed: {e}")
+
+    @staticmethod
+    def _connect():
+        db = settings.DATABASES['default']
+        conn = psycopg2.connect(
+            dbname=db['NAME'], user=db['USER'], password=db['PASSWORD'], host=db['HOST'], port=db['PORT']
+        )
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        channel = settings.INVALIDATION_CHANNEL
+        if not re.fullmatch(r'[A-Za-z_][A-Za-z0-9_]*', channel):
+            raise ValueError(f"Invalid INVALIDATION_CHANNEL '{channel}'.")
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {channel}")
+        return conn
+
+    @staticmethod
+    def _listen(stop):
+        backoff = 1
+        while not stop.is_set():
+            try:
+                conn = InvalidationBus._connect()
+            except Exception as e:
+                logger.error(f"Invalidation listener could not connect: {e}; retrying in {backoff}s.")
+                stop.wait(backoff)
+                backoff = min(backoff * 2, 60)
+                continue
+
+            # Anything published before we were listening, or while we were disconnected, was missed.
+            InvalidationBus.reset_all()
+            InvalidationBus._listening.set()
+            backoff = 1
+            logger.info(f"Invalidation listener {os.getpid()} listening on '{settings.INVALIDATION_CHANNEL}'.")
+
+            try:
+                while not stop.is_set():
+                    if select.select([conn], [], [], settings.INVALIDATION_POLL_SECONDS) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        InvalidationBus.handle_payload(conn.notifies.pop(0).payload)
+            except Exception as e:
+                logger.error(f"Invalidation listener lost its connection: {e}")
+            finally:
+                InvalidationBus._listening.clear()
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+    @staticmethod
+    def ensure_listener():
+        """
+        Cheap check for hot paths: start the listener unless it is already running.
+        """
+        if InvalidationBus._listener is None:
+            InvalidationBus.start_listener()
+
+    @staticmethod
+    def start_listener():
+        """
+        Start this process's listener thread if the bus is enabled and it is not already running.
+        """
+        if not InvalidationBus.enabled():
+            return False
+        with InvalidationBus._lock:
+            if InvalidationBus._listener is not None and InvalidationBus._listener.is_alive():
+                return True
+            InvalidationBus._stop = threading.Event()
+            InvalidationBus._listener = threading.Thread(
+                target=InvalidationBus._listen, args=(InvalidationBus._stop,),
+                name='invalidation-listener', daemon=True
+            )
+            InvalidationBus._listener.start()
+        return True
+
+    @staticmethod
+    def wait_until_listening(timeout=None):
+        return InvalidationBus._listening.wait(timeout)
+
+    @staticmethod
+    def stop_listener(timeout=None):
+        with InvalidationBus._lock:
+            if InvalidationBus._stop is not None:
+                InvalidationBus._stop.set()
+            listener = InvalidationBus._listener
+            InvalidationBus._listener = None
+        if listener is not None and listener.is_alive():
+            listener.join(timeout)
+
+    @staticmethod
+    def _after_fork():
+        # Threads do not survive fork (e.g. gunicorn --preload). Entries inherited from the parent
+        # are dropped, and the child starts its own listener on its first cache write.
+        InvalidationBus._lock = threading.Lock()
+        InvalidationBus._listening = threading.Event()
+        InvalidationBus._listener = None
+        InvalidationBus.reset_all()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=InvalidationBus._after_fork)
@@ -0,0 +1,19 @@
+import time
+from django.core.management.base import BaseCommand
+
+from schedules.reminders import ReminderScheduler
+
+
+class Command(BaseCommand):
+    help = "Enqueue delivery of due event reminders, once or every minute with --loop."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Keep running, dispatching once a minute.")
+
+    def handle(self, *args, **options):
+        while True:
+            dispatched = ReminderScheduler.dispatch()
+            self.stdout.write(f"Dispatched reminders for {dispatched} events.")
+            if not options['loop']:
+                break
+            time.sleep(60 - time.time() % 60)
@@ -0,0 +1,28 @@
+import time
+from django.core.management.base import BaseCommand
+
+from schedules.models import NotificationOutbox
+from schedules.outbox import Outbox
+
+
+class Command(BaseCommand):
+    help = "Deliver pending notification outbox rows, once or continuously with --loop."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--channel', action='append', choices=[channel for channel, _ in NotificationOutbox.CHANNELS],
+            help="Channel to drain; repeat for several. Defaults to all of them."
+        )
+        parser.add_argument('--loop', action='store_true', help="Keep running, draining every --interval seconds.")
+        parser.add_argument('--interval', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        channels = options['channel'] or [channel for channel, _ in NotificationOutbox.CHANNELS]
+        while True:
+            for channel in channels:
+                delivered = Outbox.drain(channel)
+                if delivered:
+                    self.stdout.write(f"Delivered {delivered} {channel} notifications.")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,55 @@
+import time
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from schedules.fcm_stub import FCMStubServer
+from schedules.push_delivery import PushDelivery
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a local FCM stand-in. With --benchmark N, start it in-process instead and time pushing to "
+        "N device tokens through PushDelivery against one request per token."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=9099)
+        parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every request.")
+        parser.add_argument('--benchmark', type=int, default=0, metavar='N', help="Number of device tokens to push to.")
+
+    def handle(self, *args, **options):
+        if options['benchmark']:
+            return self.benchmark(options['benchmark'], options['latency'])
+
+        server = FCMStubServer(options['host'], options['port'], options['latency'])
+        self.stdout.write(f"FCM stub listening on {server.url}; set FCM_ENDPOINT to it.")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"{server.requests} requests, {server.messages} messages, {len(server.connections)} connections.")
+
+    def benchmark(self, count, latency):
+        tokens = [f"device-{i}" for i in range(count)]
+        server = FCMStubServer(latency=latency).start()
+        try:
+            with override_settings(FCM_ENDPOINT=server.url, FCM_SERVER_KEY='benchmark'):
+                started = time.monotonic()
+                for token in tokens:
+                    PushDelivery.send_batch([token], "Benchmark", "Sequential")
+                sequential = time.monotonic() - started
+                sequential_requests = server.requests
+
+                started = time.monotonic()
+                results = PushDelivery.send(tokens, "Benchmark", "Batched")
+                batched = time.monotonic() - started
+        finally:
+            server.stop()
+
+        failed = sum(1 for error in results.values() if error)
+        self.stdout.write(f"one request per token: {sequential:.3f}s, {sequential_requests} requests")
+        self.stdout.write(f"PushDelivery.send:     {batched:.3f}s, {server.requests - sequential_requests} requests, {failed} failed")
+        self.stdout.write(f"{len(server.connections)} connections in total")
@@ -0,0 +1,96 @@
+import multiprocessing
+import queue
+import time
+import uuid
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from schedules.invalidation_bus import InvalidationBus
+from schedules.models import UserProfile
+
+
+def _worker(user_id, timeout, ready, results):
+    """
+    Runs in a fresh process: cache the profile, then wait for another process's save to evict it.
+    """
+    import django
+    django.setup()
+
+    from schedules.invalidation_bus import InvalidationBus
+    from schedules.profile_cache import ProfileCache, _MISSING
+
+    ProfileCache.get(user_id)
+    if not InvalidationBus.wait_until_listening(timeout):
+        ready.put(False)
+        return
+    # Connecting resets every local cache, so load the entry again before reporting ready.
+    ProfileCache.get(user_id)
+    ready.put(True)
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if ProfileCache._lru_get(user_id) is _MISSING:
+            results.put(time.monotonic())
+            return
+        time.sleep(0.005)
+    results.put(None)
+
+
+class Command(BaseCommand):
+    help = (
+        "Start several processes that cache one UserProfile, save it from this process, and check "
+        "that the PostgreSQL invalidation bus evicts it everywhere."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4, help="Number of listening processes.")
+        parser.add_argument('--timeout', type=float, default=10.0, help="Seconds to wait for each step.")
+
+    def handle(self, *args, **options):
+        if not InvalidationBus.enabled():
+            raise CommandError("The invalidation bus needs a PostgreSQL database and INVALIDATION_BUS_ENABLED=True.")
+
+        processes, timeout = options['processes'], options['timeout']
+        suffix = uuid.uuid4().hex[:12]
+        user = get_user_model().objects.create_user(
+            username=f"invalidation-harness-{suffix}", email=f"invalidation-harness-{suffix}@example.invalid"
+        )
+        profile = UserProfile.objects.create(user=user)
+
+        context = multiprocessing.get_context('spawn')
+        ready, results = context.Queue(), context.Queue()
+        workers = [context.Process(target=_worker, args=(user.id, timeout, ready, results)) for _ in range(processes)]
+        try:
+            for worker in workers:
+                worker.start()
+            try:
+                if not all(ready.get(timeout=timeout * 2) for _ in workers):
+                    raise CommandError("A worker could not start listening.")
+            except queue.Empty:
+                raise CommandError("Workers did not report ready in time.")
+
+            published_at = time.monotonic()
+            profile.bio = f"invalidated at {published_at}"
+            profile.save()
+
+            latencies = []
+            for _ in workers:
+                try:
+                    evicted_at = results.get(timeout=timeout * 2)
+                except queue.Empty:
+                    evicted_at = None
+                latencies.append(None if evicted_at is None else evicted_at - published_at)
+        finally:
+            for worker in workers:
+                worker.join(timeout)
+                if worker.is_alive():
+                    worker.terminate()
+            user.delete()
+
+        missed = [latency for latency in latencies if latency is None]
+        for index, latency in enumerate(latencies):
+            status = "missed" if latency is None else f"evicted after {latency * 1000:.1f} ms"
+            self.stdout.write(f"process {index}: {status}")
+        if missed:
+            raise CommandError(f"{len(missed)} of {processes} processes never saw the invalidation.")
+        self.stdout.write(self.style.SUCCESS(f"All {processes} processes evicted the profile."))
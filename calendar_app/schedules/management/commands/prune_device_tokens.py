@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from schedules.push_delivery import PushDelivery
+
+
+class Command(BaseCommand):
+    help = "Delete device tokens deactivated by push feedback that were not registered again within the retention window."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.PUSH_TOKEN_RETENTION_DAYS,
+            help="Keep inactive tokens used in the last N days (defaults to PUSH_TOKEN_RETENTION_DAYS)."
+        )
+
+    def handle(self, *args, **options):
+        deleted = PushDelivery.prune_tokens(older_than_days=options['days'])
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} inactive device tokens."))
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from schedules.event_changes import EventChangeLog
+
+
+class Command(BaseCommand):
+    help = "Delete event sync change log rows older than the retention window."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.EVENT_SYNC_RETENTION_DAYS,
+            help="Keep changes from the last N days (defaults to EVENT_SYNC_RETENTION_DAYS)."
+        )
+
+    def handle(self, *args, **options):
+        deleted = EventChangeLog.prune(older_than_days=options['days'])
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} event change log rows."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from schedules.event_access import EventAccessManager
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized EventAccess table from events, shares and group memberships."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Number of events rebuilt per transaction.")
+
+    def handle(self, *args, **options):
+        rebuilt = EventAccessManager.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt access rows for {rebuilt} events."))
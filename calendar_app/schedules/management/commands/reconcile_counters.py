@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from schedules.counters import CounterCache
+
+
+class Command(BaseCommand):
+    help = "Recount group and user counter caches and correct any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report drift without correcting it.")
+
+    def handle(self, *args, **options):
+        groups, users = CounterCache.reconcile(fix=not options['dry_run'])
+        verb = "Found" if options['dry_run'] else "Corrected"
+        self.stdout.write(self.style.SUCCESS(f"{verb} drifted counters on {groups} groups and {users} users."))
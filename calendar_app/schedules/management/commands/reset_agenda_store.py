@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from schedules.agenda_store import AgendaStore
+
+
+class Command(BaseCommand):
+    help = "Drop agenda store entries so they are rebuilt from EventAccess on the next read."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', help="Only reset this user id (repeatable).")
+
+    def handle(self, *args, **options):
+        if not AgendaStore.enabled():
+            raise CommandError("The agenda store is disabled; set AGENDA_STORE_BACKEND.")
+        if options['user']:
+            AgendaStore.drop_users(options['user'])
+            self.stdout.write(self.style.SUCCESS(f"Reset the agendas of {len(options['user'])} users."))
+        else:
+            AgendaStore.reset()
+            self.stdout.write(self.style.SUCCESS("Reset every agenda."))
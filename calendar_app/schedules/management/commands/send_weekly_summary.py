@@ -0,0 +1,19 @@
+from datetime import date
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from schedules.weekly_summary import WeeklySummary
+
+
+class Command(BaseCommand):
+    help = "Send this week's summary emails, one partition at a time in this process. Rerunning resumes unfinished partitions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--week-start', type=date.fromisoformat, help="First day of the summary window (YYYY-MM-DD). Defaults to today.")
+
+    def handle(self, *args, **options):
+        partition_ids = WeeklySummary.plan(options['week_start'] or timezone.localdate())
+        sent = 0
+        for partition_id in partition_ids:
+            sent += WeeklySummary.send_partition(partition_id)
+        self.stdout.write(f"Sent {sent} weekly summaries from {len(partition_ids)} partitions.")
@@ -0,0 +1,65 @@
+import time
+from django.conf import settings
+from django.core.mail import send_mail
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from schedules.email_delivery import EmailDispatcher
+from schedules.smtp_sink import SMTPSinkServer
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a local SMTP sink. With --benchmark N, start it in-process instead and time sending N "
+        "emails with one send_mail each against EmailDispatcher."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=1025)
+        parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every message.")
+        parser.add_argument('--benchmark', type=int, default=0, metavar='N', help="Number of emails to send.")
+
+    def handle(self, *args, **options):
+        if options['benchmark']:
+            return self.benchmark(options['benchmark'], options['latency'])
+
+        server = SMTPSinkServer(options['host'], options['port'], options['latency'])
+        host, port = server.server_address[:2]
+        self.stdout.write(f"SMTP sink listening on {host}:{port}; set EMAIL_HOST/EMAIL_PORT to it and EMAIL_USE_TLS=False.")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"{len(server.messages)} messages over {server.connections} connections.")
+
+    def benchmark(self, count, latency):
+        recipients = [f"user{i}@example.invalid" for i in range(count)]
+        server = SMTPSinkServer(latency=latency).start()
+        host, port = server.server_address[:2]
+        smtp = {
+            'EMAIL_BACKEND': 'django.core.mail.backends.smtp.EmailBackend',
+            'EMAIL_HOST': host,
+            'EMAIL_PORT': port,
+            'EMAIL_USE_TLS': False,
+            'EMAIL_HOST_USER': None,
+            'EMAIL_HOST_PASSWORD': None,
+        }
+        try:
+            with override_settings(**smtp):
+                started = time.monotonic()
+                for recipient in recipients:
+                    send_mail("Benchmark", "One connection per message", settings.DEFAULT_FROM_EMAIL, [recipient])
+                per_message = time.monotonic() - started
+                per_message_connections = server.connections
+
+                started = time.monotonic()
+                sent = EmailDispatcher.send(EmailDispatcher.message("Benchmark", "Batched", recipient) for recipient in recipients)
+                batched = time.monotonic() - started
+        finally:
+            server.stop()
+
+        self.stdout.write(f"send_mail per message: {per_message:.3f}s, {per_message_connections} connections")
+        self.stdout.write(f"EmailDispatcher.send:  {batched:.3f}s, {server.connections - per_message_connections} connections, {sent} sent")
@@ -0,0 +1,70 @@
+import hashlib
+import logging
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .db_router import has_written, routing_context
+from .profile_cache import ProfileCache
+
+logger = logging.getLogger(__name__)
+
+
+def _client_key(request):
+    """
+    Identify the caller without touching the database. DRF authenticates inside the view,
+    so the JWT is decoded here directly; other credentials are hashed.
+    """
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if header.startswith('Bearer '):
+        try:
+            return f"user:{AccessToken(header.split(' ', 1)[1])[jwt_settings.USER_ID_CLAIM]}"
+        except (TokenError, KeyError):
+            pass
+    if header:
+        return f"auth:{hashlib.sha256(header.encode('utf-8')).hexdigest()}"
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Let safe-method API requests read from replicas, and pin a client to the primary for
+    REPLICA_STICKY_SECONDS after it writes so it always reads its own writes.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'DATABASE_REPLICAS', []):
+            return self.get_response(request)
+
+        client_key = _client_key(request)
+        pin_key = f"db_pin:{client_key}" if client_key else None
+        is_read = request.method in SAFE_METHODS
+        pinned = bool(pin_key) and is_read and cache.get(pin_key) is not None
+
+        with routing_context(read_from_replica=is_read and not pinned):
+            response = self.get_response(request)
+            if pin_key and (not is_read or has_written()):
+                cache.set(pin_key, 1, settings.REPLICA_STICKY_SECONDS)
+        return response
+
+
+class ProfileCacheMiddleware:
+    """
+    Give every request its own profile scope so repeated lookups within it never hit the database twice.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with ProfileCache.request_scope():
+            return self.get_response(request)
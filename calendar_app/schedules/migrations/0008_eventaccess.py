@@ -0,0 +1,94 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_event_access(apps, schema_editor):
+    Event = apps.get_model("schedules", "Event")
+    EventAccess = apps.get_model("schedules", "EventAccess")
+    Group = apps.get_model("schedules", "Group")
+
+    group_members = {}
+    for group_id, user_id in Group.members.through.objects.values_list(
+        "group_id", "customuser_id"
+    ):
+        group_members.setdefault(group_id, set()).add(user_id)
+
+    rows = []
+    for event in Event.objects.prefetch_related("shared_with").iterator(chunk_size=500):
+        direct_ids = {event.created_by_id}
+        direct_ids.update(user.id for user in event.shared_with.all())
+        user_ids = direct_ids | group_members.get(event.group_id, set())
+        rows.extend(
+            EventAccess(
+                user_id=user_id,
+                event_id=event.id,
+                start_time=event.start_time,
+                end_time=event.end_time,
+                direct=user_id in direct_ids,
+            )
+            for user_id in user_ids
+        )
+        if len(rows) >= 1000:
+            EventAccess.objects.bulk_create(rows)
+            rows = []
+    EventAccess.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schedules", "0007_event_event_timezone"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EventAccess",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("start_time", models.DateTimeField()),
+                ("end_time", models.DateTimeField()),
+                ("direct", models.BooleanField(default=True)),
+                (
+                    "event",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="access",
+                        to="schedules.event",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="event_access",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["user", "start_time", "end_time"],
+                        name="event_access_user_range",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "event"), name="unique_event_access"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(populate_event_access, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schedules", "0008_eventaccess"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EventChange",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("event_id", models.BigIntegerField()),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[
+                            ("upsert", "Created or updated"),
+                            ("remove", "Deleted or unshared"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("changed_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="event_changes",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["user", "id"], name="event_change_user_cursor"),
+                    models.Index(
+                        condition=models.Q(("user__isnull", True)),
+                        fields=["event_id", "id"],
+                        name="event_change_event_cursor",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_counters(apps, schema_editor):
+    Event = apps.get_model("schedules", "Event")
+    Group = apps.get_model("schedules", "Group")
+    UserStats = apps.get_model("schedules", "UserStats")
+    Membership = Group.members.through
+
+    member_counts = dict(
+        Membership.objects.values_list("group_id").annotate(total=Count("id"))
+    )
+    event_counts = dict(
+        Event.objects.exclude(group_id=None)
+        .values_list("group_id")
+        .annotate(total=Count("id"))
+    )
+    for group in Group.objects.only("id").iterator(chunk_size=500):
+        Group.objects.filter(id=group.id).update(
+            member_count=member_counts.get(group.id, 0),
+            event_count=event_counts.get(group.id, 0),
+        )
+
+    created = dict(
+        Event.objects.values_list("created_by_id").annotate(total=Count("id"))
+    )
+    joined = dict(
+        Membership.objects.values_list("customuser_id").annotate(total=Count("id"))
+    )
+    UserStats.objects.bulk_create(
+        [
+            UserStats(
+                user_id=user_id,
+                event_count=created.get(user_id, 0),
+                group_count=joined.get(user_id, 0),
+            )
+            for user_id in set(created) | set(joined)
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schedules", "0009_eventchange"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserStats",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("event_count", models.PositiveIntegerField(default=0)),
+                ("group_count", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="group",
+            name="event_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="group",
+            name="member_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+from datetime import timezone as dt_timezone
+
+from django.db import migrations
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+DATETIME_COLUMNS = {
+    "Event": ["start_time", "end_time", "eta", "recurrence_end_date"],
+    "EventAccess": ["start_time", "end_time"],
+    "Availability": ["start_time", "end_time"],
+}
+
+
+def normalize_datetimes(apps, schema_editor):
+    """
+    Rewrite legacy values stored with a UTC offset as plain UTC. Backends with native time zone
+    support (PostgreSQL timestamptz) already store instants, so there is nothing to do there.
+    """
+    connection = schema_editor.connection
+    if connection.features.supports_timezones:
+        return
+
+    quote = connection.ops.quote_name
+    for model_name, fields in DATETIME_COLUMNS.items():
+        model = apps.get_model("schedules", model_name)
+        table = quote(model._meta.db_table)
+        for field in fields:
+            column = quote(model._meta.get_field(field).column)
+            with connection.cursor() as cursor:
+                cursor.execute(f"SELECT id, {column} FROM {table} WHERE {column} IS NOT NULL")
+                rows = cursor.fetchall()
+            updates = []
+            for pk, raw in rows:
+                value = parse_datetime(raw) if isinstance(raw, str) else raw
+                if value is None or timezone.is_naive(value):
+                    continue
+                updates.append((connection.ops.adapt_datetimefield_value(value.astimezone(dt_timezone.utc)), pk))
+            if updates:
+                with connection.cursor() as cursor:
+                    cursor.executemany(f"UPDATE {table} SET {column} = %s WHERE id = %s", updates)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schedules", "0010_counter_caches"),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_datetimes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:37
+
+from django.db import migrations, models
+
+
+def populate_fire_at(apps, schema_editor):
+    # Start from each event's first occurrence; the dispatcher moves recurring reminders
+    # that are already past on to their next occurrence.
+    EventReminder = apps.get_model("schedules", "EventReminder")
+    batch = []
+    for reminder in EventReminder.objects.select_related("event").iterator(chunk_size=1000):
+        reminder.fire_at = reminder.event.start_time - reminder.reminder_time
+        batch.append(reminder)
+        if len(batch) == 1000:
+            EventReminder.objects.bulk_update(batch, ["fire_at"])
+            batch = []
+    if batch:
+        EventReminder.objects.bulk_update(batch, ["fire_at"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schedules", "0011_normalize_datetimes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="eventreminder",
+            name="fire_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="eventreminder",
+            name="sent_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="eventreminder",
+            index=models.Index(
+                condition=models.Q(("sent_at__isnull", True)),
+                fields=["fire_at"],
+                name="event_reminder_due",
+            ),
+        ),
+        migrations.RunPython(populate_fire_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:49
+
+from django.db import migrations, models
+from django.db.models import Count, F
+
+
+def drop_duplicate_tokens(apps, schema_editor):
+    # Keep the most recently used row of each token before making it unique.
+    UserDeviceToken = apps.get_model("schedules", "UserDeviceToken")
+    duplicated = (
+        UserDeviceToken.objects.values("token").annotate(rows=Count("id")).filter(rows__gt=1).values_list("token", flat=True)
+    )
+    for token in duplicated:
+        rows = UserDeviceToken.objects.filter(token=token).order_by("-is_active", "-last_used", "-id")
+        UserDeviceToken.objects.filter(token=token).exclude(id=rows[0].id).delete()
+
+
+def backfill_deactivated_at(apps, schema_editor):
+    # Rows deactivated so far last changed when they were deactivated.
+    UserDeviceToken = apps.get_model("schedules", "UserDeviceToken")
+    UserDeviceToken.objects.filter(is_active=False).update(deactivated_at=F("last_used"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schedules", "0012_event_reminder_fire_at"),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_tokens, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="userdevicetoken",
+            name="token",
+            field=models.CharField(max_length=255, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name="userdevicetoken",
+            index=models.Index(
+                fields=["user", "is_active"], name="device_token_user_active"
+            ),
+        ),
+        migrations.AddField(
+            model_name="userdevicetoken",
+            name="deactivated_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_deactivated_at, migrations.RunPython.noop),
+    ]
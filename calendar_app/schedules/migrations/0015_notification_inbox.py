@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:55
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_unread_counts(apps, schema_editor):
+    Notification = apps.get_model("schedules", "Notification")
+    UserStats = apps.get_model("schedules", "UserStats")
+    unread = dict(
+        Notification.objects.filter(is_read=False).order_by()
+        .values_list("recipient_id")
+        .annotate(total=Count("id"))
+    )
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=user_id) for user_id in unread],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    for user_id, total in unread.items():
+        UserStats.objects.filter(user_id=user_id).update(unread_notification_count=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schedules", "0014_notification_outbox"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userstats",
+            name="unread_notification_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_unread_counts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["recipient", "-created_at", "-id"], name="notification_inbox"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["recipient", "is_read", "-created_at"],
+                name="notification_unread",
+            ),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schedules", "0015_notification_inbox"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="occurrences",
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name="notification",
+            name="topic",
+            field=models.CharField(blank=True, max_length=200),
+        ),
+        migrations.AddField(
+            model_name="notificationoutbox",
+            name="occurrences",
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name="notificationoutbox",
+            name="topic",
+            field=models.CharField(blank=True, max_length=200),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                condition=models.Q(
+                    ("is_read", False), models.Q(("topic", ""), _negated=True)
+                ),
+                fields=["topic", "recipient"],
+                name="notification_digest",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notificationoutbox",
+            index=models.Index(
+                condition=models.Q(
+                    ("attempts", 0),
+                    ("status", "pending"),
+                    models.Q(("topic", ""), _negated=True),
+                ),
+                fields=["topic", "channel", "recipient"],
+                name="outbox_digest",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notificationoutbox",
+            index=models.Index(
+                condition=models.Q(("topic", ""), _negated=True),
+                fields=["topic", "channel", "recipient", "created_at"],
+                name="outbox_digest_recent",
+            ),
+        ),
+    ]
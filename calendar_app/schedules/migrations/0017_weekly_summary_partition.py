@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schedules", "0016_notification_digest"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WeeklySummaryPartition",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("week_start", models.DateField()),
+                ("first_user_id", models.BigIntegerField()),
+                ("last_user_id", models.BigIntegerField()),
+                ("checkpoint_user_id", models.BigIntegerField(blank=True, null=True)),
+                ("sent_count", models.PositiveIntegerField(default=0)),
+                ("leased_until", models.DateTimeField(blank=True, null=True)),
+                ("completed_at", models.DateTimeField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("week_start", "first_user_id"),
+                        name="unique_weekly_summary_partition",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
 from django.utils import timezone
@@ -7,9 +7,33 @@ from django.conf import settings
 import zoneinfo
 from matplotlib.dates import rrule
 
+
+def as_utc(value, tz_name='UTC'):
+    """
+    Aware UTC datetime for value. Naive values are read as wall time in tz_name.
+    """
+    if value is None:
+        return None
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value, zoneinfo.ZoneInfo(tz_name or 'UTC'))
+    return value.astimezone(zoneinfo.ZoneInfo('UTC'))
+
 class CustomUser(AbstractUser):
     email = models.EmailField(unique=True)
 
+class UserStats(models.Model):
+    """
+    Per-user counter rollups maintained by signals; see schedules.counters.
+    Kept off the user row so counter updates never contend with logins.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    event_count = models.PositiveIntegerField(default=0)
+    group_count = models.PositiveIntegerField(default=0)
+    unread_notification_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Stats for user {self.user_id}"
+
 class UserProfile(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='userprofile')
     bio = models.TextField(blank=True)
@@ -44,6 +68,19 @@ class Group(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     default_event_color = models.CharField(max_length=7, default="#007bff")
+    # Counter caches maintained by signals; see schedules.counters.
+    member_count = models.PositiveIntegerField(default=0, editable=False)
+    event_count = models.PositiveIntegerField(default=0, editable=False)
+    COUNTER_FIELDS = ('member_count', 'event_count')
+
+    def save(self, *args, **kwargs):
+        # Updates leave the counters alone, so a stale instance never overwrites the signals' F() updates.
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        return super().save(*args, **kwargs)
 
     def calculate_group_availability(self, start_date, end_date):
         group_availability = {}
@@ -85,6 +122,9 @@ class RecurringSchedule(models.Model):
     is_active = models.BooleanField(default=True)
 
     def generate_events(self, end_date=None, limit=10):
+        # Imported here because profile_cache depends on this module.
+        from .profile_cache import ProfileCache
+
         events = []
         current_date = self.start_date
         end_date = end_date or self.end_date
@@ -99,14 +139,17 @@ class RecurringSchedule(models.Model):
             'YEARLY': timedelta(days=365 * self.interval)
         }
 
+        tz_name = ProfileCache.timezone_name(self.user_id)
+        tz = zoneinfo.ZoneInfo(tz_name)
+
         while current_date <= end_date and len(events) < limit:
             start_dt = timezone.make_aware(
                 timezone.datetime.combine(current_date, self.start_time),
-                timezone=zoneinfo.ZoneInfo(self.user.userprofile.timezone if self.user.userprofile else 'UTC')
+                timezone=tz
             )
             end_dt = timezone.make_aware(
                 timezone.datetime.combine(current_date, self.end_time),
-                timezone=zoneinfo.ZoneInfo(self.user.userprofile.timezone if self.user.userprofile else 'UTC')
+                timezone=tz
             )
 
             event = Event(
@@ -115,14 +158,14 @@ class RecurringSchedule(models.Model):
                 start_time=start_dt,
                 end_time=end_dt,
                 location=self.location,
-                created_by=self.user,
+                created_by_id=self.user_id,
                 recurring=True,
                 recurrence_rule={
                     'frequency': self.frequency,
                     'interval': self.interval,
                 },
                 recurring_schedule=self,
-                event_timezone=self.user.userprofile.timezone if self.user.userprofile else 'UTC'
+                event_timezone=tz_name
             )
             event.save()
             events.append(event)
@@ -155,6 +198,14 @@ class EventReminder(models.Model):
     event = models.ForeignKey('Event', on_delete=models.CASCADE, related_name='reminders')
     reminder_time = models.DurationField(help_text="Time before the event to send the reminder.")
     reminder_type = models.CharField(max_length=20, choices=REMINDER_TYPES)
+    # Maintained by schedules.reminders; for recurring events, the next occurrence's reminder.
+    fire_at = models.DateTimeField(null=True, blank=True, editable=False)
+    sent_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['fire_at'], name='event_reminder_due', condition=models.Q(sent_at__isnull=True)),
+        ]
 
     def __str__(self):
         return f"Reminder for {self.event.title} - {self.get_reminder_type_display()}"
@@ -203,14 +254,16 @@ class Event(models.Model):
 
     def update_eta(self, new_eta):
         if new_eta <= self.start_time:
-            self.eta = new_eta
-            self.save()
-
-            for user in self.shared_with.all():
-                Notification.objects.create(
-                    recipient=user,
-                    notification_type='update',
-                    message=f"The ETA for event '{self.title}' has been updated to {new_eta.strftime('%I:%M %p')}."
+            # Imported here because notification_fanout imports this module.
+            from .notification_fanout import NotificationFanout
+            with transaction.atomic():
+                self.eta = new_eta
+                self.save()
+                NotificationFanout.create(
+                    self.shared_with.values_list('id', flat=True),
+                    'update',
+                    f"The ETA for event '{self.title}' has been updated to {new_eta.strftime('%I:%M %p')}.",
+                    topic=f"eta:{self.id}"
                 )
         else:
             raise ValidationError("ETA cannot be after the event start time.")
@@ -255,12 +308,73 @@ class Event(models.Model):
             raise ValidationError("End time must be after start time")
         
     def save(self, *args, **kwargs):
+        # Stored values are always aware UTC, so readers never have to fix them up.
+        for name in ('start_time', 'end_time', 'eta', 'recurrence_end_date'):
+            value = self._meta.get_field(name).to_python(getattr(self, name))
+            setattr(self, name, as_utc(value, self.event_timezone))
         self.full_clean()
         return super().save(*args, **kwargs)
 
     def __str__(self):
         return self.title
 
+class EventAccess(models.Model):
+    """
+    Denormalized visibility table: one row per user who can see an event, whether as creator,
+    share recipient or group member. Maintained by signals; see schedules.event_access.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='event_access')
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='access')
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+    # False when the user sees the event only through group membership.
+    direct = models.BooleanField(default=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'event'], name='unique_event_access'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'start_time', 'end_time'], name='event_access_user_range'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} can view event {self.event_id}"
+
+
+class EventChange(models.Model):
+    """
+    Change log behind the event delta sync API. The auto-incrementing id is the sync cursor;
+    event_id is a plain column so tombstones outlive the event. Edits are logged once per event
+    with no user and reach whoever can see the event; gaining or losing access is logged per user.
+    See schedules.event_changes.
+    """
+    UPSERT = 'upsert'
+    REMOVE = 'remove'
+    ACTIONS = (
+        (UPSERT, 'Created or updated'),
+        (REMOVE, 'Deleted or unshared'),
+    )
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='event_changes', null=True, blank=True
+    )
+    event_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTIONS)
+    changed_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id'], name='event_change_user_cursor'),
+            models.Index(fields=['event_id', 'id'], condition=models.Q(user__isnull=True), name='event_change_event_cursor'),
+        ]
+
+    def __str__(self):
+        if self.user_id is None:
+            return f"{self.action} event {self.event_id}"
+        return f"{self.action} event {self.event_id} for user {self.user_id}"
+
+
 class Availability(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='availabilities')
     start_time = models.DateTimeField()
@@ -273,6 +387,8 @@ class Availability(models.Model):
             raise ValidationError("End time must be after start time")
 
     def save(self, *args, **kwargs):
+        for name in ('start_time', 'end_time'):
+            setattr(self, name, as_utc(self._meta.get_field(name).to_python(getattr(self, name))))
         self.full_clean()
         return super().save(*args, **kwargs)
 
@@ -354,11 +470,113 @@ class Notification(models.Model):
     message = models.TextField()
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Notifications sharing a topic are coalesced into one unread row (see NotificationDigest).
+    topic = models.CharField(max_length=200, blank=True)
+    occurrences = models.PositiveIntegerField(default=1)
+    # The outbox row this was delivered from, so delivering that row again adds nothing.
+    outbox_id = models.BigIntegerField(null=True, blank=True, unique=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['recipient', '-created_at', '-id'], name='notification_inbox'),
+            models.Index(fields=['recipient', 'is_read', '-created_at'], name='notification_unread'),
+            models.Index(
+                fields=['topic', 'recipient'], name='notification_digest',
+                condition=models.Q(is_read=False) & ~models.Q(topic='')
+            ),
+        ]
 
     def __str__(self):
         return f"Notification for {self.recipient.username}: {self.message[:50]}..."
 
 
+class NotificationOutbox(models.Model):
+    """
+    One pending delivery of a notification on one channel, written in the same transaction as the
+    change that triggers it and drained per channel by schedules.outbox. available_at doubles as
+    the lease of the worker delivering the row and as the retry backoff; for a row that follows
+    another on its topic it also holds the row back for the digest window.
+    """
+    IN_APP = 'in_app'
+    EMAIL = 'email'
+    PUSH = 'push'
+    CHANNELS = (
+        (IN_APP, 'In-App Notification'),
+        (EMAIL, 'Email'),
+        (PUSH, 'Push Notification'),
+    )
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'Pending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    )
+
+    channel = models.CharField(max_length=10, choices=CHANNELS)
+    recipient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='outbox_notifications')
+    notification_type = models.CharField(max_length=20)
+    subject = models.CharField(max_length=255, blank=True)
+    message = models.TextField()
+    dedupe_key = models.CharField(max_length=200, null=True, blank=True)
+    topic = models.CharField(max_length=200, blank=True)
+    occurrences = models.PositiveIntegerField(default=1)
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['channel', 'available_at'], name='outbox_pending', condition=models.Q(status='pending')),
+            models.Index(
+                fields=['topic', 'channel', 'recipient'], name='outbox_digest',
+                condition=models.Q(status='pending', attempts=0) & ~models.Q(topic='')
+            ),
+            models.Index(
+                fields=['topic', 'channel', 'recipient', 'created_at'], name='outbox_digest_recent',
+                condition=~models.Q(topic='')
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['channel', 'recipient', 'dedupe_key'], name='outbox_dedupe',
+                condition=models.Q(dedupe_key__isnull=False)
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_channel_display()} {self.notification_type} for user {self.recipient_id} ({self.status})"
+
+
+class WeeklySummaryPartition(models.Model):
+    """
+    One slice of a weekly summary run: the recipients with ids in [first_user_id, last_user_id],
+    sent by one subtask (see schedules.weekly_summary). checkpoint_user_id is the last recipient
+    whose email went out, so a retried subtask resumes after it; leased_until keeps a second
+    worker off the partition while one is sending.
+    """
+    week_start = models.DateField()
+    first_user_id = models.BigIntegerField()
+    last_user_id = models.BigIntegerField()
+    checkpoint_user_id = models.BigIntegerField(null=True, blank=True)
+    sent_count = models.PositiveIntegerField(default=0)
+    leased_until = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['week_start', 'first_user_id'], name='unique_weekly_summary_partition'),
+        ]
+
+    def __str__(self):
+        return f"Weekly summary {self.week_start} for users {self.first_user_id}-{self.last_user_id}"
+
+
 class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True)
     color = models.CharField(max_length=7, default="#000000")
@@ -385,11 +603,26 @@ class UserDeviceToken(models.Model):
     )
 
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='device_tokens')
-    token = models.CharField(max_length=255)
+    # A user can have any number of devices; each device is identified by its token.
+    token = models.CharField(max_length=255, unique=True)
     device_type = models.CharField(max_length=10, choices=DEVICE_TYPES)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     last_used = models.DateTimeField(auto_now=True)
+    # When the token was last deactivated; inactive tokens are pruned on it.
+    deactivated_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'is_active'], name='device_token_user_active'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.is_active:
+            self.deactivated_at = None
+        elif self.deactivated_at is None:
+            self.deactivated_at = timezone.now()
+        return super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.user.username}'s {self.get_device_type_display()} device"
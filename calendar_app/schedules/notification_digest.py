@@ -0,0 +1,123 @@
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Notification, NotificationOutbox
+from .notification_stream import NotificationStream
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationDigest:
+    """
+    Coalesces repeated notifications on the same topic (e.g. 'eta:<event id>') per recipient. For
+    NOTIFICATION_DIGEST_WINDOW_SECONDS after a recipient's latest one, later notifications replace
+    the message of that unread row, bump its occurrences and move it to the top of the inbox
+    instead of adding rows. Outbox rows with a topic absorb later ones the same way until a worker
+    claims them. The first email or push on a topic goes out right away and what follows within
+    the window waits for it to close, so a burst of changes costs at most two deliveries per
+    recipient and channel. A window of 0 turns digesting off.
+    """
+
+    @staticmethod
+    def enabled(topic):
+        return bool(topic) and settings.NOTIFICATION_DIGEST_WINDOW_SECONDS > 0
+
+    @staticmethod
+    def window():
+        return timedelta(seconds=settings.NOTIFICATION_DIGEST_WINDOW_SECONDS)
+
+    @staticmethod
+    def text(message, occurrences):
+        """
+        The message as sent by email or push, noting how many notifications it stands for.
+        """
+        if occurrences > 1:
+            return f"{message} ({occurrences} updates)"
+        return message
+
+    @staticmethod
+    def merge_in_app(user_ids, notification_type, message, topic, occurrences=1):
+        """
+        Fold a notification (standing for `occurrences` of them) into the recipients' unread ones
+        on the topic from within the window, with one UPDATE that also moves them to the top of the
+        inbox. Returns the user ids that had none and need a new row.
+        """
+        user_ids = list(user_ids)
+        if not user_ids or not NotificationDigest.enabled(topic):
+            return user_ids
+
+        cutoff = timezone.now() - NotificationDigest.window()
+        latest = {}
+        for notification in Notification.objects.filter(
+            topic=topic, recipient_id__in=user_ids, is_read=False, created_at__gte=cutoff
+        ).order_by('created_at', 'id'):
+            latest[notification.recipient_id] = notification
+        if not latest:
+            return user_ids
+
+        merged = list(latest.values())
+        now = timezone.now()
+        with transaction.atomic():
+            Notification.objects.filter(id__in=[notification.id for notification in merged]).update(
+                notification_type=notification_type, message=message, occurrences=F('occurrences') + occurrences,
+                created_at=now
+            )
+            for notification in merged:
+                notification.notification_type = notification_type
+                notification.message = message
+                notification.occurrences += occurrences
+                notification.created_at = now
+            NotificationStream.publish_created(merged)
+        return [user_id for user_id in user_ids if user_id not in latest]
+
+    @staticmethod
+    def merge_outbox(rows, topic):
+        """
+        Fold new outbox rows on the topic into pending ones for the same channel and recipient
+        that no worker has claimed yet. Returns the rows still to insert; those on email and push
+        are held back until the window closes if the recipient already got one on the topic within
+        the window.
+        """
+        if not rows or not NotificationDigest.enabled(topic):
+            return rows
+        template = rows[0]
+
+        with transaction.atomic():
+            # Rows a drain worker is claiming right now are skipped and get a fresh row instead.
+            pending = set(
+                NotificationOutbox.objects.select_for_update(skip_locked=True)
+                .filter(
+                    topic=topic, channel__in={row.channel for row in rows},
+                    recipient_id__in={row.recipient_id for row in rows},
+                    status=NotificationOutbox.PENDING, attempts=0,
+                )
+                .values_list('id', 'channel', 'recipient_id')
+            )
+            if pending:
+                NotificationOutbox.objects.filter(id__in=[row_id for row_id, _, _ in pending]).update(
+                    notification_type=template.notification_type, subject=template.subject,
+                    message=template.message, occurrences=F('occurrences') + 1
+                )
+
+        merged = {(channel, recipient_id) for _, channel, recipient_id in pending}
+        remaining = [row for row in rows if (row.channel, row.recipient_id) not in merged]
+        held = [row for row in remaining if row.channel != NotificationOutbox.IN_APP]
+        if held:
+            now = timezone.now()
+            recent = set(
+                NotificationOutbox.objects.filter(
+                    topic=topic, channel__in={row.channel for row in held},
+                    recipient_id__in={row.recipient_id for row in held},
+                    created_at__gte=now - NotificationDigest.window(),
+                ).values_list('channel', 'recipient_id')
+            )
+            for row in held:
+                if (row.channel, row.recipient_id) in recent:
+                    row.available_at = now + NotificationDigest.window()
+        if merged:
+            logger.info(f"Merged {len(merged)} '{topic}' outbox rows into pending digests.")
+        return remaining
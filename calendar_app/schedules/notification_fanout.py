@@ -0,0 +1,89 @@
+import logging
+from itertools import islice, repeat
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Model
+
+from .models import CustomUser, Notification
+from .notification_digest import NotificationDigest
+from .notification_inbox import NotificationInbox
+
+logger = logging.getLogger(__name__)
+
+
+def _user_id(user):
+    return user.pk if isinstance(user, Model) else user
+
+
+class NotificationFanout:
+    """
+    Creates the same in-app notification for many users at once: recipients and their profiles
+    come from a single query, and the rows are inserted with bulk_create in chunks of
+    NOTIFICATION_BULK_BATCH_SIZE. bulk_create skips save() and signals, so the unread counters
+    and connected clients are updated here (see NotificationInbox).
+    """
+
+    @staticmethod
+    def recipients(users, exclude=()):
+        """
+        The given users or user ids (minus `exclude`) as [(user, profile)], ordered by id.
+        Profile is None for users without one; ids that no longer exist are dropped.
+        """
+        excluded = {_user_id(user) for user in exclude}
+        user_ids = {_user_id(user) for user in users} - excluded
+        user_ids.discard(None)
+        if not user_ids:
+            return []
+
+        recipients = []
+        for user in CustomUser.objects.filter(id__in=user_ids).select_related('userprofile').order_by('id'):
+            recipients.append((user, getattr(user, 'userprofile', None)))
+        if len(recipients) < len(user_ids):
+            logger.warning(f"{len(user_ids) - len(recipients)} notification recipients no longer exist.")
+        return recipients
+
+    @staticmethod
+    def create(users, notification_type, message, topic='', occurrences=1, outbox_ids=None):
+        """
+        Insert one notification per user or user id. With a topic, users who already have a recent
+        unread one on it get that row updated instead (see NotificationDigest); occurrences is how
+        many notifications this one stands for. outbox_ids, when delivering from the outbox, holds
+        each user's outbox row id in the same order. Returns how many were created.
+        """
+        batch_size = settings.NOTIFICATION_BULK_BATCH_SIZE
+        pairs = zip((_user_id(user) for user in users), outbox_ids if outbox_ids is not None else repeat(None))
+        created = 0
+        while True:
+            chunk = list(islice(pairs, batch_size))
+            if not chunk:
+                break
+            unmerged = set(NotificationDigest.merge_in_app(
+                [user_id for user_id, _ in chunk], notification_type, message, topic, occurrences
+            ))
+            chunk = [(user_id, outbox_id) for user_id, outbox_id in chunk if user_id in unmerged]
+            if not chunk:
+                continue
+            notifications = [
+                Notification(
+                    recipient_id=user_id, notification_type=notification_type, message=message,
+                    topic=topic, occurrences=occurrences, outbox_id=outbox_id
+                )
+                for user_id, outbox_id in chunk
+            ]
+            with transaction.atomic():
+                Notification.objects.bulk_create(notifications)
+                NotificationInbox.record_created(notifications)
+            created += len(notifications)
+        return created
+
+    @staticmethod
+    def send(users, notification_type, message, exclude=(), topic=''):
+        """
+        Resolve the recipients and notify them in-app. Returns [(user, profile)] so callers can
+        go on to email and push.
+        """
+        recipients = NotificationFanout.recipients(users, exclude)
+        created = NotificationFanout.create((user for user, _ in recipients), notification_type, message, topic)
+        if created:
+            logger.info(f"Created {created} '{notification_type}' notifications.")
+        return recipients
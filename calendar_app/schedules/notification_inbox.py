@@ -0,0 +1,68 @@
+import logging
+from collections import Counter
+from django.db import transaction
+from django.db.models import Q
+
+from .counters import CounterCache
+from .models import Notification
+from .notification_stream import NotificationStream
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationInbox:
+    """
+    A user's notifications, newest first by (created_at, id), with the unread count kept in
+    UserStats.unread_notification_count so badges never count rows. Bulk writes (bulk_create,
+    update) go through here to keep the counter in step; single-row saves and deletes are
+    covered by signals. CounterCache.reconcile() repairs drift.
+    """
+    ORDERING = ('-created_at', '-id')
+
+    @staticmethod
+    def queryset(user, unread_only=False):
+        notifications = Notification.objects.filter(recipient=user)
+        if unread_only:
+            notifications = notifications.filter(is_read=False)
+        return notifications.order_by(*NotificationInbox.ORDERING)
+
+    @staticmethod
+    def unread_count(user_id):
+        return NotificationInbox.unread_counts([user_id])[user_id]
+
+    @staticmethod
+    def unread_counts(user_ids):
+        return CounterCache.get_unread_counts(user_ids)
+
+    @staticmethod
+    def record_created(notifications):
+        """
+        Account for bulk-created notifications: bump the unread counters and announce them.
+        """
+        unread = Counter(notification.recipient_id for notification in notifications if not notification.is_read)
+        CounterCache.adjust_users(unread, 'unread_notification_count')
+        NotificationStream.publish_created(notifications)
+
+    @staticmethod
+    def mark_read(user, ids=None, up_to=None):
+        """
+        Mark the user's unread notifications read with a single UPDATE: all of them, those in
+        `ids`, or with `up_to` every one at or before that notification in inbox order (the
+        newest one the client has seen). Returns how many changed.
+        """
+        notifications = Notification.objects.filter(recipient=user, is_read=False)
+        if ids is not None:
+            notifications = notifications.filter(id__in=ids)
+        if up_to is not None:
+            cursor = Notification.objects.filter(recipient=user, id=up_to).values_list('created_at', 'id').first()
+            if cursor is None:
+                return 0
+            created_at, cursor_id = cursor
+            notifications = notifications.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lte=cursor_id))
+
+        with transaction.atomic():
+            updated = notifications.update(is_read=True)
+            CounterCache.adjust_users({user.id: -updated}, 'unread_notification_count')
+        if updated:
+            NotificationStream.publish_unread([user.id])
+        return updated
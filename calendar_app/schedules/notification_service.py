@@ -1,76 +1,58 @@
 import logging
-from django.core.mail import send_mail
-from django.conf import settings
-from django.utils import timezone
-import zoneinfo
-from django.core.exceptions import ObjectDoesNotExist
 
-from .models import UserDeviceToken, Notification
-from .utils import send_push_notification
+from .models import Event
+from .notification_fanout import NotificationFanout
+from .outbox import Outbox
 
 logger = logging.getLogger(__name__)
 
 class NotificationManager:
-    def __init__(self, event=None, schedule=None):
+    """
+    Builds notification content and recipients. Delivery (in-app, email, push) goes through the
+    notification outbox, so these calls only write outbox rows in the caller's transaction.
+    """
+    def __init__(self, event=None, schedule=None, invitation=None, work_schedule=None):
         self.event = event
         self.schedule = schedule
+        self.invitation = invitation
+        self.work_schedule = work_schedule
 
     def send_event_notification(self, custom_message=None):
         """
         Send a notification to all users associated with the event via email, in-app, and push notification.
         Optionally accepts a custom_message to override the default event reminder message.
+        Repeated notifications about the event are digested per recipient.
         """
         if not self.event:
             logger.error("Event is required to send event notifications.")
             raise ValueError("Event is required to send notifications")
 
-        users = self.event.shared_with.all()
-        if not users:
+        user_ids = list(self.event.shared_with.values_list('id', flat=True))
+        if not user_ids:
             logger.info(f"No users to notify for event {self.event.id}")
             return
 
-        # Ensure event times are aware
-        if self.event.start_time and timezone.is_naive(self.event.start_time):
-            tz = zoneinfo.ZoneInfo(self.event.event_timezone if self.event.event_timezone else 'UTC')
-            self.event.start_time = timezone.make_aware(self.event.start_time, tz)
-
         message = custom_message or f"Reminder: Event '{self.event.title}' is starting at {self.event.start_time}."
+        recipients = NotificationFanout.recipients(user_ids)
+        self._warn_missing_profiles(recipients)
+        Outbox.add(
+            recipients, 'reminder', message, subject=f"Event Reminder: {self.event.title}",
+            topic=f"event:{self.event.id}"
+        )
+
+    def send_event_reminder(self, dedupe_key=None):
+        """
+        Remind the event's owner and everyone it is shared with that it is about to start.
+        """
+        if not self.event:
+            logger.error("Event is required to send event reminders.")
+            raise ValueError("Event is required to send reminders")
 
-        for user in users:
-            Notification.objects.create(
-                recipient=user,
-                notification_type='reminder',
-                message=message
-            )
-
-            # Safely attempt to access userprofile to avoid errors
-            try:
-                profile = user.userprofile
-            except ObjectDoesNotExist:
-                logger.warning(f"UserProfile does not exist for user {user.username}")
-                continue
-
-            if profile.email_notifications and user.email:
-                try:
-                    send_mail(
-                        subject=f"Event Reminder: {self.event.title}",
-                        message=message,
-                        from_email=settings.DEFAULT_FROM_EMAIL,
-                        recipient_list=[user.email],
-                        fail_silently=False,
-                    )
-                    logger.info(f"Email notification sent to {user.email} for event {self.event.id}")
-                except Exception as e:
-                    logger.error(f"Failed to send email to {user.email}: {e}")
-
-            if profile.push_notifications:
-                device_tokens = UserDeviceToken.objects.filter(user=user, is_active=True)
-                for token in device_tokens:
-                    try:
-                        send_push_notification(token.token, "Event Reminder", message)
-                        logger.info(f"Push notification sent to {user.username}'s device {token.token}")
-                    except Exception as e:
-                        logger.error(f"Failed to send push notification to {user.username}: {e}")
+        user_ids = [self.event.created_by_id] + list(self.event.shared_with.values_list('id', flat=True))
+        message = f"Reminder: '{self.event.title}' starts at {self.event.start_time.strftime('%I:%M %p')}."
+        recipients = NotificationFanout.recipients(user_ids)
+        self._warn_missing_profiles(recipients)
+        Outbox.add(recipients, 'reminder', message, subject=f"Event Reminder: {self.event.title}", dedupe_key=dedupe_key)
 
     def send_schedule_change_notification(self):
         """
@@ -83,57 +65,71 @@ class NotificationManager:
         # Attempting to find all users associated with the schedule's events
         # It's not always clear how users are associated with a recurring schedule.
         # Here, we assume users are associated via events created from that schedule.
-        events = self.schedule.events.all()
-        user_ids = set()
-
-        for event in events:
-            # Add created_by and shared_with users
-            user_ids.add(event.created_by_id)
-            user_ids.update(user.id for user in event.shared_with.all())
+        user_ids = set(self.schedule.events.values_list('created_by_id', flat=True))
+        user_ids.update(
+            Event.shared_with.through.objects.filter(event__recurring_schedule=self.schedule)
+            .values_list('customuser_id', flat=True)
+        )
 
         if not user_ids:
             logger.info(f"No users to notify for schedule {self.schedule.id}")
             return
 
         message = f"Recurring schedule '{self.schedule.title}' has been updated."
-
-        for user_id in user_ids:
-            try:
-                user = self.schedule.user.__class__.objects.get(id=user_id)
-            except ObjectDoesNotExist:
-                logger.warning(f"User with id {user_id} does not exist.")
-                continue
-
-            Notification.objects.create(
-                recipient=user,
-                notification_type='schedule_change',
-                message=message
+        recipients = NotificationFanout.recipients(user_ids)
+        self._warn_missing_profiles(recipients)
+        Outbox.add(
+            recipients, 'schedule_change', message,
+            subject=f"Schedule Change Notification: {self.schedule.title}",
+            topic=f"schedule:{self.schedule.id}"
+        )
+
+    def send_work_schedule_change_notification(self):
+        """
+        Notify the owner of a work schedule that it has changed.
+        """
+        if not self.work_schedule:
+            logger.error("Work schedule is required to send work schedule change notifications.")
+            raise ValueError("Work schedule is required to send work schedule change notifications")
+
+        day = self.work_schedule.get_day_of_week_display()
+        message = f"Your {day} work schedule has been updated."
+        recipients = NotificationFanout.recipients([self.work_schedule.user_id])
+        self._warn_missing_profiles(recipients)
+        Outbox.add(
+            recipients, 'schedule_change', message, subject=f"Schedule Change Notification: {day}",
+            topic=f"work_schedule:{self.work_schedule.id}"
+        )
+
+    def send_invitation_notification(self, custom_message=None):
+        """
+        Tell the recipient of a pending group invitation about it, or its sender how it was answered.
+        """
+        if not self.invitation:
+            logger.error("Invitation is required to send invitation notifications.")
+            raise ValueError("Invitation is required to send invitation notifications")
+
+        invitation = self.invitation
+        if invitation.status == 'pending':
+            user_id = invitation.recipient_id
+            message = custom_message or (
+                f"{invitation.sender.username} invited you to join the group '{invitation.group.name}'."
             )
-
-            try:
-                profile = user.userprofile
-            except ObjectDoesNotExist:
-                logger.warning(f"UserProfile does not exist for user {user.username}")
-                continue
-
-            if profile.email_notifications and user.email:
-                try:
-                    send_mail(
-                        subject=f"Schedule Change Notification: {self.schedule.title}",
-                        message=message,
-                        from_email=settings.DEFAULT_FROM_EMAIL,
-                        recipient_list=[user.email],
-                        fail_silently=False,
-                    )
-                    logger.info(f"Email notification sent to {user.email} for schedule {self.schedule.id}")
-                except Exception as e:
-                    logger.error(f"Failed to send email to {user.email}: {e}")
-
-            if profile.push_notifications:
-                device_tokens = UserDeviceToken.objects.filter(user=user, is_active=True)
-                for token in device_tokens:
-                    try:
-                        send_push_notification(token.token, "Schedule Change", message)
-                        logger.info(f"Push notification sent to {user.username}'s device {token.token}")
-                    except Exception as e:
-                        logger.error(f"Failed to send push notification to {user.username}: {e}")
+        else:
+            user_id = invitation.sender_id
+            message = custom_message or (
+                f"{invitation.recipient.username} {invitation.status} the invitation to join the group "
+                f"'{invitation.group.name}'."
+            )
+        recipients = NotificationFanout.recipients([user_id])
+        self._warn_missing_profiles(recipients)
+        Outbox.add(
+            recipients, 'invitation', message, subject=f"Group Invitation: {invitation.group.name}",
+            dedupe_key=f"invitation:{invitation.id}:{invitation.status}"
+        )
+
+    @staticmethod
+    def _warn_missing_profiles(recipients):
+        for user, profile in recipients:
+            if profile is None:
+                logger.warning(f"UserProfile does not exist for user {user.username}; sending in-app only.")
@@ -0,0 +1,78 @@
+import logging
+from collections import defaultdict
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from .counters import CounterCache
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationStream:
+    """
+    Pushes in-app notification changes to each recipient's channel group, which NotificationConsumer
+    relays over WebSocket. Messages go out once the writing transaction commits, one per user per
+    write (however many notifications it created), and always carry the user's current unread
+    count. Publishing is best effort: without a channel layer, or if it fails, clients just catch
+    up on their next fetch.
+    """
+    GROUP_NAME = 'notifications_{user_id}'
+
+    @staticmethod
+    def group_name(user_id):
+        return NotificationStream.GROUP_NAME.format(user_id=user_id)
+
+    @staticmethod
+    def publish_created(notifications):
+        """
+        Announce new or digest-updated notifications (saved instances with ids) to their recipients.
+        """
+        by_user = defaultdict(list)
+        for notification in notifications:
+            if notification.pk is not None:
+                by_user[notification.recipient_id].append({
+                    'id': notification.pk,
+                    'recipient': notification.recipient_id,
+                    'notification_type': notification.notification_type,
+                    'message': notification.message,
+                    'is_read': notification.is_read,
+                    'topic': notification.topic,
+                    'occurrences': notification.occurrences,
+                    'created_at': notification.created_at.isoformat() if notification.created_at else None,
+                })
+        if by_user:
+            transaction.on_commit(lambda: NotificationStream._send('notification.created', by_user))
+
+    @staticmethod
+    def publish_unread(user_ids):
+        """
+        Announce that the unread count of these users changed, e.g. after marking notifications read.
+        """
+        user_ids = set(user_ids)
+        if user_ids:
+            transaction.on_commit(lambda: NotificationStream._send('notification.unread', {user_id: [] for user_id in user_ids}))
+
+    @staticmethod
+    def _send(message_type, by_user):
+        try:
+            channel_layer = get_channel_layer()
+            if channel_layer is None:
+                return
+            counts = CounterCache.get_unread_counts(list(by_user))
+            messages = [
+                (NotificationStream.group_name(user_id), {
+                    'type': message_type,
+                    'notifications': notifications,
+                    'unread_count': counts[user_id],
+                })
+                for user_id, notifications in by_user.items()
+            ]
+            async_to_sync(NotificationStream._group_send_all)(channel_layer, messages)
+        except Exception as e:
+            logger.warning(f"Could not publish {message_type} to {len(by_user)} users: {e}")
+
+    @staticmethod
+    async def _group_send_all(channel_layer, messages):
+        for group, message in messages:
+            await channel_layer.group_send(group, message)
@@ -0,0 +1,271 @@
+import logging
+import time
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Notification, NotificationOutbox
+from .notification_digest import NotificationDigest
+from .notification_fanout import NotificationFanout
+from .email_delivery import EmailDispatcher
+from .push_delivery import PushDelivery
+
+logger = logging.getLogger(__name__)
+
+
+class Outbox:
+    """
+    Transactional outbox for notification side effects. Callers queue rows with add() inside the
+    transaction that triggers them, so nothing is sent for a change that rolls back and a request
+    never waits on SMTP or FCM. Per-channel workers (drain) claim due rows with
+    SELECT ... FOR UPDATE SKIP LOCKED, deliver them in batches and retry failures with backoff.
+    Each channel has its own rate limit (OUTBOX_CHANNEL_RATE) and at most
+    OUTBOX_CHANNEL_CONCURRENCY workers at a time. A row with a dedupe_key is queued at most once
+    per channel and recipient; rows with a topic are digested (see NotificationDigest).
+    """
+    SLOT_KEY = 'outbox:slot:{channel}:{index}'
+    RATE_KEY = 'outbox:rate:{channel}:{window}'
+
+    @staticmethod
+    def add(recipients, notification_type, message, subject='', dedupe_key=None, topic=''):
+        """
+        Queue a notification for [(user, profile)] recipients (see NotificationFanout.recipients):
+        in-app for everyone, email and push as their profile allows. With a topic, email and push
+        are digested (see NotificationDigest). Workers are woken once the current transaction
+        commits. Returns the number of rows written.
+        """
+        rows = []
+        for user, profile in recipients:
+            channels = [NotificationOutbox.IN_APP]
+            if profile is not None:
+                if profile.email_notifications and user.email:
+                    channels.append(NotificationOutbox.EMAIL)
+                if profile.push_notifications:
+                    channels.append(NotificationOutbox.PUSH)
+            rows.extend(
+                NotificationOutbox(
+                    channel=channel, recipient_id=user.id, notification_type=notification_type,
+                    subject=subject, message=message, dedupe_key=dedupe_key, topic=topic
+                )
+                for channel in channels
+            )
+        rows = NotificationDigest.merge_outbox(rows, topic)
+        if not rows:
+            return 0
+
+        NotificationOutbox.objects.bulk_create(
+            rows, batch_size=settings.NOTIFICATION_BULK_BATCH_SIZE, ignore_conflicts=dedupe_key is not None
+        )
+        now = timezone.now()
+        channels = {row.channel for row in rows if row.available_at <= now}
+        held = {row.channel for row in rows if row.available_at > now}
+        transaction.on_commit(lambda: Outbox.wake(channels))
+        if held:
+            delay = settings.NOTIFICATION_DIGEST_WINDOW_SECONDS
+            transaction.on_commit(lambda: Outbox.wake(held, countdown=delay))
+        return len(rows)
+
+    @staticmethod
+    def wake(channels, countdown=None):
+        """
+        Start a drain task per channel, after `countdown` seconds if given. Rows stay queued for
+        the next drain if the broker is down.
+        """
+        # Imported here because tasks imports this module.
+        from .tasks import drain_notification_outbox
+
+        for channel in channels:
+            try:
+                drain_notification_outbox.apply_async((channel,), countdown=countdown)
+            except Exception as e:
+                logger.warning(f"Could not enqueue a drain of the {channel} outbox: {e}")
+
+    @staticmethod
+    def drain(channel):
+        """
+        Deliver the channel's due rows until none are left. Returns how many were delivered, or 0
+        right away if the channel already has OUTBOX_CHANNEL_CONCURRENCY workers draining it.
+        """
+        slot = Outbox._acquire_slot(channel)
+        if slot is None:
+            return 0
+        delivered = 0
+        try:
+            while True:
+                rows = Outbox.claim(channel)
+                if not rows:
+                    break
+                Outbox._throttle(channel, len(rows))
+                delivered += Outbox.deliver(channel, rows)
+                cache.set(slot[0], slot[1], settings.OUTBOX_LEASE_SECONDS)
+        finally:
+            if cache.get(slot[0]) == slot[1]:
+                cache.delete(slot[0])
+        if delivered:
+            logger.info(f"Delivered {delivered} {channel} notifications from the outbox.")
+        return delivered
+
+    @staticmethod
+    def claim(channel):
+        """
+        Lease one batch of due rows to this worker for OUTBOX_LEASE_SECONDS. A worker that dies
+        mid-batch leaves its rows to be picked up again when the lease runs out.
+        """
+        now = timezone.now()
+        limit = settings.OUTBOX_BATCH_SIZE
+        rate = settings.OUTBOX_CHANNEL_RATE.get(channel)
+        if rate:
+            limit = min(limit, rate)
+        with transaction.atomic():
+            rows = list(
+                NotificationOutbox.objects.select_for_update(skip_locked=True, of=('self',))
+                .select_related('recipient')
+                .filter(channel=channel, status=NotificationOutbox.PENDING, available_at__lte=now)
+                .order_by('available_at', 'id')[:limit]
+            )
+            lease_until = now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+            for row in rows:
+                row.attempts += 1
+                row.available_at = lease_until
+            NotificationOutbox.objects.bulk_update(rows, ['attempts', 'available_at'])
+        return rows
+
+    @staticmethod
+    def deliver(channel, rows):
+        """
+        Send claimed rows on their channel and record the outcome. Returns how many were sent.
+        """
+        handler = {
+            NotificationOutbox.IN_APP: Outbox._deliver_in_app,
+            NotificationOutbox.EMAIL: Outbox._deliver_email,
+            NotificationOutbox.PUSH: Outbox._deliver_push,
+        }[channel]
+        try:
+            if channel == NotificationOutbox.IN_APP:
+                # Notifications and the rows' status commit together, so a retry never repeats one.
+                with transaction.atomic():
+                    return Outbox._record(rows, handler(rows))
+            errors = handler(rows)
+        except Exception as e:
+            logger.error(f"Delivering {len(rows)} {channel} notifications failed: {e}")
+            errors = {row.id: str(e) or e.__class__.__name__ for row in rows}
+        return Outbox._record(rows, errors)
+
+    @staticmethod
+    def _deliver_in_app(rows):
+        # A row whose lease ran out mid-delivery may have been delivered by another worker already.
+        delivered = set(
+            Notification.objects.filter(outbox_id__in=[row.id for row in rows]).values_list('outbox_id', flat=True)
+        )
+        groups = defaultdict(list)
+        for row in rows:
+            if row.id not in delivered:
+                groups[(row.notification_type, row.message, row.topic, row.occurrences)].append(row)
+        for (notification_type, message, topic, occurrences), group in groups.items():
+            NotificationFanout.create(
+                [row.recipient_id for row in group], notification_type, message, topic, occurrences,
+                outbox_ids=[row.id for row in group]
+            )
+        return {}
+
+    @staticmethod
+    def _deliver_email(rows):
+        messages = [
+            EmailDispatcher.message(row.subject, NotificationDigest.text(row.message, row.occurrences), row.recipient.email)
+            for row in rows
+        ]
+        errors = {}
+        for start in range(0, len(rows), settings.EMAIL_BATCH_SIZE):
+            batch = messages[start:start + settings.EMAIL_BATCH_SIZE]
+            for row, error in zip(rows[start:], EmailDispatcher.deliver(batch)):
+                if error:
+                    errors[row.id] = error
+        return errors
+
+    @staticmethod
+    def _deliver_push(rows):
+        # Transient token failures are retried inside PushDelivery first; a row fails when its
+        # recipient still got nothing.
+        groups = defaultdict(list)
+        for row in rows:
+            groups[(row.subject, NotificationDigest.text(row.message, row.occurrences))].append(row)
+        errors = {}
+        for (title, message), group in groups.items():
+            failures = PushDelivery.send_to_users({row.recipient_id for row in group}, title, message)
+            errors.update((row.id, failures[row.recipient_id]) for row in group if row.recipient_id in failures)
+        return errors
+
+    @staticmethod
+    def _record(rows, errors):
+        """
+        Mark delivered rows sent; reschedule failed ones with exponential backoff, or give up
+        after OUTBOX_MAX_ATTEMPTS.
+        """
+        now = timezone.now()
+        sent_ids = [row.id for row in rows if row.id not in errors]
+        if sent_ids:
+            NotificationOutbox.objects.filter(id__in=sent_ids).update(
+                status=NotificationOutbox.SENT, sent_at=now, last_error=''
+            )
+
+        failed = [row for row in rows if row.id in errors]
+        for row in failed:
+            row.last_error = errors[row.id][:1000]
+            if row.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                row.status = NotificationOutbox.FAILED
+                logger.error(f"Giving up on {row.channel} notification {row.id} after {row.attempts} attempts: {row.last_error}")
+            else:
+                row.available_at = now + timedelta(seconds=settings.OUTBOX_RETRY_BACKOFF_SECONDS * 2 ** (row.attempts - 1))
+        if failed:
+            NotificationOutbox.objects.bulk_update(failed, ['status', 'available_at', 'last_error'])
+        return len(sent_ids)
+
+    @staticmethod
+    def _acquire_slot(channel):
+        """
+        One of the channel's concurrency slots as (key, token), or None if all are taken.
+        """
+        token = uuid.uuid4().hex
+        for index in range(settings.OUTBOX_CHANNEL_CONCURRENCY.get(channel, 1)):
+            key = Outbox.SLOT_KEY.format(channel=channel, index=index)
+            if cache.add(key, token, settings.OUTBOX_LEASE_SECONDS):
+                return key, token
+        return None
+
+    @staticmethod
+    def _throttle(channel, count):
+        """
+        Wait until `count` more messages fit in the channel's per-second budget, shared by all
+        workers through the cache.
+        """
+        rate = settings.OUTBOX_CHANNEL_RATE.get(channel)
+        if not rate:
+            return
+        while True:
+            window = int(time.time())
+            key = Outbox.RATE_KEY.format(channel=channel, window=window)
+            cache.add(key, 0, 2)
+            try:
+                used = cache.incr(key, count)
+            except ValueError:
+                used = count
+            if used <= rate:
+                return
+            time.sleep(max(window + 1 - time.time(), 0))
+
+    @staticmethod
+    def prune(older_than_days=None):
+        """
+        Delete sent and failed rows past the retention window.
+        """
+        days = older_than_days if older_than_days is not None else settings.OUTBOX_RETENTION_DAYS
+        deleted, _ = NotificationOutbox.objects.filter(
+            status__in=[NotificationOutbox.SENT, NotificationOutbox.FAILED],
+            created_at__lt=timezone.now() - timedelta(days=days)
+        ).delete()
+        logger.info(f"Pruned {deleted} outbox rows older than {days} days.")
+        return deleted
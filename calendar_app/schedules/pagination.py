@@ -0,0 +1,155 @@
+import hashlib
+import json
+import logging
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_count(queryset):
+    """
+    Planner estimate of the queryset's row count on PostgreSQL: pg_class.reltuples for an
+    unfiltered table, the EXPLAIN row estimate otherwise. Small estimates are unreliable, so
+    anything under PAGINATION_EXACT_COUNT_BELOW (and any other database) gets a real count.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    try:
+        with connection.cursor() as cursor:
+            if not queryset.query.where and not queryset.query.distinct:
+                cursor.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass", [queryset.model._meta.db_table])
+                row = cursor.fetchone()
+                estimate = row[0] if row else -1
+            else:
+                sql, params = queryset.order_by().query.sql_with_params()
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                estimate = plan[0]['Plan']['Plan Rows']
+    except EmptyResultSet:
+        return 0
+
+    # reltuples is -1 for a table that was never analyzed.
+    if estimate < settings.PAGINATION_EXACT_COUNT_BELOW:
+        return queryset.count()
+    return int(estimate)
+
+
+def cached_count(queryset):
+    """
+    Exact count, cached for PAGINATION_COUNT_CACHE_SECONDS per distinct query.
+    """
+    try:
+        sql, params = queryset.order_by().query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    digest = hashlib.sha1(f"{queryset.db}:{sql}:{params!r}".encode('utf-8')).hexdigest()
+    key = f"pagination_count:{digest}"
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, settings.PAGINATION_COUNT_CACHE_SECONDS)
+    return count
+
+
+class CountFreePagination(PageNumberPagination):
+    """
+    Page number pagination that avoids COUNT(*) on every page. One extra row is fetched to tell
+    whether a next page exists, and 'count' comes from count_mode:
+
+    - 'none': no count (null in the response)
+    - 'estimate': planner estimate on PostgreSQL (see estimate_count)
+    - 'cached': exact count, cached briefly (see cached_count)
+    - 'exact': plain PageNumberPagination
+
+    The response keeps the usual count/next/previous/results shape. Subclasses set count_mode;
+    it defaults to PAGINATION_COUNT_MODE.
+    """
+    count_mode = None
+
+    def get_count_mode(self):
+        return self.count_mode or settings.PAGINATION_COUNT_MODE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.get_count_mode() == 'exact':
+            self.page_number = None
+            return super().paginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        self.request = request
+        try:
+            self.page_number = int(request.query_params.get(self.page_query_param, 1))
+            if self.page_number < 1:
+                raise ValueError
+        except ValueError:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=request.query_params.get(self.page_query_param), message="Invalid page."
+            ))
+
+        offset = (self.page_number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        self.has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        if not rows and self.page_number > 1:
+            raise NotFound(self.invalid_page_message.format(page_number=self.page_number, message="That page contains no results"))
+
+        self.count = self.get_count(queryset, offset + len(rows))
+        self.display_page_controls = False
+        return rows
+
+    def get_count(self, queryset, seen):
+        if not isinstance(queryset, QuerySet):
+            return len(queryset)
+        if not self.has_next:
+            # The last page tells us the exact total for free.
+            return seen
+        mode = self.get_count_mode()
+        if mode == 'estimate':
+            count = estimate_count(queryset)
+        elif mode == 'cached':
+            count = cached_count(queryset)
+        else:
+            return None
+        # Estimates and cached counts can lag behind; never report fewer rows than we know exist.
+        return max(count, seen + 1)
+
+    def get_paginated_response(self, data):
+        if self.page_number is None:
+            return super().get_paginated_response(data)
+        return Response({
+            'count': self.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if self.page_number is None:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.page_number is None:
+            return super().get_previous_link()
+        if self.page_number <= 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
@@ -0,0 +1,63 @@
+import logging
+from django.db.models import Model
+
+from .models import Group, Event
+
+logger = logging.getLogger(__name__)
+
+
+def _pk(obj):
+    return obj.pk if isinstance(obj, Model) else obj
+
+
+class PermissionResolver:
+    """
+    Request-scoped answers to "is this user a member of group X" and "can this user see event Y".
+    Each check is an indexed exists() lookup on the through table, memoized for the rest of the
+    request.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.user_id = user.pk if user is not None and user.is_authenticated else None
+        self._group_membership = {}
+        self._event_shares = {}
+
+    @staticmethod
+    def for_request(request):
+        """
+        Resolver for the request's user, shared by every permission class and view that handles it.
+        """
+        http_request = getattr(request, '_request', request)
+        resolver = getattr(http_request, '_permission_resolver', None)
+        user = getattr(request, 'user', None)
+        user_id = user.pk if user is not None and user.is_authenticated else None
+        if resolver is None or resolver.user_id != user_id:
+            resolver = PermissionResolver(user)
+            http_request._permission_resolver = resolver
+        return resolver
+
+    def is_group_member(self, group):
+        group_id = _pk(group)
+        if self.user_id is None or group_id is None:
+            return False
+        if group_id not in self._group_membership:
+            self._group_membership[group_id] = Group.members.through.objects.filter(
+                group_id=group_id, customuser_id=self.user_id
+            ).exists()
+        return self._group_membership[group_id]
+
+    def is_shared_with(self, event):
+        event_id = _pk(event)
+        if self.user_id is None or event_id is None:
+            return False
+        if event_id not in self._event_shares:
+            self._event_shares[event_id] = Event.shared_with.through.objects.filter(
+                event_id=event_id, customuser_id=self.user_id
+            ).exists()
+        return self._event_shares[event_id]
+
+    def is_event_owner_or_shared(self, event):
+        if self.user_id is None:
+            return False
+        return event.created_by_id == self.user_id or self.is_shared_with(event)
@@ -1,6 +1,7 @@
 import logging
 from rest_framework import permissions
 from .models import Group, Event
+from .permission_resolver import PermissionResolver
 
 logger = logging.getLogger(__name__)
 
@@ -11,7 +12,7 @@ class IsEventOwnerOrShared(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
         if isinstance(obj, Event):
-            if obj.created_by == request.user or request.user in obj.shared_with.all():
+            if PermissionResolver.for_request(request).is_event_owner_or_shared(obj):
                 return True
             logger.warning(f"User {request.user.username} is neither owner nor shared_with for event {obj.id}.")
         return False
@@ -23,15 +24,16 @@ class IsGroupMember(permissions.BasePermission):
     """
 
     def has_object_permission(self, request, view, obj):
+        resolver = PermissionResolver.for_request(request)
         if isinstance(obj, Group):
-            is_member = request.user in obj.members.all()
+            is_member = resolver.is_group_member(obj)
             if not is_member:
                 logger.warning(f"User {request.user.username} is not a member of group {obj.id}.")
             return is_member
-        elif hasattr(obj, 'group') and obj.group:
-            is_member = request.user in obj.group.members.all()
+        elif getattr(obj, 'group_id', None):
+            is_member = resolver.is_group_member(obj.group_id)
             if not is_member:
-                logger.warning(f"User {request.user.username} is not a member of group {obj.group.id}.")
+                logger.warning(f"User {request.user.username} is not a member of group {obj.group_id}.")
             return is_member
         return False
 
@@ -70,8 +72,12 @@ class CanViewGroupEvents(permissions.BasePermission):
     def has_permission(self, request, view):
         group_id = view.kwargs.get('group_id')
         if group_id:
-            group = Group.objects.filter(id=group_id).first()
-            if group and request.user in group.members.all():
+            try:
+                group_id = int(group_id)
+            except (TypeError, ValueError):
+                logger.warning(f"User {request.user.username} requested events of invalid group id {group_id!r}.")
+                return False
+            if PermissionResolver.for_request(request).is_group_member(group_id):
                 return True
             logger.warning(f"User {request.user.username} attempted to view events of group {group_id} without membership.")
         return False
@@ -0,0 +1,138 @@
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db.models import Model
+
+from .models import UserProfile
+from .invalidation_bus import InvalidationBus
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+_request_profiles = ContextVar('schedules_request_profiles', default=None)
+
+
+def _user_id(user):
+    return user.pk if isinstance(user, Model) else user
+
+
+class ProfileCache:
+    """
+    Two-level cache of UserProfile rows: a request-scoped map (see ProfileCacheMiddleware and
+    request_scope) in front of a bounded, process-wide LRU. Entries are dropped when the profile
+    is saved or deleted in any process (through the InvalidationBus) and otherwise expire after
+    PROFILE_CACHE_TTL seconds.
+    Callers get their own copy of the profile, so mutating it never leaks into the cache.
+    """
+    _lru = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    @contextmanager
+    def request_scope():
+        """
+        Memoize profiles for the duration of the block, e.g. one request or one task run.
+        """
+        token = _request_profiles.set({})
+        try:
+            yield
+        finally:
+            _request_profiles.reset(token)
+
+    @staticmethod
+    def _lru_get(user_id):
+        with ProfileCache._lock:
+            entry = ProfileCache._lru.get(user_id)
+            if entry is None:
+                return _MISSING
+            profile, expires_at = entry
+            if expires_at < time.monotonic():
+                del ProfileCache._lru[user_id]
+                return _MISSING
+            ProfileCache._lru.move_to_end(user_id)
+            return profile
+
+    @staticmethod
+    def _lru_set(user_id, profile):
+        InvalidationBus.ensure_listener()
+        with ProfileCache._lock:
+            ProfileCache._lru[user_id] = (profile, time.monotonic() + settings.PROFILE_CACHE_TTL)
+            ProfileCache._lru.move_to_end(user_id)
+            while len(ProfileCache._lru) > settings.PROFILE_CACHE_SIZE:
+                ProfileCache._lru.popitem(last=False)
+
+    @staticmethod
+    def get_many(users):
+        """
+        Profiles for the given users or user ids as {user_id: profile}, loading every miss in a
+        single query. Users without a profile map to None.
+        """
+        user_ids = {_user_id(user) for user in users if _user_id(user) is not None}
+        scope = _request_profiles.get()
+        found = {}
+        missing = set()
+
+        for user_id in user_ids:
+            profile = scope.get(user_id, _MISSING) if scope is not None else _MISSING
+            if profile is _MISSING:
+                profile = ProfileCache._lru_get(user_id)
+                if profile is not _MISSING:
+                    profile = copy.copy(profile)
+                    if scope is not None:
+                        scope[user_id] = profile
+            if profile is _MISSING:
+                missing.add(user_id)
+            else:
+                found[user_id] = profile
+
+        if missing:
+            loaded = {profile.user_id: profile for profile in UserProfile.objects.filter(user_id__in=missing)}
+            for user_id in missing:
+                profile = loaded.get(user_id)
+                ProfileCache._lru_set(user_id, profile)
+                found[user_id] = copy.copy(profile)
+                if scope is not None:
+                    scope[user_id] = found[user_id]
+            logger.debug(f"Loaded {len(loaded)} of {len(missing)} user profiles from the database.")
+
+        return found
+
+    @staticmethod
+    def get(user):
+        """
+        The user's profile, or None if the user has none.
+        """
+        return ProfileCache.get_many([user]).get(_user_id(user))
+
+    @staticmethod
+    def timezone_name(user):
+        """
+        The user's configured timezone name, defaulting to UTC.
+        """
+        profile = ProfileCache.get(user)
+        return profile.timezone if profile is not None and profile.timezone else 'UTC'
+
+    @staticmethod
+    def invalidate(user_id):
+        with ProfileCache._lock:
+            ProfileCache._lru.pop(user_id, None)
+        scope = _request_profiles.get()
+        if scope is not None:
+            scope.pop(user_id, None)
+
+    @staticmethod
+    def clear():
+        with ProfileCache._lock:
+            ProfileCache._lru.clear()
+
+
+InvalidationBus.register(
+    'profile',
+    evict=lambda keys: [ProfileCache.invalidate(int(key)) for key in keys],
+    reset=ProfileCache.clear,
+)
@@ -0,0 +1,209 @@
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.utils import timezone
+
+from .models import UserDeviceToken
+
+logger = logging.getLogger(__name__)
+
+# FCM errors meaning the token will never work again for this sender.
+PERMANENT_ERRORS = {'NotRegistered', 'InvalidRegistration', 'MismatchSenderId', 'MissingRegistration'}
+# FCM errors (and our own transport failures) worth retrying with backoff.
+TRANSIENT_ERRORS = {'Unavailable', 'InternalServerError', 'RequestFailed', 'InvalidResponse', 'HTTP429'}
+
+
+class PushDelivery:
+    """
+    Push notifications through FCM's multicast endpoint. Tokens go out in batches of
+    PUSH_MULTICAST_SIZE (registration_ids), up to PUSH_MAX_WORKERS batches at a time, over one
+    keep-alive connection pool per process. Every call reports the outcome per token: transient
+    failures are retried with exponential backoff, tokens FCM reports as dead are deactivated and
+    canonical ids replace the tokens they supersede.
+    """
+    _session = None
+    _session_pid = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def session():
+        """
+        The process's pooled HTTP session, created again after a fork so workers never share sockets.
+        """
+        with PushDelivery._lock:
+            if PushDelivery._session is None or PushDelivery._session_pid != os.getpid():
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.PUSH_MAX_WORKERS)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                PushDelivery._session = session
+                PushDelivery._session_pid = os.getpid()
+            return PushDelivery._session
+
+    @staticmethod
+    def batches(tokens):
+        unique = list(dict.fromkeys(token for token in tokens if token))
+        size = settings.PUSH_MULTICAST_SIZE
+        return [unique[i:i + size] for i in range(0, len(unique), size)]
+
+    @staticmethod
+    def is_transient(error):
+        return error in TRANSIENT_ERRORS or error.startswith('HTTP5')
+
+    @staticmethod
+    def send_batch(tokens, title, body):
+        """
+        One multicast request. Returns ({token: None if delivered, else the error},
+        {token: canonical token} for the tokens FCM says have been replaced).
+        """
+        payload = {
+            'registration_ids': tokens,
+            'notification': {
+                'title': title,
+                'body': body
+            }
+        }
+        headers = {
+            'Authorization': f"key={settings.FCM_SERVER_KEY}",
+            'Content-Type': 'application/json'
+        }
+        try:
+            response = PushDelivery.session().post(
+                settings.FCM_ENDPOINT, json=payload, headers=headers, timeout=settings.PUSH_TIMEOUT_SECONDS
+            )
+        except requests.RequestException as e:
+            logger.error(f"Push batch of {len(tokens)} tokens failed: {e}")
+            return {token: 'RequestFailed' for token in tokens}, {}
+
+        if response.status_code != 200:
+            logger.error(f"Push batch of {len(tokens)} tokens failed. Status: {response.status_code}, Response: {response.text[:200]}")
+            return {token: f"HTTP{response.status_code}" for token in tokens}, {}
+
+        try:
+            results = response.json().get('results') or []
+        except ValueError:
+            results = []
+        if len(results) != len(tokens):
+            logger.error(f"Push batch of {len(tokens)} tokens got {len(results)} results back.")
+            return {token: 'InvalidResponse' for token in tokens}, {}
+
+        canonical = {
+            token: result['registration_id']
+            for token, result in zip(tokens, results) if result.get('registration_id') not in (None, token)
+        }
+        return {token: result.get('error') for token, result in zip(tokens, results)}, canonical
+
+    @staticmethod
+    def send(tokens, title, body):
+        """
+        Deliver one notification to every token and apply FCM's feedback to UserDeviceToken.
+        Returns {token: None if delivered, else the final error}.
+        """
+        batches = PushDelivery.batches(tokens)
+        if not batches:
+            return {}
+        if not settings.FCM_SERVER_KEY:
+            logger.error("FCM_SERVER_KEY is not set. Cannot send push notification.")
+            return {token: 'MissingServerKey' for batch in batches for token in batch}
+
+        results, canonical = {}, {}
+        for attempt in range(settings.PUSH_MAX_RETRIES + 1):
+            if attempt:
+                backoff = settings.PUSH_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)
+                time.sleep(backoff + random.uniform(0, backoff / 2))
+            attempt_results, attempt_canonical = PushDelivery.send_batches(batches, title, body)
+            results.update(attempt_results)
+            canonical.update(attempt_canonical)
+            retry = [token for token, error in attempt_results.items() if error and PushDelivery.is_transient(error)]
+            if not retry:
+                break
+            if attempt < settings.PUSH_MAX_RETRIES:
+                logger.warning(f"Retrying push '{title}' to {len(retry)} devices after transient errors.")
+            batches = PushDelivery.batches(retry)
+
+        failed = sum(1 for error in results.values() if error)
+        logger.info(f"Push '{title}' delivered to {len(results) - failed} of {len(results)} devices.")
+        PushDelivery.apply_feedback(results, canonical)
+        return results
+
+    @staticmethod
+    def send_batches(batches, title, body):
+        results, canonical = {}, {}
+        if len(batches) == 1:
+            outcomes = [PushDelivery.send_batch(batches[0], title, body)]
+        else:
+            with ThreadPoolExecutor(max_workers=min(settings.PUSH_MAX_WORKERS, len(batches))) as pool:
+                outcomes = list(pool.map(lambda batch: PushDelivery.send_batch(batch, title, body), batches))
+        for batch_results, batch_canonical in outcomes:
+            results.update(batch_results)
+            canonical.update(batch_canonical)
+        return results, canonical
+
+    @staticmethod
+    def apply_feedback(results, canonical):
+        """
+        Deactivate tokens FCM rejected for good, in bulk, and move replaced tokens to their
+        canonical id (dropping the old row if the canonical token is already registered).
+        """
+        dead = [token for token, error in results.items() if error in PERMANENT_ERRORS]
+        deactivated = 0
+        size = settings.PUSH_MULTICAST_SIZE
+        now = timezone.now()
+        for i in range(0, len(dead), size):
+            deactivated += UserDeviceToken.objects.filter(token__in=dead[i:i + size], is_active=True).update(
+                is_active=False, deactivated_at=now
+            )
+        if deactivated:
+            logger.info(f"Deactivated {deactivated} device tokens rejected by FCM.")
+
+        for token, replacement in canonical.items():
+            if UserDeviceToken.objects.filter(token=replacement).exists():
+                UserDeviceToken.objects.filter(token=token).delete()
+            else:
+                UserDeviceToken.objects.filter(token=token).update(token=replacement)
+        if canonical:
+            logger.info(f"Replaced {len(canonical)} device tokens with their canonical ids.")
+
+    @staticmethod
+    def send_to_users(user_ids, title, body):
+        """
+        Deliver to every active device of the given users, looked up in one query. Returns
+        {user_id: error} for users none of whose devices got the notification, leaving out users
+        whose devices were all rejected for good (those tokens are deactivated, so a retry could
+        not reach them either).
+        """
+        devices = defaultdict(list)
+        for user_id, token in UserDeviceToken.objects.filter(
+                user_id__in=user_ids, is_active=True).values_list('user_id', 'token'):
+            devices[user_id].append(token)
+        results = PushDelivery.send((token for tokens in devices.values() for token in tokens), title, body)
+
+        failures = {}
+        for user_id, tokens in devices.items():
+            errors = [results.get(token, 'NoResult') for token in tokens]
+            if None in errors:
+                continue
+            retryable = [error for error in errors if error not in PERMANENT_ERRORS]
+            if retryable:
+                failures[user_id] = retryable[0]
+        return failures
+
+    @staticmethod
+    def prune_tokens(older_than_days=None):
+        """
+        Delete device tokens deactivated longer ago than the retention window and not registered again since.
+        """
+        days = older_than_days if older_than_days is not None else settings.PUSH_TOKEN_RETENTION_DAYS
+        deleted, _ = UserDeviceToken.objects.filter(
+            is_active=False, deactivated_at__lt=timezone.now() - timedelta(days=days)
+        ).delete()
+        logger.info(f"Pruned {deleted} inactive device tokens older than {days} days.")
+        return deleted
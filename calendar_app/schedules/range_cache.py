@@ -0,0 +1,103 @@
+import hashlib
+import json
+import logging
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+
+class CalendarRangeCache:
+    """
+    Cache of serialized calendar range payloads keyed by (user, range, view mode, calendar version).
+    Each user has a calendar version token; bumping it orphans every cached range for that user,
+    and the orphans age out through the cache TTL (and the backend's LRU eviction).
+    """
+    VERSION_KEY = 'calendar_version:{user_id}'
+    PAYLOAD_KEY = 'calendar_range:{user_id}:{version}:{view_mode}:{digest}'
+    METRIC_KEY = 'calendar_range_cache:{metric}'
+
+    @staticmethod
+    def version(user_id):
+        """
+        Current calendar version token for the user, created on first use.
+        """
+        key = CalendarRangeCache.VERSION_KEY.format(user_id=user_id)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, time.time_ns(), None)
+            version = cache.get(key)
+        return version
+
+    @staticmethod
+    def invalidate_users(user_ids):
+        """
+        Bump the calendar version of every given user once the current transaction commits,
+        so a concurrent read cannot re-cache data from before the change.
+        """
+        user_ids = {user_id for user_id in user_ids if user_id is not None}
+        if not user_ids:
+            return
+
+        def bump():
+            version = time.time_ns()
+            cache.set_many(
+                {CalendarRangeCache.VERSION_KEY.format(user_id=user_id): version for user_id in user_ids},
+                None
+            )
+
+        transaction.on_commit(bump)
+
+    @staticmethod
+    def _payload_key(user_id, view_mode, params):
+        normalized = json.dumps(sorted((str(k), str(v)) for k, v in params.items()))
+        digest = hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+        return CalendarRangeCache.PAYLOAD_KEY.format(
+            user_id=user_id, version=CalendarRangeCache.version(user_id), view_mode=view_mode, digest=digest
+        )
+
+    @staticmethod
+    def _record(metric):
+        key = CalendarRangeCache.METRIC_KEY.format(metric=metric)
+        if not cache.add(key, 1, None):
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, 1, None)
+
+    @staticmethod
+    def get_or_compute(user_id, view_mode, params, compute, timeout=None):
+        """
+        Return the cached payload for this user, view mode and request parameters, calling
+        compute() and storing its result on a miss. timeout defaults to CALENDAR_RANGE_CACHE_TIMEOUT.
+        """
+        key = CalendarRangeCache._payload_key(user_id, view_mode, params)
+        payload = cache.get(key)
+        if payload is not None:
+            CalendarRangeCache._record('hits')
+            logger.debug(f"Calendar range cache hit for user {user_id} ({view_mode}).")
+            return payload
+
+        CalendarRangeCache._record('misses')
+        logger.debug(f"Calendar range cache miss for user {user_id} ({view_mode}).")
+        payload = compute()
+        cache.set(key, payload, timeout if timeout is not None else settings.CALENDAR_RANGE_CACHE_TIMEOUT)
+        return payload
+
+    @staticmethod
+    def stats():
+        """
+        Hit and miss counters since the counters were last reset.
+        """
+        keys = {metric: CalendarRangeCache.METRIC_KEY.format(metric=metric) for metric in ('hits', 'misses')}
+        values = cache.get_many(keys.values())
+        stats = {metric: values.get(key, 0) for metric, key in keys.items()}
+        total = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / total if total else 0.0
+        return stats
+
+    @staticmethod
+    def reset_stats():
+        cache.delete_many([CalendarRangeCache.METRIC_KEY.format(metric=metric) for metric in ('hits', 'misses')])
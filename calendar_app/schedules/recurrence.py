@@ -0,0 +1,54 @@
+from datetime import datetime, time
+from dateutil.rrule import rrule, DAILY, WEEKLY, MONTHLY, YEARLY, MO, TU, WE, TH, FR, SA, SU
+import zoneinfo
+
+FREQUENCIES = {'DAILY': DAILY, 'WEEKLY': WEEKLY, 'MONTHLY': MONTHLY, 'YEARLY': YEARLY}
+WEEKDAYS = {
+    'Monday': MO, 'Tuesday': TU, 'Wednesday': WE, 'Thursday': TH,
+    'Friday': FR, 'Saturday': SA, 'Sunday': SU,
+}
+
+
+def next_occurrence(event, after):
+    """
+    Start of the first occurrence of a recurring event at or after `after`, or None.
+    """
+    rule = _rule(event)
+    return rule.after(after, inc=True) if rule else None
+
+
+def occurrences_between(event, start, end):
+    """
+    Starts of a recurring event's occurrences in [start, end).
+    """
+    rule = _rule(event)
+    if rule is None:
+        return []
+    return [occurrence for occurrence in rule.between(start, end, inc=True) if occurrence < end]
+
+
+def _rule(event):
+    schedule = event.recurring_schedule
+    rule = schedule.frequency if schedule else (event.recurrence_rule or {}).get('frequency')
+    if rule not in FREQUENCIES:
+        return None
+
+    interval = (schedule.interval if schedule else (event.recurrence_rule or {}).get('interval')) or 1
+    tz = zoneinfo.ZoneInfo(event.event_timezone or 'UTC')
+    dtstart = event.start_time.astimezone(tz)
+    params = {'freq': FREQUENCIES[rule], 'dtstart': dtstart, 'interval': interval}
+
+    if schedule and schedule.end_date:
+        params['until'] = datetime.combine(schedule.end_date, time.max, tzinfo=tz)
+    if event.recurrence_end_date:
+        until = event.recurrence_end_date.astimezone(tz)
+        params['until'] = min(params.get('until', until), until)
+
+    days = schedule.days_of_week if schedule else None
+    if isinstance(days, str):
+        days = days.split(',')
+    byweekday = [WEEKDAYS[day.strip()] for day in days or [] if day.strip() in WEEKDAYS]
+    if byweekday:
+        params['byweekday'] = byweekday
+
+    return rrule(**params)
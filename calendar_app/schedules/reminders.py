@@ -0,0 +1,123 @@
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import EventReminder
+from .recurrence import next_occurrence
+
+logger = logging.getLogger(__name__)
+
+
+class ReminderScheduler:
+    """
+    Reminders live as EventReminder rows with an indexed fire_at, instead of one ETA task per
+    reminder in the broker. dispatch() runs every minute, claims due rows with
+    SELECT ... FOR UPDATE SKIP LOCKED (so several dispatchers can run side by side) and enqueues
+    delivery for them only. A one-off reminder is marked sent; a recurring event's reminder moves
+    on to the next occurrence.
+    """
+
+    @staticmethod
+    def is_series(event):
+        return event.recurring and bool(event.recurring_schedule_id or event.recurrence_rule)
+
+    @staticmethod
+    def next_fire_at(reminder, event, after):
+        """
+        When the reminder should fire next, at or after `after` for a recurring event.
+        None once the series has ended.
+        """
+        if not ReminderScheduler.is_series(event):
+            return event.start_time - reminder.reminder_time
+        start = next_occurrence(event, after + reminder.reminder_time)
+        return start - reminder.reminder_time if start is not None else None
+
+    @staticmethod
+    def schedule(reminder, now=None):
+        """
+        Set fire_at from the reminder's event, re-arming it if it now falls in the future.
+        Returns whether anything changed.
+        """
+        now = now or timezone.now()
+        fire_at = ReminderScheduler.next_fire_at(reminder, reminder.event, now)
+        if fire_at is None:
+            # The series has ended.
+            sent_at = reminder.sent_at or now
+        elif fire_at > now:
+            sent_at = None
+        else:
+            sent_at = reminder.sent_at
+        changed = (fire_at, sent_at) != (reminder.fire_at, reminder.sent_at)
+        reminder.fire_at, reminder.sent_at = fire_at, sent_at
+        return changed
+
+    @staticmethod
+    def reschedule_event(event):
+        """
+        Recompute the reminders of an event whose times or recurrence may have changed.
+        """
+        now = timezone.now()
+        changed = []
+        for reminder in event.reminders.all():
+            reminder.event = event
+            if ReminderScheduler.schedule(reminder, now):
+                changed.append(reminder)
+        if changed:
+            EventReminder.objects.bulk_update(changed, ['fire_at', 'sent_at'])
+
+    @staticmethod
+    def claim_due(now, batch_size):
+        """
+        Claim one batch of due reminders and advance them. Returns {event_id: fire_at} for the events
+        to remind about; reminders more than REMINDER_MAX_LATENESS_MINUTES overdue are skipped, not delivered.
+        """
+        late_before = now - timedelta(minutes=settings.REMINDER_MAX_LATENESS_MINUTES)
+        with transaction.atomic():
+            due = list(
+                EventReminder.objects.select_for_update(skip_locked=True, of=('self',))
+                .select_related('event', 'event__recurring_schedule')
+                .filter(sent_at__isnull=True, fire_at__lte=now)
+                .order_by('fire_at')[:batch_size]
+            )
+            due_events = {}
+            for reminder in due:
+                if reminder.fire_at >= late_before:
+                    due_events.setdefault(reminder.event_id, reminder.fire_at)
+                else:
+                    logger.warning(f"Skipping reminder {reminder.id}, due at {reminder.fire_at}.")
+
+                if ReminderScheduler.is_series(reminder.event):
+                    after = max(reminder.fire_at, now) + timedelta(seconds=1)
+                    reminder.fire_at = ReminderScheduler.next_fire_at(reminder, reminder.event, after)
+                if not ReminderScheduler.is_series(reminder.event) or reminder.fire_at is None:
+                    reminder.sent_at = now
+            EventReminder.objects.bulk_update(due, ['fire_at', 'sent_at'])
+        return due_events, len(due)
+
+    @staticmethod
+    def dispatch(now=None):
+        """
+        Claim every due reminder, batch by batch, and enqueue one delivery per event.
+        """
+        # Imported here because tasks imports this module.
+        from .tasks import send_event_reminder
+
+        now = now or timezone.now()
+        batch_size = settings.REMINDER_DISPATCH_BATCH_SIZE
+        dispatched = 0
+        while True:
+            due_events, claimed = ReminderScheduler.claim_due(now, batch_size)
+            for event_id, fire_at in due_events.items():
+                try:
+                    # The key keeps a redelivered task from notifying twice for the same occurrence.
+                    send_event_reminder.delay(event_id, dedupe_key=f"reminder:{event_id}:{fire_at.isoformat()}")
+                    dispatched += 1
+                except Exception as e:
+                    logger.error(f"Could not enqueue reminder for event {event_id}: {e}")
+            if claimed < batch_size:
+                break
+        if dispatched:
+            logger.info(f"Dispatched reminders for {dispatched} events.")
+        return dispatched
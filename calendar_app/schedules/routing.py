@@ -1,6 +1,7 @@
 from django.urls import re_path
-from .consumers import EventConsumer
+from .consumers import EventConsumer, NotificationConsumer
 
 websocket_urlpatterns = [
     re_path(r'ws/event/(?P<event_id>\d+)/$', EventConsumer.as_asgi()),
+    re_path(r'ws/notifications/$', NotificationConsumer.as_asgi()),
 ]
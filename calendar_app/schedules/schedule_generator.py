@@ -3,6 +3,7 @@ from datetime import timedelta
 from django.utils import timezone
 import zoneinfo
 from .models import Event, RecurringSchedule
+from .profile_cache import ProfileCache
 
 logger = logging.getLogger(__name__)
 
@@ -35,7 +36,7 @@ class RecurringEventGenerator:
         current_date = self.recurring_schedule.start_date
 
         # Determine timezone
-        event_tz = self.recurring_schedule.user.userprofile.timezone if hasattr(self.recurring_schedule.user, 'userprofile') else 'UTC'
+        event_tz = ProfileCache.timezone_name(self.recurring_schedule.user_id)
         tz = zoneinfo.ZoneInfo(event_tz)
 
         while current_date <= end_date:
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timezone as dt_timezone
 import logging
 from rest_framework import serializers
 from django.core.exceptions import ValidationError
@@ -72,10 +72,10 @@ class GroupSerializer(serializers.ModelSerializer):
     class Meta:
         model = Group
         fields = [
-            'id', 'name', 'description', 'members', 'admin', 'is_public',
+            'id', 'name', 'description', 'members', 'member_count', 'admin', 'is_public',
             'created_at', 'updated_at', 'default_event_color'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'member_count', 'created_at', 'updated_at']
 
     def send_invitation(self, group, user):
         """
@@ -90,6 +90,19 @@ class GroupSerializer(serializers.ModelSerializer):
         GroupInvitationManager.process_invitation_response(invitation, response)
 
 
+class GroupListSerializer(serializers.ModelSerializer):
+    """
+    Lightweight group representation for listings, with the cached member_count instead of nesting every member.
+    """
+    class Meta:
+        model = Group
+        fields = [
+            'id', 'name', 'description', 'member_count', 'admin', 'is_public',
+            'created_at', 'updated_at', 'default_event_color'
+        ]
+        read_only_fields = fields
+
+
 class EventCategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = EventCategory
@@ -137,6 +150,10 @@ class EventSerializer(serializers.ModelSerializer):
     shared_with = UserSerializer(many=True, read_only=True)
     created_by = UserSerializer(read_only=True)
     is_all_day = serializers.BooleanField()
+    start_time = serializers.DateTimeField(default_timezone=dt_timezone.utc)
+    end_time = serializers.DateTimeField(default_timezone=dt_timezone.utc)
+    eta = serializers.DateTimeField(default_timezone=dt_timezone.utc, required=False, allow_null=True)
+    recurrence_end_date = serializers.DateTimeField(default_timezone=dt_timezone.utc, required=False, allow_null=True)
 
     class Meta:
         model = Event
@@ -203,6 +220,9 @@ class EventSerializer(serializers.ModelSerializer):
 
 
 class AvailabilitySerializer(serializers.ModelSerializer):
+    start_time = serializers.DateTimeField(default_timezone=dt_timezone.utc)
+    end_time = serializers.DateTimeField(default_timezone=dt_timezone.utc)
+
     class Meta:
         model = Availability
         fields = ['id', 'user', 'start_time', 'end_time', 'is_available', 'note']
@@ -229,8 +249,8 @@ class InvitationSerializer(serializers.ModelSerializer):
 class NotificationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notification
-        fields = ['id', 'recipient', 'notification_type', 'message', 'is_read', 'created_at']
-        read_only_fields = ['id', 'created_at']
+        fields = ['id', 'recipient', 'notification_type', 'message', 'is_read', 'created_at', 'topic', 'occurrences']
+        read_only_fields = ['id', 'created_at', 'topic', 'occurrences']
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -1,7 +1,18 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
 from django.contrib.auth.models import User
+from django.db import transaction
 from django.dispatch import receiver
-from .models import UserProfile
+from .models import (
+    CustomUser, UserProfile, Group, Event, EventAccess, EventReminder, Notification, RecurringSchedule
+)
+from .group_directory import PublicGroupDirectory
+from .event_access import EventAccessManager
+from .range_cache import CalendarRangeCache
+from .event_changes import EventChangeLog
+from .invalidation_bus import InvalidationBus
+from .counters import CounterCache
+from .agenda_store import AgendaStore
+from .reminders import ReminderScheduler
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
@@ -11,3 +22,248 @@ def create_user_profile(sender, instance, created, **kwargs):
 @receiver(post_save, sender=User)
 def save_user_profile(sender, instance, **kwargs):
     instance.userprofile.save()
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_cached_profile(sender, instance, **kwargs):
+    InvalidationBus.publish('profile', [instance.user_id])
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_public_directory_on_group_change(sender, instance, **kwargs):
+    # A group may have just switched between public and private, so always rebuild.
+    PublicGroupDirectory.invalidate()
+
+@receiver(m2m_changed, sender=Group.members.through)
+def invalidate_public_directory_on_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        if instance.is_public:
+            PublicGroupDirectory.invalidate()
+    elif action == 'post_clear' or Group.objects.filter(pk__in=pk_set or [], is_public=True).exists():
+        PublicGroupDirectory.invalidate()
+
+@receiver(post_save, sender=Event)
+def sync_event_access_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    viewers, removed = EventAccessManager.sync_event(instance)
+    CalendarRangeCache.invalidate_users(viewers | removed)
+
+@receiver(pre_delete, sender=Event)
+def remember_event_viewers(sender, instance, **kwargs):
+    instance._viewer_ids = list(EventAccess.objects.filter(event_id=instance.id).values_list('user_id', flat=True))
+
+@receiver(post_delete, sender=Event)
+def invalidate_calendars_on_event_delete(sender, instance, **kwargs):
+    viewer_ids = getattr(instance, '_viewer_ids', [])
+    CalendarRangeCache.invalidate_users(viewer_ids)
+    EventChangeLog.record_deletion(viewer_ids, instance.id)
+    AgendaStore.unindex((user_id, instance.id) for user_id in viewer_ids)
+
+def schedule_viewer_ids(schedule):
+    # Events list their schedule and expand occurrences from it, so everyone who sees one of them
+    # has a stale calendar once the schedule changes.
+    viewer_ids = set(
+        EventAccess.objects.filter(event__recurring_schedule_id=schedule.id).values_list('user_id', flat=True)
+    )
+    viewer_ids.add(schedule.user_id)
+    return viewer_ids
+
+@receiver(post_save, sender=RecurringSchedule)
+def invalidate_calendars_on_schedule_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    CalendarRangeCache.invalidate_users(schedule_viewer_ids(instance))
+
+@receiver(pre_delete, sender=RecurringSchedule)
+def remember_schedule_viewers(sender, instance, **kwargs):
+    # Events are detached with SET_NULL through a bulk update, which sends no Event signals.
+    instance._viewer_ids = schedule_viewer_ids(instance)
+
+@receiver(post_delete, sender=RecurringSchedule)
+def invalidate_calendars_on_schedule_delete(sender, instance, **kwargs):
+    CalendarRangeCache.invalidate_users(getattr(instance, '_viewer_ids', {instance.user_id}))
+
+@receiver(m2m_changed, sender=Event.shared_with.through)
+def sync_event_access_on_share_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        instance._cleared_shared_event_ids = list(instance.shared_events.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        viewers, removed = EventAccessManager.sync_event(instance)
+        CalendarRangeCache.invalidate_users(viewers | removed)
+    elif action == 'post_clear':
+        EventAccessManager.sync_events(getattr(instance, '_cleared_shared_event_ids', []))
+        CalendarRangeCache.invalidate_users([instance.id])
+    else:
+        EventAccessManager.sync_events(pk_set)
+        CalendarRangeCache.invalidate_users([instance.id])
+
+@receiver(m2m_changed, sender=Group.members.through)
+def sync_event_access_on_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        if reverse:
+            instance._cleared_group_ids = list(instance.calendar_groups.values_list('id', flat=True))
+        else:
+            instance._cleared_member_ids = list(instance.members.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        if action == 'post_add':
+            user_ids = pk_set
+            EventAccessManager.grant_group_members(instance.id, user_ids)
+        elif action == 'post_remove':
+            user_ids = pk_set
+            EventAccessManager.revoke_group_members(instance.id, user_ids)
+        else:
+            user_ids = getattr(instance, '_cleared_member_ids', [])
+            EventAccessManager.revoke_group_members(instance.id, user_ids)
+        CalendarRangeCache.invalidate_users(user_ids)
+        return
+
+    group_ids = pk_set if action != 'post_clear' else getattr(instance, '_cleared_group_ids', [])
+    for group_id in group_ids:
+        if action == 'post_add':
+            EventAccessManager.grant_group_members(group_id, [instance.id])
+        else:
+            EventAccessManager.revoke_group_members(group_id, [instance.id])
+    CalendarRangeCache.invalidate_users([instance.id])
+
+@receiver(post_save, sender=Group)
+def invalidate_member_calendars_on_group_change(sender, instance, created, raw=False, **kwargs):
+    # Members' dashboards list the group by name.
+    if created or raw:
+        return
+    CalendarRangeCache.invalidate_users(
+        Group.members.through.objects.filter(group_id=instance.id).values_list('customuser_id', flat=True)
+    )
+
+@receiver(pre_delete, sender=Group)
+def remember_group_events(sender, instance, **kwargs):
+    # Events are detached with SET_NULL through a bulk update, and memberships are removed
+    # without m2m_changed, so neither sends the signals handled above.
+    instance._detached_event_ids = list(instance.events.values_list('id', flat=True))
+    instance._member_ids = list(instance.members.values_list('id', flat=True))
+
+@receiver(post_delete, sender=Group)
+def sync_event_access_on_group_delete(sender, instance, **kwargs):
+    affected = EventAccessManager.sync_events(getattr(instance, '_detached_event_ids', []))
+    CalendarRangeCache.invalidate_users(affected | set(getattr(instance, '_member_ids', [])))
+
+@receiver(m2m_changed, sender=Group.members.through)
+def maintain_membership_counters(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_remove':
+        # remove() reports every id it was given, including ones that were not members.
+        if reverse:
+            instance._removed_group_ids = set(
+                sender.objects.filter(customuser_id=instance.id, group_id__in=pk_set).values_list('group_id', flat=True)
+            )
+        else:
+            instance._removed_member_ids = set(
+                sender.objects.filter(group_id=instance.id, customuser_id__in=pk_set).values_list('customuser_id', flat=True)
+            )
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    delta = 1 if action == 'post_add' else -1
+    if reverse:
+        if action == 'post_add':
+            group_ids = pk_set
+        elif action == 'post_remove':
+            group_ids = getattr(instance, '_removed_group_ids', set())
+        else:
+            group_ids = getattr(instance, '_cleared_group_ids', [])
+        CounterCache.adjust_user_groups(instance.id, group_ids, delta)
+    else:
+        if action == 'post_add':
+            user_ids = pk_set
+        elif action == 'post_remove':
+            user_ids = getattr(instance, '_removed_member_ids', set())
+        else:
+            user_ids = getattr(instance, '_cleared_member_ids', [])
+        CounterCache.adjust_group_members(instance.id, user_ids, delta)
+
+@receiver(pre_save, sender=Event)
+def remember_event_counter_keys(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._previous_counter_keys = Event.objects.filter(pk=instance.pk).values_list('group_id', 'created_by_id').first()
+
+@receiver(post_save, sender=Event)
+def maintain_event_counters_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        previous_group_id, previous_creator_id = None, None
+    else:
+        previous = getattr(instance, '_previous_counter_keys', None)
+        if previous is None:
+            return
+        previous_group_id, previous_creator_id = previous
+    if previous_group_id != instance.group_id:
+        CounterCache.adjust_group_events(previous_group_id, -1)
+        CounterCache.adjust_group_events(instance.group_id, 1)
+    if previous_creator_id != instance.created_by_id:
+        CounterCache.adjust_users({previous_creator_id: -1}, 'event_count')
+        CounterCache.adjust_users({instance.created_by_id: 1}, 'event_count')
+
+@receiver(post_delete, sender=Event)
+def maintain_event_counters_on_delete(sender, instance, **kwargs):
+    CounterCache.adjust_group_events(instance.group_id, -1)
+    CounterCache.adjust_users({instance.created_by_id: -1}, 'event_count')
+
+@receiver(post_delete, sender=Group)
+def maintain_member_counters_on_group_delete(sender, instance, **kwargs):
+    CounterCache.adjust_users({user_id: -1 for user_id in getattr(instance, '_member_ids', [])}, 'group_count')
+
+@receiver(pre_delete, sender=CustomUser)
+def remember_user_groups(sender, instance, **kwargs):
+    # The user's memberships are deleted by cascade, without m2m_changed.
+    instance._deleted_group_ids = list(instance.calendar_groups.values_list('id', flat=True))
+
+@receiver(post_delete, sender=CustomUser)
+def maintain_member_counters_on_user_delete(sender, instance, **kwargs):
+    CounterCache.adjust_member_counts(getattr(instance, '_deleted_group_ids', []), -1)
+
+@receiver(post_delete, sender=CustomUser)
+def drop_agenda_on_user_delete(sender, instance, **kwargs):
+    user_id = instance.id
+    transaction.on_commit(lambda: AgendaStore.drop_users([user_id]))
+
+@receiver(pre_save, sender=EventReminder)
+def schedule_reminder(sender, instance, raw=False, **kwargs):
+    if not raw:
+        ReminderScheduler.schedule(instance)
+
+@receiver(post_save, sender=Event)
+def reschedule_event_reminders(sender, instance, created, raw=False, **kwargs):
+    if not raw and not created:
+        ReminderScheduler.reschedule_event(instance)
+
+@receiver(pre_save, sender=Notification)
+def remember_notification_read_state(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._was_read = Notification.objects.filter(pk=instance.pk).values_list('is_read', flat=True).first()
+
+@receiver(post_save, sender=Notification)
+def maintain_unread_counter_on_save(sender, instance, created, raw=False, **kwargs):
+    # Bulk creates and updates bypass these signals and go through NotificationInbox instead.
+    if raw:
+        return
+    was_unread = False if created else getattr(instance, '_was_read', None) is False
+    delta = int(not instance.is_read) - int(was_unread)
+    if delta:
+        CounterCache.adjust_users({instance.recipient_id: delta}, 'unread_notification_count')
+
+@receiver(post_delete, sender=Notification)
+def maintain_unread_counter_on_delete(sender, instance, **kwargs):
+    if not instance.is_read:
+        CounterCache.adjust_users({instance.recipient_id: -1}, 'unread_notification_count')
@@ -0,0 +1,99 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces identical expensive computations. For one normalized key, a single caller computes
+    while the others wait for its result: threads of this process on an in-memory call, other
+    processes on a cache lock plus the shared result. The result stays in the cache for
+    SINGLE_FLIGHT_RESULT_SECONDS, so only use it for reads that may be that stale, and key on
+    everything the result depends on (never the requesting user unless it matters).
+    """
+    LOCK_KEY = 'single_flight:lock:{digest}'
+    RESULT_KEY = 'single_flight:result:{digest}'
+    POLL_SECONDS = 0.05
+
+    _calls = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def digest(namespace, params):
+        normalized = json.dumps([namespace, params], sort_keys=True, default=str)
+        return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def do(namespace, params, compute):
+        """
+        Return compute()'s result for (namespace, params), computing it at most once at a time.
+        """
+        digest = SingleFlight.digest(namespace, params)
+        with SingleFlight._lock:
+            call = SingleFlight._calls.get(digest)
+            leader = call is None
+            if leader:
+                call = SingleFlight._calls[digest] = _Call()
+
+        if not leader:
+            if call.done.wait(settings.SINGLE_FLIGHT_WAIT_SECONDS):
+                if call.error is not None:
+                    raise call.error
+                return call.result
+            logger.warning(f"Single-flight wait for {namespace} timed out; computing it here.")
+            return compute()
+
+        try:
+            call.result = SingleFlight._shared(digest, namespace, compute)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with SingleFlight._lock:
+                SingleFlight._calls.pop(digest, None)
+            call.done.set()
+
+    @staticmethod
+    def _shared(digest, namespace, compute):
+        """
+        Cross-process half: reuse a recent result, or compute under the cache lock, or wait for
+        the process holding it. A holder that dies only delays others until its lock expires.
+        """
+        result_key = SingleFlight.RESULT_KEY.format(digest=digest)
+        lock_key = SingleFlight.LOCK_KEY.format(digest=digest)
+        deadline = time.monotonic() + settings.SINGLE_FLIGHT_WAIT_SECONDS
+
+        while True:
+            cached = cache.get(result_key)
+            if cached is not None:
+                return cached[0]
+
+            token = uuid.uuid4().hex
+            if cache.add(lock_key, token, settings.SINGLE_FLIGHT_LOCK_SECONDS):
+                try:
+                    result = compute()
+                    cache.set(result_key, (result,), settings.SINGLE_FLIGHT_RESULT_SECONDS)
+                    return result
+                finally:
+                    if cache.get(lock_key) == token:
+                        cache.delete(lock_key)
+
+            if time.monotonic() >= deadline:
+                logger.warning(f"Single-flight lock for {namespace} held too long; computing it here.")
+                return compute()
+            time.sleep(SingleFlight.POLL_SECONDS)
@@ -0,0 +1,94 @@
+import logging
+import socketserver
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """
+    Just enough SMTP for Django's SMTP backend: EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT.
+    """
+    disable_nagle_algorithm = True
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode('utf-8'))
+
+    def handle(self):
+        server = self.server
+        with server.stats_lock:
+            server.connections += 1
+        self.reply("220 smtp-sink ready")
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+            if verb == 'EHLO':
+                self.reply("250-smtp-sink")
+                self.reply("250 8BITMIME")
+            elif verb in ('HELO', 'NOOP', 'MAIL'):
+                self.reply("250 OK")
+            elif verb == 'RSET':
+                recipients = []
+                self.reply("250 OK")
+            elif verb == 'RCPT':
+                address = command.split(':', 1)[-1].strip().strip('<>')
+                if address.startswith('reject'):
+                    self.reply("550 Mailbox unavailable")
+                else:
+                    recipients.append(address)
+                    self.reply("250 OK")
+            elif verb == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                for line in iter(self.rfile.readline, b''):
+                    if line in (b'.\r\n', b'.\n'):
+                        break
+                    data.append(line)
+                if server.latency:
+                    time.sleep(server.latency)
+                with server.stats_lock:
+                    server.messages.append((recipients, b''.join(data)))
+                recipients = []
+                self.reply("250 OK queued")
+            elif verb == 'QUIT':
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class SMTPSinkServer(socketserver.ThreadingTCPServer):
+    """
+    Local SMTP server that accepts and keeps every message, for tests and benchmarks. Recipients
+    starting with 'reject' are refused; `latency` (seconds) is added to every DATA. Point
+    EMAIL_HOST/EMAIL_PORT at it with EMAIL_USE_TLS=False.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0):
+        super().__init__((host, port), _Handler)
+        self.latency = latency
+        self.stats_lock = threading.Lock()
+        self.connections = 0
+        self.messages = []
+        self._thread = None
+
+    def start(self):
+        """
+        Serve from a background thread.
+        """
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
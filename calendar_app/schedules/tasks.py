@@ -2,8 +2,8 @@ import logging
 import celery
 from datetime import timedelta
 from django.utils import timezone
+from django.db import transaction
 from django.db.models import Q
-from django.core.mail import send_mail
 from django.conf import settings
 import requests
 from google.oauth2.credentials import Credentials
@@ -14,74 +14,27 @@ from matplotlib.dates import DAILY, MONTHLY, WEEKLY, YEARLY, rrule
 from dateutil.rrule import rrulestr
 
 from .utils import calculate_free_busy
-from .models import Event, Notification, UserDeviceToken, RecurringSchedule, Group, UserProfile
+from .models import Event, RecurringSchedule, Group, UserProfile, CustomUser
+from .db_router import use_replica
+from .profile_cache import ProfileCache
+from .reminders import ReminderScheduler
+from .notification_fanout import NotificationFanout
+from .notification_service import NotificationManager
+from .outbox import Outbox
+from .push_delivery import PushDelivery
+from .email_delivery import EmailDispatcher
+from .weekly_summary import WeeklySummary
 
 logger = logging.getLogger(__name__)
 
 @celery.shared_task
-def send_event_reminder(event_id):
+def send_event_reminder(event_id, dedupe_key=None):
     try:
         event = Event.objects.get(id=event_id)
-        recipients = [event.created_by] + list(event.shared_with.all())
-
-        message = f"Reminder: '{event.title}' starts at {event.start_time.strftime('%I:%M %p')}."
-        for recipient in recipients:
-            Notification.objects.create(
-                recipient=recipient,
-                notification_type='reminder',
-                message=message
-            )
-
-            try:
-                profile = recipient.userprofile
-            except UserProfile.DoesNotExist:
-                logger.warning(f"No UserProfile found for user {recipient.username} when sending event reminder.")
-                continue
-
-            # Send email if enabled
-            if profile.email_notifications and recipient.email:
-                try:
-                    send_mail(
-                        f"Event Reminder: {event.title}",
-                        message,
-                        settings.DEFAULT_FROM_EMAIL,
-                        [recipient.email],
-                        fail_silently=False,
-                    )
-                    logger.info(f"Email reminder sent to {recipient.email} for event {event.id}")
-                except Exception as e:
-                    logger.error(f"Error sending email reminder to {recipient.email}: {e}")
-
-            # Send push notification if enabled
-            if profile.push_notifications:
-                device_tokens = UserDeviceToken.objects.filter(user=recipient, is_active=True)
-                for device_token in device_tokens:
-                    if send_push_notification(device_token.token, "Event Reminder", message):
-                        logger.info(f"Push notification sent to {recipient.username}'s device: {device_token.token}")
-                    else:
-                        logger.warning(f"Failed to send push notification to {recipient.username}'s device: {device_token.token}")
-
+        NotificationManager(event=event).send_event_reminder(dedupe_key=dedupe_key)
     except Event.DoesNotExist:
         logger.error(f"Event with id {event_id} not found.")
 
-def send_push_notification(token, title, body):
-    url = "https://fcm.googleapis.com/fcm/send"
-    headers = {
-        "Authorization": f"key={settings.FCM_SERVER_KEY}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "to": token,
-        "notification": {
-            "title": title,
-            "body": body
-        }
-    }
-    response = requests.post(url, json=payload, headers=headers)
-    if response.status_code != 200:
-        logger.error(f"Push notification failed with status code {response.status_code}: {response.text}")
-    return response.status_code == 200
-
 @celery.shared_task
 def process_recurring_events():
     now = timezone.now()
@@ -148,35 +101,55 @@ def update_group_availability():
         group.save()
         logger.info(f"Updated availability for group {group.id} ({group.name}).")
 
+@celery.shared_task
+def dispatch_due_reminders():
+    """
+    Run every minute (celery beat or the dispatch_reminders command): enqueue delivery of due reminders.
+    """
+    ReminderScheduler.dispatch()
+
+@celery.shared_task
+def warm_calendar_cache(user_id):
+    # Imported here because cache_warming loads the views, which import this module.
+    from .cache_warming import CalendarWarmer
+
+    try:
+        user = CustomUser.objects.get(id=user_id)
+    except CustomUser.DoesNotExist:
+        return
+    CalendarWarmer.warm(user)
+
 @celery.shared_task
 def send_weekly_summary():
-    users = UserProfile.objects.filter(email_notifications=True)
+    """
+    Split this week's summary recipients into partitions and send each in its own subtask.
+    """
+    WeeklySummary.start()
 
-    for user_profile in users:
-        user = user_profile.user
-        start_date = timezone.now().date()
-        end_date = start_date + timezone.timedelta(days=7)
+@celery.shared_task
+def send_weekly_summary_partition(partition_id):
+    with use_replica():
+        WeeklySummary.send_partition(partition_id)
+
+@celery.shared_task
+def prune_device_tokens():
+    PushDelivery.prune_tokens()
 
-        upcoming_events = Event.objects.filter(
-            Q(created_by=user) | Q(shared_with=user),
-            start_time__date__range=[start_date, end_date]
-        ).order_by('start_time')
-
-        if upcoming_events and user.email:
-            event_list = "\n".join([f"- {event.title} on {event.start_time.strftime('%Y-%m-%d %H:%M')}" for event in upcoming_events])
-            subject = "Your Weekly Event Summary"
-            body = f"Here are your upcoming events for the next week:\n\n{event_list}"
-            try:
-                send_mail(
-                    subject,
-                    body,
-                    settings.DEFAULT_FROM_EMAIL,
-                    [user.email],
-                    fail_silently=False,
-                )
-                logger.info(f"Weekly summary email sent to {user.email}")
-            except Exception as e:
-                logger.error(f"Failed to send weekly summary email to {user.email}: {e}")
+@celery.shared_task
+def send_email_batch(messages):
+    EmailDispatcher.send_batch(messages)
+
+@celery.shared_task
+def drain_notification_outbox(channel):
+    """
+    Deliver one channel's pending outbox rows. Enqueued when rows are written; also run it
+    periodically per channel (or the drain_outbox command) to pick up retries.
+    """
+    Outbox.drain(channel)
+
+@celery.shared_task
+def prune_notification_outbox():
+    Outbox.prune()
 
 @celery.shared_task
 def sync_external_calendars():
@@ -262,34 +235,47 @@ def sync_outlook_calendar(user, token):
 
 @celery.shared_task
 def check_eta_updates():
+    """
+    Recalculate attendees' ETAs for events starting within the hour and send each attendee one
+    notification per event listing them all, digested per event so reruns update it in place.
+    """
     current_time = timezone.now()
     upcoming_events = Event.objects.filter(
         start_time__gt=current_time,
         start_time__lte=current_time + timedelta(hours=1)
-    )
+    ).exclude(location='').prefetch_related('shared_with')
 
     for event in upcoming_events:
-        for attendee in event.shared_with.all():
-            try:
-                profile = attendee.userprofile
-            except UserProfile.DoesNotExist:
+        attendees = list(event.shared_with.all())
+        profiles = ProfileCache.get_many(attendees)
+        etas_by_origin = {}
+        arrivals = []
+        for attendee in attendees:
+            profile = profiles.get(attendee.id)
+            if profile is None:
                 logger.warning(f"No UserProfile found for user {attendee.username} when checking ETA updates.")
                 continue
 
-            if profile.location_sharing_enabled and profile.last_known_location and event.location:
-                eta = calculate_eta(profile.last_known_location, event.location)
-                if eta:
-                    event.eta = eta
-                    event.save(update_fields=['eta'])
-
-                    message = f"{attendee.get_full_name() or attendee.username} is estimated to arrive at {eta.strftime('%I:%M %p')} for '{event.title}'"
-                    for other_attendee in event.shared_with.exclude(id=attendee.id):
-                        Notification.objects.create(
-                            recipient=other_attendee,
-                            notification_type='eta_update',
-                            message=message
-                        )
-                    logger.info(f"ETA update notification sent for event {event.id} to shared users.")
+            if profile.location_sharing_enabled and profile.last_known_location:
+                origin = profile.last_known_location
+                if origin not in etas_by_origin:
+                    etas_by_origin[origin] = calculate_eta(origin, event.location)
+                if etas_by_origin[origin]:
+                    arrivals.append((attendee, etas_by_origin[origin]))
+
+        if not arrivals:
+            continue
+        estimates = ', '.join(
+            f"{attendee.get_full_name() or attendee.username} at {eta.strftime('%I:%M %p')}" for attendee, eta in arrivals
+        )
+        message = f"Estimated arrivals for '{event.title}': {estimates}"
+        with transaction.atomic():
+            event.eta = arrivals[-1][1]
+            event.save(update_fields=['eta'])
+            NotificationFanout.create(
+                (attendee.id for attendee in attendees), 'eta_update', message, topic=f"eta:{event.id}"
+            )
+        logger.info(f"ETA update notification sent for event {event.id} to {len(attendees)} shared users.")
 
 def calculate_eta(start_location, end_location):
     api_key = settings.GOOGLE_MAPS_API_KEY
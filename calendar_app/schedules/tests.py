@@ -1,3 +1,1118 @@
-from django.test import TestCase
+import json
+import zoneinfo
+import threading
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from importlib import import_module
+from unittest import mock, skipIf, skipUnless
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from channels.layers import get_channel_layer
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection, connections
+from types import SimpleNamespace
+from django.test.utils import CaptureQueriesContext
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from .models import (
+    Availability, CustomUser, Event, EventAccess, EventChange, EventReminder, Group, Invitation, Notification, NotificationOutbox, RecurringSchedule,
+    UserDeviceToken, UserProfile, UserStats, WeeklySummaryPartition, WorkSchedule,
+)
+from .event_access import EventAccessManager, visible_events
+from .range_cache import CalendarRangeCache
+from .permission_resolver import PermissionResolver
+from .permissions import CanViewGroupEvents
+from .group_management import GroupInvitationManager
+from .db_router import ReplicaRouter, use_primary, use_replica
+from .middleware import ReplicaRoutingMiddleware
+from . import invalidation_bus
+from .invalidation_bus import InvalidationBus
+from .agenda_store import AgendaStore
+from .cache_warming import CalendarWarmer
+from .profile_cache import ProfileCache
+from .fcm_stub import FCMStubServer
+from .push_delivery import PushDelivery
+from .smtp_sink import SMTPSinkServer
+from .email_delivery import EmailDispatcher
+from .outbox import Outbox
+from .reminders import ReminderScheduler
+from .counters import CounterCache
+from .weekly_summary import WeeklySummary
+from .single_flight import SingleFlight
+from .notification_inbox import NotificationInbox
+from .notification_stream import NotificationStream
+from .notification_fanout import NotificationFanout
+
+
+def make_user(username, **profile):
+    user = CustomUser.objects.create_user(username=username, email=f'{username}@example.com', password='password')
+    UserProfile.objects.create(user=user, **profile)
+    return user
+
+
+def make_event(owner, title, starts_in=timedelta(days=1), duration=timedelta(hours=1), **fields):
+    start = timezone.now() + starts_in
+    return Event.objects.create(title=title, start_time=start, end_time=start + duration, created_by=owner, **fields)
+
+
+def client_for(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+class EventAccessTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = make_user('owner')
+        self.friend = make_user('friend')
+        self.member = make_user('member')
+        self.group = Group.objects.create(name='Team', admin=self.owner)
+        self.group.members.add(self.owner, self.friend, self.member)
+        self.shared = make_event(self.owner, 'Shared lunch')
+        self.shared.shared_with.add(self.friend)
+        self.team = make_event(self.owner, 'Team lunch', group=self.group)
+
+    def access(self, user, event):
+        return EventAccess.objects.filter(user=user, event=event).values_list('direct', flat=True).first()
+
+    def test_access_rows_record_whether_access_is_direct(self):
+        self.assertIs(self.access(self.owner, self.team), True)
+        self.assertIs(self.access(self.friend, self.shared), True)
+        self.assertIs(self.access(self.member, self.team), False)
+        self.assertIsNone(self.access(self.member, self.shared))
+
+    def test_sharing_a_group_event_makes_access_direct_until_unshared(self):
+        self.team.shared_with.add(self.member)
+        self.assertIs(self.access(self.member, self.team), True)
+        self.team.shared_with.remove(self.member)
+        self.assertIs(self.access(self.member, self.team), False)
+
+    def test_leaving_the_group_keeps_direct_access(self):
+        self.team.shared_with.add(self.friend)
+        self.group.members.remove(self.friend, self.member)
+        self.assertIs(self.access(self.friend, self.team), True)
+        self.assertIsNone(self.access(self.member, self.team))
+
+    def test_visible_events_can_leave_out_group_only_events(self):
+        self.assertEqual(set(visible_events(self.member)), {self.team})
+        self.assertEqual(set(visible_events(self.member, include_groups=False)), set())
+        self.assertEqual(set(visible_events(self.friend, include_groups=False)), {self.shared})
+
+    def test_event_list_includes_group_events_but_search_does_not(self):
+        client = client_for(self.member)
+        listed = client.get('/api/events/').json()['data']
+        self.assertEqual([event['title'] for event in listed], ['Team lunch'])
+        found = client.get('/api/search/', {'q': 'lunch'}).json()
+        self.assertEqual(found['events'], [])
+
+    def test_conflict_check_only_considers_own_and_shared_events(self):
+        window = {
+            'start_time': (self.team.start_time - timedelta(minutes=30)).isoformat(),
+            'end_time': (self.team.start_time + timedelta(minutes=30)).isoformat(),
+        }
+        member = client_for(self.member).post('/api/conflict-check/', window, format='json').json()
+        owner = client_for(self.owner).post('/api/conflict-check/', window, format='json').json()
+        self.assertFalse(member['has_conflicts'])
+        self.assertTrue(owner['has_conflicts'])
+
+    def test_rebuild_reproduces_incremental_rows(self):
+        before = set(EventAccess.objects.values_list('user_id', 'event_id', 'direct'))
+        EventAccess.objects.all().delete()
+        EventAccessManager.rebuild()
+        self.assertEqual(set(EventAccess.objects.values_list('user_id', 'event_id', 'direct')), before)
+
+
+class RecurringScheduleInvalidationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = make_user('owner')
+        self.friend = make_user('friend')
+        self.stranger = make_user('stranger')
+        self.schedule = RecurringSchedule.objects.create(
+            user=self.owner, title='Standup', start_time=time(9), end_time=time(9, 15),
+            frequency='DAILY', start_date=date.today(),
+        )
+        event = make_event(self.owner, 'Standup', recurring=True, recurring_schedule=self.schedule)
+        event.shared_with.add(self.friend)
+
+    def versions(self):
+        return [CalendarRangeCache.version(user.id) for user in (self.owner, self.friend, self.stranger)]
+
+    def assertBumped(self, before, after):
+        self.assertNotEqual(before[0], after[0])
+        self.assertNotEqual(before[1], after[1])
+        self.assertEqual(before[2], after[2])
+
+    def test_saving_a_schedule_bumps_owner_and_viewers(self):
+        before = self.versions()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.schedule.interval = 2
+            self.schedule.save()
+        self.assertBumped(before, self.versions())
+
+    def test_deleting_a_schedule_bumps_owner_and_viewers(self):
+        before = self.versions()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.schedule.delete()
+        self.assertBumped(before, self.versions())
+
+
+class UTCStorageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = make_user('owner')
+        self.client = client_for(self.owner)
+
+    def test_event_times_are_stored_and_served_as_utc(self):
+        paris = Event.objects.create(
+            title='Naive', created_by=self.owner, event_timezone='Europe/Paris',
+            start_time=datetime(2030, 1, 15, 9), end_time='2030-01-15T10:00:00',
+        )
+        new_york = Event.objects.create(
+            title='Aware', created_by=self.owner,
+            start_time=datetime(2030, 1, 15, 9, tzinfo=zoneinfo.ZoneInfo('America/New_York')),
+            end_time=datetime(2030, 1, 15, 10, tzinfo=zoneinfo.ZoneInfo('America/New_York')),
+        )
+        for event, start in ((paris, datetime(2030, 1, 15, 8)), (new_york, datetime(2030, 1, 15, 14))):
+            event.refresh_from_db()
+            self.assertEqual(event.start_time, start.replace(tzinfo=dt_timezone.utc))
+            self.assertEqual(event.start_time.utcoffset(), timedelta(0))
+
+        def served(start_date, end_date):
+            response = self.client.get('/api/events/by_date_range/', {
+                'user_id': self.owner.id, 'start_date': start_date, 'end_date': end_date,
+            })
+            return [(event['title'], event['start_time'], event['end_time']) for event in response.json()['data']]
+
+        self.assertEqual(served('2030-01-15T00:00:00', '2030-01-16T00:00:00'), [
+            ('Naive', '2030-01-15T08:00:00Z', '2030-01-15T09:00:00Z'),
+            ('Aware', '2030-01-15T14:00:00Z', '2030-01-15T15:00:00Z'),
+        ])
+        self.assertEqual([title for title, *_ in served('2030-01-15T08:30:00', '2030-01-15T13:30:00')], ['Naive'])
+
+    def test_availability_times_are_stored_and_served_as_utc(self):
+        availability = Availability.objects.create(
+            user=self.owner, start_time=datetime(2030, 1, 15, 9),
+            end_time=datetime(2030, 1, 15, 15, tzinfo=dt_timezone(timedelta(hours=5))),
+        )
+        availability.refresh_from_db()
+        self.assertEqual(
+            (availability.start_time, availability.end_time),
+            (datetime(2030, 1, 15, 9, tzinfo=dt_timezone.utc), datetime(2030, 1, 15, 10, tzinfo=dt_timezone.utc)),
+        )
+        served = self.client.get(f'/api/availabilities/{availability.id}/').json()
+        self.assertEqual((served['start_time'], served['end_time']), ('2030-01-15T09:00:00Z', '2030-01-15T10:00:00Z'))
+
+    @skipIf(connection.features.supports_timezones, "Only backends without time zone support store offsets")
+    def test_the_migration_rewrites_legacy_offsets_as_utc(self):
+        event = make_event(self.owner, 'Legacy')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'UPDATE schedules_event SET start_time = %s, end_time = %s WHERE id = %s',
+                ['2030-01-15 09:00:00+01:00', '2030-01-15 10:00:00+01:00', event.id],
+            )
+        migration = import_module('schedules.migrations.0011_normalize_datetimes')
+        migration.normalize_datetimes(django_apps, SimpleNamespace(connection=connection))
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT start_time, end_time FROM schedules_event WHERE id = %s', [event.id])
+            self.assertEqual(cursor.fetchone(), (datetime(2030, 1, 15, 8), datetime(2030, 1, 15, 9)))
+
+
+class PermissionResolverTests(TestCase):
+    def setUp(self):
+        self.owner = make_user('owner')
+        self.member = make_user('member')
+        self.group = Group.objects.create(name='Team', admin=self.owner)
+        self.group.members.add(self.member)
+
+    def request_for(self, user):
+        request = RequestFactory().get('/')
+        request.user = user
+        return request
+
+    def test_answers_are_memoized_per_request(self):
+        request = self.request_for(self.member)
+        with self.assertNumQueries(1):
+            self.assertTrue(PermissionResolver.for_request(request).is_group_member(self.group))
+            self.assertTrue(PermissionResolver.for_request(request).is_group_member(self.group.id))
+
+    def test_group_events_permission(self):
+        permission = CanViewGroupEvents()
+        for user, group_id, allowed in [
+            (self.member, str(self.group.id), True),
+            (self.owner, str(self.group.id), False),
+            (self.member, 'not-a-number', False),
+            (self.member, None, False),
+        ]:
+            view = SimpleNamespace(kwargs={'group_id': group_id})
+            self.assertIs(permission.has_permission(self.request_for(user), view), allowed)
+
+
+@override_settings(EVENT_SYNC_SETTLE_SECONDS=0)
+class EventSyncTests(TestCase):
+    def setUp(self):
+        self.owner = make_user('owner')
+        self.friend = make_user('friend')
+        self.events = [make_event(self.owner, f'Event {n}') for n in range(3)]
+        for event in self.events:
+            event.shared_with.add(self.friend)
+        self.client = client_for(self.friend)
+
+    def sync(self, **params):
+        response = self.client.get('/api/events/sync/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']
+
+    def full_sync(self):
+        page = self.sync(limit=2)
+        while page['has_more']:
+            page = self.sync(sync_token=page['sync_token'], limit=2)
+        return page['sync_token']
+
+    def test_edits_are_logged_once_per_event(self):
+        before = EventChange.objects.count()
+        self.events[0].title = 'Renamed'
+        self.events[0].save()
+        self.assertEqual(list(EventChange.objects.values_list('user_id', 'event_id')[before:]), [(None, self.events[0].id)])
+
+    def test_full_sync_is_paged(self):
+        first = self.sync(limit=2)
+        self.assertTrue(first['full_sync'])
+        self.assertTrue(first['has_more'])
+        second = self.sync(sync_token=first['sync_token'], limit=2)
+        self.assertTrue(second['full_sync'])
+        self.assertFalse(second['has_more'])
+        listed = [event['id'] for event in first['events'] + second['events']]
+        self.assertEqual(listed, [event.id for event in self.events])
+        self.assertEqual(self.sync(sync_token=second['sync_token'])['events'], [])
+
+    def test_delta_sync_reports_edits_unshares_and_deletes(self):
+        token = self.full_sync()
+        edited, unshared, deleted = self.events
+        edited.title = 'Renamed'
+        edited.save()
+        unshared.shared_with.remove(self.friend)
+        deleted_id = deleted.id
+        with self.captureOnCommitCallbacks(execute=True):
+            deleted.delete()
+
+        delta = self.sync(sync_token=token)
+        self.assertFalse(delta['full_sync'])
+        self.assertEqual([event['title'] for event in delta['events']], ['Renamed'])
+        self.assertEqual(delta['deleted'], sorted([unshared.id, deleted_id]))
+
+    def test_delta_sync_ignores_events_the_user_cannot_see(self):
+        token = self.full_sync()
+        private = make_event(self.owner, 'Private')
+        private.title = 'Still private'
+        private.save()
+        self.assertEqual(self.sync(sync_token=token)['events'], [])
+
+    def test_the_cursor_stops_before_unsettled_changes_on_a_full_page(self):
+        token = self.full_sync()
+        for event in self.events[:2]:
+            event.title = f'{event.title} moved'
+            event.save()
+        with override_settings(EVENT_SYNC_SETTLE_SECONDS=60):
+            delta = self.sync(sync_token=token, limit=1)
+            self.assertEqual((len(delta['events']), delta['has_more']), (1, False))
+            again = self.sync(sync_token=delta['sync_token'], limit=1)
+            self.assertEqual(again['events'], delta['events'])
+
+            EventChange.objects.update(changed_at=timezone.now() - timedelta(minutes=5))
+            first = self.sync(sync_token=delta['sync_token'], limit=1)
+            second = self.sync(sync_token=first['sync_token'], limit=1)
+        self.assertTrue(first['has_more'])
+        self.assertEqual(
+            [event['id'] for event in first['events'] + second['events']], [event.id for event in self.events[:2]]
+        )
+
+    def test_tokens_of_other_users_are_rejected(self):
+        token = self.full_sync()
+        response = client_for(self.owner).get('/api/events/sync/', {'sync_token': token})
+        self.assertEqual(response.status_code, 410)
+
+
+@override_settings(REMINDER_DISPATCH_BATCH_SIZE=2, REMINDER_MAX_LATENESS_MINUTES=60)
+class ReminderSchedulerTests(TestCase):
+    def setUp(self):
+        self.owner = make_user('owner')
+        self.enqueue = mock.patch('schedules.tasks.send_event_reminder.delay').start()
+        self.addCleanup(mock.patch.stopall)
+
+    def remind(self, event, before=timedelta(minutes=30)):
+        return EventReminder.objects.create(event=event, reminder_time=before, reminder_type='in_app')
+
+    def test_one_off_reminders_are_claimed_once(self):
+        event = make_event(self.owner, 'Dentist', starts_in=timedelta(minutes=20))
+        reminder = self.remind(event)
+        self.assertEqual(reminder.fire_at, event.start_time - timedelta(minutes=30))
+
+        self.assertEqual(ReminderScheduler.dispatch(), 1)
+        self.enqueue.assert_called_once_with(event.id, dedupe_key=f"reminder:{event.id}:{reminder.fire_at.isoformat()}")
+        self.assertEqual(ReminderScheduler.dispatch(), 0)
+        reminder.refresh_from_db()
+        self.assertIsNotNone(reminder.sent_at)
+
+    def test_recurring_reminders_advance_to_the_next_occurrence(self):
+        event = make_event(self.owner, 'Standup', starts_in=timedelta(minutes=20), recurring=True, recurrence_rule={'frequency': 'DAILY'})
+        reminder = self.remind(event, before=timedelta(minutes=10))
+        first = reminder.fire_at
+
+        self.assertEqual(ReminderScheduler.dispatch(now=first), 1)
+        reminder.refresh_from_db()
+        self.assertEqual((reminder.fire_at, reminder.sent_at), (first + timedelta(days=1), None))
+
+    def test_batches_are_drained_and_stale_reminders_skipped(self):
+        for title in ('One', 'Two', 'Three'):
+            self.remind(make_event(self.owner, title, starts_in=timedelta(minutes=20)))
+        stale = self.remind(make_event(self.owner, 'Missed', starts_in=-timedelta(hours=2)))
+
+        self.assertEqual(ReminderScheduler.dispatch(), 3)
+        self.assertEqual(self.enqueue.call_count, 3)
+        self.assertFalse(EventReminder.objects.filter(sent_at__isnull=True).exists())
+        self.assertNotIn(stale.event_id, [call.args[0] for call in self.enqueue.call_args_list])
+
+
+class NotificationFanoutTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = [make_user(f'user{n}') for n in range(5)]
+
+    def test_recipients_skip_excluded_and_missing_users(self):
+        first, second = self.users[:2]
+        recipients = NotificationFanout.recipients([first, second.id, 999999], exclude=[first])
+        self.assertEqual(recipients, [(second, second.userprofile)])
+
+    @override_settings(NOTIFICATION_BULK_BATCH_SIZE=2)
+    def test_notifications_are_inserted_in_batches_and_counted(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(NotificationFanout.create(self.users, 'group_update', 'New member'), 5)
+        inserts = [query for query in queries if query['sql'].startswith('INSERT INTO "schedules_notification"')]
+        self.assertEqual(len(inserts), 3)
+        user_ids = [user.id for user in self.users]
+        self.assertEqual(NotificationInbox.unread_counts(user_ids), dict.fromkeys(user_ids, 1))
+
+
+class UnreadCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user('owner')
+        self.client = client_for(self.user)
+
+    def unread(self):
+        return self.client.get('/api/notifications/unread_count/').json()['unread_count']
+
+    def test_the_counter_follows_every_write_path(self):
+        single = Notification.objects.create(recipient=self.user, notification_type='system', message='Welcome')
+        NotificationFanout.create([self.user] * 3, 'group_update', 'New member')
+        self.assertEqual(self.unread(), 4)
+
+        newest = NotificationInbox.queryset(self.user).first()
+        second = NotificationInbox.queryset(self.user)[1]
+        response = self.client.post('/api/notifications/mark_read/', {'up_to': second.id}, format='json')
+        self.assertEqual(response.json(), {'updated': 3, 'unread_count': 1})
+
+        newest.delete()
+        self.assertEqual(self.unread(), 0)
+        single.delete()
+        self.assertEqual(CounterCache.reconcile(fix=False), (0, 0))
+
+    def test_reconcile_repairs_drift(self):
+        NotificationFanout.create([self.user] * 2, 'group_update', 'New member')
+        Notification.objects.update(is_read=True)
+        self.assertEqual(CounterCache.reconcile(), (0, 1))
+        self.assertEqual(self.unread(), 0)
+
+
+class NotificationCallSiteTests(TestCase):
+    def setUp(self):
+        self.admin = make_user('admin', email_notifications=False, push_notifications=False)
+        self.guest = make_user('guest', email_notifications=False, push_notifications=False)
+        self.group = Group.objects.create(name='Team', admin=self.admin)
+
+    def queued(self):
+        return list(NotificationOutbox.objects.order_by('id').values_list('recipient_id', 'notification_type'))
+
+    def test_invitations_notify_the_recipient_then_the_sender(self):
+        response = client_for(self.admin).post(f'/api/group-invitation/{self.group.id}/{self.guest.id}/')
+        self.assertEqual(response.status_code, 200)
+        invitation = Invitation.objects.get(recipient=self.guest)
+        response = client_for(self.guest).post(
+            f'/api/group-invitation-response/{invitation.id}/', {'response': 'accepted'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.queued(), [(self.guest.id, 'invitation'), (self.admin.id, 'invitation')])
+        self.assertIn('guest accepted', NotificationOutbox.objects.get(recipient=self.admin).message)
+
+    def test_work_schedule_change_notifies_its_owner(self):
+        schedule = WorkSchedule.objects.create(user=self.guest, day_of_week=0, start_time=time(9), end_time=time(17))
+        url = f'/api/notifications/{schedule.id}/send_schedule_change_notification/'
+        self.assertEqual(client_for(self.admin).post(url).status_code, 404)
+        self.assertEqual(client_for(self.guest).post(url).status_code, 200)
+        self.assertEqual(self.queued(), [(self.guest.id, 'schedule_change')])
+
+
+class GroupListingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = make_user('owner')
+        for n in range(3):
+            group = Group.objects.create(name=f'Team {n}', admin=self.owner)
+            group.members.add(self.owner, *[make_user(f'member{n}-{m}') for m in range(n + 1)])
+
+    def test_groups_are_listed_with_member_counts_in_constant_queries(self):
+        client = client_for(self.owner)
+        with CaptureQueriesContext(connection) as queries:
+            groups = client.get('/api/groups/', {'page_size': 10}).json()['results']
+        self.assertEqual({group['name']: group['member_count'] for group in groups}, {'Team 0': 2, 'Team 1': 3, 'Team 2': 4})
+        self.assertNotIn('members', groups[0])
+
+        Group.objects.get(name='Team 0').members.add(*[make_user(f'late{n}') for n in range(5)])
+        cache.clear()
+        with CaptureQueriesContext(connection) as more_queries:
+            client.get('/api/groups/', {'page_size': 10})
+        self.assertEqual(len(more_queries), len(queries))
+
+    def test_a_single_group_lists_its_members_and_their_count(self):
+        group = Group.objects.get(name='Team 1')
+        detail = client_for(self.owner).get(f'/api/groups/{group.id}/').json()
+        self.assertEqual((detail['member_count'], len(detail['members'])), (3, 3))
+
+
+class GroupCounterTests(TestCase):
+    def setUp(self):
+        self.admin = make_user('admin', email_notifications=False, push_notifications=False)
+        self.guest = make_user('guest', email_notifications=False, push_notifications=False)
+
+    def test_accepting_an_invitation_counts_the_new_member(self):
+        response = client_for(self.admin).post('/api/groups/', {'name': 'Team', 'admin': self.admin.id}, format='json')
+        self.assertEqual(response.status_code, 201)
+        group = Group.objects.get(name='Team')
+        GroupInvitationManager.send_invitation(group, self.guest)
+        GroupInvitationManager.process_invitation_response(Invitation.objects.get(recipient=self.guest), 'accepted')
+        group.refresh_from_db()
+        self.assertEqual(group.member_count, 2)
+
+    def test_saving_a_stale_group_keeps_the_counters(self):
+        group = Group.objects.create(name='Team', admin=self.admin)
+        stale = Group.objects.get(id=group.id)
+        group.members.add(self.admin, self.guest)
+        make_event(self.admin, 'Kickoff', group=group)
+        stale.description = 'Renamed'
+        stale.save()
+        group.refresh_from_db()
+        self.assertEqual((group.member_count, group.event_count, group.description), (2, 1, 'Renamed'))
+
+    def test_reconcile_repairs_every_chunk_from_the_database(self):
+        groups = [Group.objects.create(name=f'Team {n}', admin=self.admin) for n in range(3)]
+        for group in groups:
+            group.members.add(self.admin, self.guest)
+            make_event(self.admin, 'Kickoff', group=group)
+        Group.objects.update(member_count=7, event_count=0)
+        UserStats.objects.filter(user=self.admin).update(group_count=0)
+        UserStats.objects.filter(user=self.guest).delete()
+
+        self.assertEqual(CounterCache.reconcile(fix=False, batch_size=2), (3, 2))
+        self.assertEqual(CounterCache.reconcile(batch_size=2), (3, 2))
+        self.assertEqual(CounterCache.reconcile(fix=False, batch_size=2), (0, 0))
+        self.assertEqual(set(Group.objects.values_list('member_count', 'event_count')), {(2, 1)})
+        self.assertEqual(
+            dict(UserStats.objects.values_list('user_id', 'group_count')), {self.admin.id: 3, self.guest.id: 3}
+        )
+
+
+class DashboardSummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = make_user('owner', email_notifications=False, push_notifications=False)
+        self.client = client_for(self.owner)
+
+    def dashboard(self):
+        return self.client.get('/api/dashboard/').json()
+
+    def test_counts_are_read_from_the_counter_cache(self):
+        group = Group.objects.create(name='Team', admin=self.owner)
+        group.members.add(self.owner)
+        make_event(self.owner, 'Kickoff')
+        make_event(self.owner, 'Review')
+        summary = self.dashboard()
+        self.assertEqual((summary['event_count'], summary['group_count']), (2, 1))
+        self.assertEqual([group['name'] for group in summary['recent_groups']], ['Team'])
+
+        cache.clear()
+        UserStats.objects.filter(user=self.owner).update(event_count=42)
+        self.assertEqual(self.dashboard()['event_count'], 42)
+
+    def test_recurring_events_show_their_next_occurrence(self):
+        make_event(self.owner, 'Standup', starts_in=timedelta(days=-3, hours=2), recurring=True,
+                   recurrence_rule={'frequency': 'DAILY'})
+        make_event(self.owner, 'Offsite', starts_in=timedelta(days=2))
+        upcoming = self.dashboard()['upcoming_events']
+        self.assertEqual([event['title'] for event in upcoming], ['Standup', 'Offsite'])
+        start = parse_datetime(upcoming[0]['start_time'])
+        self.assertAlmostEqual(start - timezone.now(), timedelta(hours=2), delta=timedelta(minutes=1))
+        self.assertEqual(parse_datetime(upcoming[0]['end_time']) - start, timedelta(hours=1))
+
+    def test_a_calendar_version_bump_serves_a_fresh_summary(self):
+        make_event(self.owner, 'Kickoff')
+        self.assertEqual(self.dashboard()['event_count'], 1)
+
+        # Without the on-commit version bump the cached summary is still served.
+        make_event(self.owner, 'Review')
+        self.assertEqual(self.dashboard()['event_count'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_event(self.owner, 'Retro', starts_in=timedelta(days=2))
+        summary = self.dashboard()
+        self.assertEqual(summary['event_count'], 3)
+        self.assertEqual([event['title'] for event in summary['upcoming_events']], ['Kickoff', 'Review', 'Retro'])
+
+
+class ProfileCacheTests(TestCase):
+    def setUp(self):
+        ProfileCache.clear()
+        self.addCleanup(ProfileCache.clear)
+        self.owner = make_user('owner', timezone='Europe/Paris')
+        self.friend = make_user('friend')
+        self.bare = CustomUser.objects.create_user(username='bare', password='password')
+
+    def test_misses_load_in_one_query_and_hits_in_none(self):
+        with self.assertNumQueries(1):
+            profiles = ProfileCache.get_many([self.owner, self.friend.id, self.bare])
+        self.assertEqual(
+            {user_id: profile and profile.timezone for user_id, profile in profiles.items()},
+            {self.owner.id: 'Europe/Paris', self.friend.id: 'UTC', self.bare.id: None},
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(ProfileCache.timezone_name(self.owner), 'Europe/Paris')
+            self.assertEqual(ProfileCache.timezone_name(self.bare), 'UTC')
+
+    def test_callers_get_copies_and_saves_evict(self):
+        ProfileCache.get(self.owner).timezone = 'Asia/Tokyo'
+        self.assertEqual(ProfileCache.timezone_name(self.owner), 'Europe/Paris')
+
+        UserProfile.objects.filter(user=self.owner).update(timezone='America/Chicago')
+        self.assertEqual(ProfileCache.timezone_name(self.owner), 'Europe/Paris')
+        profile = UserProfile.objects.get(user=self.owner)
+        profile.save()
+        self.assertEqual(ProfileCache.timezone_name(self.owner), 'America/Chicago')
+
+    def test_a_request_scope_memoizes_past_the_shared_cache(self):
+        with ProfileCache.request_scope():
+            ProfileCache.get(self.owner)
+            ProfileCache.clear()
+            with self.assertNumQueries(0):
+                ProfileCache.get(self.owner)
+        with self.assertNumQueries(1):
+            ProfileCache.get(self.owner)
+
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        # Long enough for the other callers to arrive while this one computes.
+        threading.Event().wait(0.2)
+        return {'free': ['09:00']}
+
+    def test_concurrent_identical_reads_compute_once(self):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(SingleFlight.do('free_busy', {'group': 1}, self.compute)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [{'free': ['09:00']}] * 5)
+
+    def test_results_are_shared_briefly_and_keyed_on_normalized_params(self):
+        SingleFlight.do('free_busy', {'group': 1, 'day': date(2026, 1, 5)}, self.compute)
+        SingleFlight.do('free_busy', {'day': date(2026, 1, 5), 'group': 1}, self.compute)
+        self.assertEqual(self.calls, 1)
+        SingleFlight.do('free_busy', {'group': 2, 'day': date(2026, 1, 5)}, self.compute)
+        self.assertEqual(self.calls, 2)
+
+    def test_errors_reach_every_waiting_caller(self):
+        def fail():
+            threading.Event().wait(0.2)
+            raise ValueError('no schedule')
+
+        errors = []
+
+        def call():
+            try:
+                SingleFlight.do('schedule', {'user': 1}, fail)
+            except ValueError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(errors), 3)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(SimpleTestCase):
+    router = ReplicaRouter()
+
+    def test_reads_stay_on_the_primary_outside_a_replica_context(self):
+        self.assertEqual(self.router.db_for_read(Event), 'default')
+
+    def test_replica_reads_until_the_first_write(self):
+        with use_replica():
+            self.assertEqual(self.router.db_for_read(Event), 'replica')
+            self.assertEqual(self.router.db_for_write(Event), 'default')
+            self.assertEqual(self.router.db_for_read(Event), 'default')
+        with use_replica():
+            self.assertEqual(self.router.db_for_read(Event), 'replica')
+
+    def test_use_primary_and_transactions_override_the_replica(self):
+        with use_replica():
+            with use_primary():
+                self.assertEqual(self.router.db_for_read(Event), 'default')
+            with mock.patch.object(connections['default'], 'in_atomic_block', True):
+                self.assertEqual(self.router.db_for_read(Event), 'default')
+            self.assertEqual(self.router.db_for_read(Event), 'replica')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_configured(self):
+        with use_replica():
+            self.assertEqual(self.router.db_for_read(Event), 'default')
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_STICKY_SECONDS=60)
+class ReplicaRoutingMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.reads = []
+        self.middleware = ReplicaRoutingMiddleware(self.view)
+
+    def view(self, request):
+        self.reads.append(ReplicaRouter().db_for_read(Event))
+        if request.method == 'POST':
+            ReplicaRouter().db_for_write(Event)
+        return None
+
+    def call(self, method, token):
+        request = getattr(RequestFactory(), method)('/api/events/', HTTP_AUTHORIZATION=f'Token {token}')
+        self.middleware(request)
+
+    def test_clients_read_their_own_writes(self):
+        self.call('get', 'alice')
+        self.call('post', 'alice')
+        self.call('get', 'alice')
+        self.call('get', 'bob')
+        self.assertEqual(self.reads, ['replica', 'default', 'default', 'replica'])
+
+
+class InvalidationBusTests(TestCase):
+    def setUp(self):
+        self.evicted = []
+        InvalidationBus.register('test', self.evicted.extend, self.evicted.clear)
+        self.addCleanup(InvalidationBus._handlers.pop, 'test')
+
+    def test_payloads_stay_under_the_notify_limit(self):
+        keys = [f'key-{n:05d}' for n in range(2000)]
+        payloads = list(InvalidationBus._payloads('test', keys))
+        self.assertGreater(len(payloads), 1)
+        self.assertTrue(all(len(p.encode('utf-8')) <= invalidation_bus.MAX_PAYLOAD_BYTES for p in payloads))
+        self.assertEqual([key for p in payloads for key in json.loads(p)['keys']], keys)
+
+    @override_settings(INVALIDATION_BUS_ENABLED=False)
+    def test_publish_evicts_now_and_again_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            InvalidationBus.publish('test', [1, 2])
+            self.assertEqual(self.evicted, ['1', '2'])
+        self.assertEqual(self.evicted, ['1', '2', '1', '2'])
+
+    def test_malformed_payloads_are_ignored(self):
+        InvalidationBus.handle_payload('not json')
+        InvalidationBus.handle_payload(json.dumps({'ns': 'test'}))
+        InvalidationBus.handle_payload(json.dumps({'ns': 'test', 'keys': ['a']}))
+        self.assertEqual(self.evicted, ['a'])
+
+
+@skipUnless(connection.vendor == 'postgresql', "LISTEN/NOTIFY needs PostgreSQL")
+class InvalidationListenerTests(TransactionTestCase):
+    def test_listener_evicts_on_notify(self):
+        received = threading.Event()
+        InvalidationBus.register('test', lambda keys: received.set() if keys == ['k'] else None, lambda: None)
+        self.addCleanup(InvalidationBus._handlers.pop, 'test')
+        self.addCleanup(InvalidationBus.stop_listener, 5)
+        self.assertTrue(InvalidationBus.start_listener())
+        self.assertTrue(InvalidationBus.wait_until_listening(10))
+        received.clear()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [settings.INVALIDATION_CHANNEL, json.dumps({'ns': 'test', 'keys': ['k']})])
+        self.assertTrue(received.wait(10))
+
+
+@override_settings(AGENDA_STORE_BACKEND='schedules.agenda_store.InMemoryAgendaBackend')
+class AgendaStoreTests(TestCase):
+    def setUp(self):
+        AgendaStore._backend = None
+        self.addCleanup(setattr, AgendaStore, '_backend', None)
+        self.owner = make_user('owner')
+        self.friend = make_user('friend')
+        self.soon = make_event(self.owner, 'Soon')
+        self.later = make_event(self.owner, 'Later', starts_in=timedelta(days=20))
+        self.private = make_event(self.friend, 'Private')
+        self.start = timezone.now()
+        self.end = self.start + timedelta(days=7)
+
+    def listed(self, user):
+        response = client_for(user).get('/api/events/', {
+            'start_date': self.start.date().isoformat(), 'end_date': self.end.date().isoformat()
+        })
+        return [event['title'] for event in response.json()['data']]
+
+    def test_range_listing_matches_the_database(self):
+        self.assertEqual(self.listed(self.owner), ['Soon'])
+        with override_settings(AGENDA_STORE_BACKEND=''):
+            self.assertEqual(self.listed(self.owner), ['Soon'])
+
+    def test_stale_candidates_are_not_listed(self):
+        AgendaStore.build(self.owner.id)
+        AgendaStore.backend().apply(*AgendaStore._changes(
+            [(self.owner.id, self.private.id, False, self.private.start_time, self.private.end_time)]
+        ))
+        self.assertIn(self.private.id, AgendaStore.range_ids(self.owner.id, self.start, self.end))
+        self.assertEqual(self.listed(self.owner), ['Soon'])
+
+    def test_index_follows_commits(self):
+        AgendaStore.build(self.friend.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.soon.shared_with.add(self.friend)
+        self.assertIn(self.soon.id, AgendaStore.range_ids(self.friend.id, self.start, self.end))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.soon.shared_with.remove(self.friend)
+        self.assertNotIn(self.soon.id, AgendaStore.range_ids(self.friend.id, self.start, self.end))
+
+    def test_long_and_recurring_events_are_found_from_later_ranges(self):
+        long_event = make_event(self.owner, 'Conference', starts_in=timedelta(days=-3), duration=timedelta(days=5))
+        series = make_event(self.owner, 'Weekly', starts_in=timedelta(days=-60), recurring=True)
+        ids = AgendaStore.range_ids(self.owner.id, self.start, self.end)
+        self.assertIn(long_event.id, ids)
+        self.assertIn(series.id, ids)
+        self.assertNotIn(self.later.id, ids)
+
+
+class CalendarWarmerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user('owner', default_view='WEEK')
+        make_event(self.user, 'Soon')
+
+    def test_ranges_are_the_current_and_next_month(self):
+        self.assertEqual(
+            CalendarWarmer.ranges(date(2026, 12, 15)),
+            [(date(2026, 12, 1), date(2026, 12, 31)), (date(2027, 1, 1), date(2027, 1, 31))]
+        )
+
+    def test_the_apps_month_request_is_a_cache_hit_after_warming(self):
+        CalendarWarmer.warm(self.user)
+        CalendarRangeCache.reset_stats()
+        today = timezone.now().astimezone(zoneinfo.ZoneInfo(ProfileCache.timezone_name(self.user))).date()
+        start, end = CalendarWarmer.ranges(today)[0]
+        # The home screen sends startOfMonth..endOfMonth and the user id.
+        response = client_for(self.user).get('/api/events/', {
+            'start_date': start.isoformat(), 'end_date': end.isoformat(), 'user_id': str(self.user.id)
+        })
+        self.assertEqual(response.status_code, 200)
+        stats = CalendarRangeCache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 0))
+
+
+class GroupMemberPaginationTests(TestCase):
+    def setUp(self):
+        self.admin = make_user('admin')
+        self.group = Group.objects.create(name='Team', admin=self.admin)
+        self.group.members.add(self.admin, *[make_user(f'member{n}') for n in range(4)])
+
+    def test_member_pages_take_the_count_from_the_counter(self):
+        client = client_for(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            first = client.get(f'/api/groups/{self.group.id}/members/', {'page_size': 2}).json()
+        self.assertFalse(any('COUNT(' in query['sql'].upper() for query in queries.captured_queries))
+        self.assertEqual(first['count'], 5)
+        self.assertEqual(len(first['results']), 2)
+        self.assertIsNotNone(first['next'])
+        last = client.get(f'/api/groups/{self.group.id}/members/', {'page_size': 2, 'page': 3}).json()
+        self.assertEqual((last['count'], len(last['results']), last['next']), (5, 1, None))
+
+
+class PushDeliveryTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.fcm = FCMStubServer().start()
+        cls.addClassCleanup(cls.fcm.stop)
+
+    def setUp(self):
+        self.fcm.requests = self.fcm.messages = 0
+        settings_override = override_settings(
+            FCM_ENDPOINT=self.fcm.url, FCM_SERVER_KEY='test', PUSH_MULTICAST_SIZE=2,
+            PUSH_MAX_RETRIES=1, PUSH_RETRY_BACKOFF_SECONDS=0,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_results_are_reported_per_token(self):
+        results = PushDelivery.send(['ok-1', 'invalid-1', 'canonical-1', 'unavailable-1', 'ok-1'], 'Title', 'Body')
+        self.assertEqual(results, {
+            'ok-1': None, 'invalid-1': 'NotRegistered', 'canonical-1': None, 'unavailable-1': 'Unavailable',
+        })
+        # Duplicates are sent once: two batches of two, then one retry of the transient failure.
+        self.assertEqual((self.fcm.requests, self.fcm.messages), (3, 5))
+
+    def test_feedback_deactivates_dead_tokens_and_moves_canonical_ones(self):
+        user = make_user('owner')
+        for token in ('ok-1', 'invalid-1', 'canonical-1', 'canonical-2', 'renewed-canonical-2'):
+            UserDeviceToken.objects.create(user=user, token=token, device_type='android')
+        PushDelivery.send_to_users([user.id], 'Title', 'Body')
+        tokens = dict(UserDeviceToken.objects.values_list('token', 'is_active'))
+        self.assertEqual(tokens, {
+            'ok-1': True, 'invalid-1': False, 'renewed-canonical-1': True, 'renewed-canonical-2': True,
+        })
+
+    def test_tokens_are_pruned_by_when_they_were_deactivated(self):
+        user = make_user('owner')
+        UserDeviceToken.objects.create(user=user, token='invalid-old', device_type='ios')
+        renewed = UserDeviceToken.objects.create(user=user, token='invalid-renewed', device_type='ios')
+        long_ago = timezone.now() - timedelta(days=90)
+        UserDeviceToken.objects.update(last_used=long_ago)
+        PushDelivery.send_to_users([user.id], 'Title', 'Body')
+        self.assertEqual(PushDelivery.prune_tokens(older_than_days=30), 0)
+
+        UserDeviceToken.objects.update(deactivated_at=long_ago)
+        client_for(user).post('/api/user-device-tokens/register_device/', {'token': renewed.token, 'device_type': 'ios'})
+        self.assertEqual(PushDelivery.prune_tokens(older_than_days=30), 1)
+        self.assertEqual(list(UserDeviceToken.objects.values_list('token', 'is_active')), [(renewed.token, True)])
+
+    def test_outbox_push_rows_fail_only_for_recipients_nothing_reached(self):
+        tokens = {'reached': ['ok-1'], 'partly': ['ok-2', 'unavailable-1'], 'down': ['unavailable-2'], 'gone': ['invalid-1']}
+        rows = {}
+        for username, user_tokens in tokens.items():
+            user = make_user(username)
+            for token in user_tokens:
+                UserDeviceToken.objects.create(user=user, token=token, device_type='android')
+            rows[username] = NotificationOutbox.objects.create(
+                channel=NotificationOutbox.PUSH, recipient=user, notification_type='reminder', subject='S', message='M'
+            )
+        with override_settings(PUSH_MAX_RETRIES=0):
+            self.assertEqual(Outbox.drain(NotificationOutbox.PUSH), 3)
+        outcome = {
+            username: (row.status, row.last_error)
+            for username, row in ((username, NotificationOutbox.objects.get(id=row.id)) for username, row in rows.items())
+        }
+        self.assertEqual(outcome, {
+            'reached': ('sent', ''), 'partly': ('sent', ''), 'down': ('pending', 'Unavailable'), 'gone': ('sent', ''),
+        })
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = make_user('owner', push_notifications=False)
+        self.friend = make_user('friend', email_notifications=False, push_notifications=False)
+
+    def in_app_rows(self):
+        return [
+            NotificationOutbox.objects.create(
+                channel=NotificationOutbox.IN_APP, recipient=user, notification_type='reminder', message='Soon'
+            )
+            for user in (self.owner, self.friend)
+        ]
+
+    def test_in_app_rows_are_delivered_once(self):
+        rows = self.in_app_rows()
+        self.assertEqual(Outbox.deliver(NotificationOutbox.IN_APP, rows), 2)
+        # A second worker whose lease on the same rows ran out adds nothing.
+        self.assertEqual(Outbox.deliver(NotificationOutbox.IN_APP, rows), 2)
+        self.assertEqual(
+            sorted(Notification.objects.values_list('outbox_id', flat=True)), sorted(row.id for row in rows)
+        )
+        self.assertEqual(NotificationInbox.unread_counts([self.owner.id, self.friend.id]), {self.owner.id: 1, self.friend.id: 1})
+
+    def test_failed_rows_back_off_then_give_up(self):
+        row = NotificationOutbox.objects.create(
+            channel=NotificationOutbox.EMAIL, recipient=self.owner, notification_type='reminder', subject='S', message='M'
+        )
+        with override_settings(OUTBOX_MAX_ATTEMPTS=2, OUTBOX_RETRY_BACKOFF_SECONDS=60), \
+                mock.patch.object(Outbox, '_deliver_email', side_effect=RuntimeError('SMTP down')):
+            self.assertEqual(Outbox.drain(NotificationOutbox.EMAIL), 0)
+            row.refresh_from_db()
+            self.assertEqual((row.status, row.attempts, row.last_error), (NotificationOutbox.PENDING, 1, 'SMTP down'))
+            self.assertGreater(row.available_at, timezone.now() + timedelta(seconds=50))
+
+            NotificationOutbox.objects.filter(id=row.id).update(available_at=timezone.now())
+            self.assertEqual(Outbox.drain(NotificationOutbox.EMAIL), 0)
+            row.refresh_from_db()
+            self.assertEqual((row.status, row.attempts), (NotificationOutbox.FAILED, 2))
+
+    def test_a_dedupe_key_queues_once_per_channel_and_recipient(self):
+        recipients = [(user, user.userprofile) for user in (self.owner, self.friend)]
+        Outbox.add(recipients, 'invitation', 'Join us', subject='Invitation', dedupe_key='invitation:1:pending')
+        Outbox.add(recipients, 'invitation', 'Join us', subject='Invitation', dedupe_key='invitation:1:pending')
+        self.assertEqual(
+            sorted(NotificationOutbox.objects.values_list('recipient__username', 'channel')),
+            [('friend', 'in_app'), ('owner', 'email'), ('owner', 'in_app')],
+        )
+
+
+@override_settings(NOTIFICATION_DIGEST_WINDOW_SECONDS=300)
+class NotificationDigestTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user('owner', push_notifications=False)
+
+    def test_a_merged_notification_moves_to_the_top_of_the_inbox(self):
+        NotificationFanout.create([self.user], 'event_update', 'ETA 10 min', topic='eta:1')
+        Notification.objects.update(created_at=timezone.now() - timedelta(minutes=1))
+        NotificationFanout.create([self.user], 'reminder', 'Lunch soon')
+        NotificationFanout.create([self.user], 'event_update', 'ETA 5 min', topic='eta:1')
+        inbox = list(NotificationInbox.queryset(self.user).values_list('message', 'occurrences'))
+        self.assertEqual(inbox, [('ETA 5 min', 2), ('Lunch soon', 1)])
+        self.assertEqual(NotificationInbox.unread_count(self.user.id), 2)
+
+    def test_the_first_email_goes_out_at_once_and_later_ones_are_digested(self):
+        recipients = [(self.user, self.user.userprofile)]
+        Outbox.add(recipients, 'event_update', 'ETA 10 min', subject='ETA', topic='eta:1')
+        Outbox.add(recipients, 'event_update', 'ETA 8 min', subject='ETA', topic='eta:1')
+        self.assertEqual(Outbox.drain(NotificationOutbox.EMAIL), 1)
+        self.assertEqual([message.body for message in mail.outbox], ['ETA 8 min (2 updates)'])
+
+        Outbox.add(recipients, 'event_update', 'ETA 5 min', subject='ETA', topic='eta:1')
+        Outbox.add(recipients, 'event_update', 'ETA 3 min', subject='ETA', topic='eta:1')
+        self.assertEqual(Outbox.drain(NotificationOutbox.EMAIL), 0)
+        held = NotificationOutbox.objects.get(channel=NotificationOutbox.EMAIL, status=NotificationOutbox.PENDING)
+        self.assertEqual((held.message, held.occurrences), ('ETA 3 min', 2))
+        self.assertGreater(held.available_at, timezone.now() + timedelta(minutes=4))
+
+
+@override_settings(NOTIFICATION_STREAM_COALESCE_SECONDS=0)
+class NotificationStreamTests(TransactionTestCase):
+    def setUp(self):
+        self.user = make_user('owner')
+
+    def connect(self, query_string=b''):
+        # Imported here so the project ASGI entry point is what gets tested.
+        from calendar_app.asgi import application
+        scope = {'type': 'websocket', 'path': '/ws/notifications/', 'query_string': query_string, 'headers': []}
+        return ApplicationCommunicator(application, scope)
+
+    @async_to_sync
+    async def test_token_authenticated_sockets_receive_notifications(self):
+        socket = self.connect(f'token={AccessToken.for_user(self.user)}'.encode())
+        await socket.send_input({'type': 'websocket.connect'})
+        self.assertEqual((await socket.receive_output(1))['type'], 'websocket.accept')
+        self.assertEqual(json.loads((await socket.receive_output(1))['text']), {'type': 'unread_count', 'unread_count': 0})
+
+        await get_channel_layer().group_send(NotificationStream.group_name(self.user.id), {
+            'type': 'notification.created', 'notifications': [{'id': 1, 'message': 'Soon'}], 'unread_count': 1,
+        })
+        frame = json.loads((await socket.receive_output(1))['text'])
+        self.assertEqual(frame, {'type': 'notifications', 'notifications': [{'id': 1, 'message': 'Soon'}], 'unread_count': 1})
+        await socket.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await socket.wait(1)
+
+    @async_to_sync
+    async def test_anonymous_sockets_are_closed(self):
+        socket = self.connect(b'token=invalid')
+        await socket.send_input({'type': 'websocket.connect'})
+        self.assertEqual(await socket.receive_output(1), {'type': 'websocket.close', 'code': 4401})
+
+    def test_publishing_without_a_working_channel_layer_is_harmless(self):
+        with mock.patch('schedules.notification_stream.get_channel_layer', side_effect=ImportError('channels_redis')):
+            NotificationStream._send('notification.unread', {self.user.id: []})
+
+
+@override_settings(WEEKLY_SUMMARY_PARTITION_SIZE=2, EMAIL_BATCH_SIZE=1)
+class WeeklySummaryTests(TestCase):
+    def setUp(self):
+        self.users = [make_user(f'user{n}') for n in range(4)]
+        muted = make_user('muted', email_notifications=False)
+        for user in self.users + [muted]:
+            make_event(user, f"{user.username}'s review")
+        self.today = timezone.localdate()
+
+    def test_a_retried_partition_resumes_after_its_checkpoint(self):
+        first, second = WeeklySummary.plan(self.today)
+        send_batch = EmailDispatcher.send_batch
+
+        def fail_after_one(messages):
+            if mail.outbox:
+                raise ConnectionError('SMTP went away')
+            return send_batch(messages)
+
+        with mock.patch.object(EmailDispatcher, 'send_batch', side_effect=fail_after_one), \
+                self.assertRaises(ConnectionError):
+            WeeklySummary.send_partition(first)
+        partition = WeeklySummaryPartition.objects.get(id=first)
+        self.assertEqual((partition.checkpoint_user_id, partition.sent_count), (self.users[0].id, 1))
+        # Another worker keeps off the partition until the lease runs out.
+        self.assertEqual(WeeklySummary.send_partition(first), 0)
+
+        WeeklySummaryPartition.objects.filter(id=first).update(leased_until=timezone.now())
+        self.assertEqual(WeeklySummary.send_partition(first), 1)
+        self.assertEqual([message.to for message in mail.outbox], [['user0@example.com'], ['user1@example.com']])
+        self.assertIn("user1's review", mail.outbox[1].body)
+
+        with mock.patch('schedules.tasks.send_weekly_summary_partition.delay') as enqueue:
+            self.assertEqual(WeeklySummary.start(self.today), 1)
+        enqueue.assert_called_once_with(second)
+        self.assertEqual(WeeklySummaryPartition.objects.filter(week_start=self.today).count(), 2)
+
+
+class EmailDispatcherTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.smtp = SMTPSinkServer().start()
+        cls.addClassCleanup(cls.smtp.stop)
+
+    def setUp(self):
+        self.smtp.connections = 0
+        self.smtp.messages.clear()
+        host, port = self.smtp.server_address[:2]
+        settings_override = override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend', EMAIL_HOST=host, EMAIL_PORT=port,
+            EMAIL_USE_TLS=False, EMAIL_HOST_USER='', EMAIL_HOST_PASSWORD='', EMAIL_BATCH_SIZE=3,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_one_connection_per_batch(self):
+        messages = [EmailDispatcher.message('Hi', 'Body', f'user{n}@example.com') for n in range(5)]
+        self.assertEqual(EmailDispatcher.send(messages), 5)
+        self.assertEqual(self.smtp.connections, 2)
+        self.assertEqual(len(self.smtp.messages), 5)
+
+    def test_refused_recipients_are_skipped(self):
+        batch = [
+            EmailDispatcher.message('Hi', 'Body', 'first@example.com'),
+            EmailDispatcher.message('Hi', 'Body', 'rejected@example.com'),
+            EmailDispatcher.message('Hi', 'Body', 'last@example.com'),
+        ]
+        errors = EmailDispatcher.deliver(batch)
+        self.assertIsNone(errors[0])
+        self.assertIsNotNone(errors[1])
+        self.assertIsNone(errors[2])
+        self.assertEqual([recipients for recipients, _ in self.smtp.messages], [['first@example.com'], ['last@example.com']])
+        self.assertEqual(self.smtp.connections, 1)
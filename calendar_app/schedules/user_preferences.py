@@ -1,4 +1,5 @@
 from .models import UserProfile
+from .profile_cache import ProfileCache
 from django.core.exceptions import ValidationError
 
 class UserPreferencesManager:
@@ -32,9 +33,8 @@ class UserPreferencesManager:
         if not user:
             raise ValidationError("A valid user is required.")
 
-        try:
-            user_profile = UserProfile.objects.get(user=user)
-        except UserProfile.DoesNotExist:
+        user_profile = ProfileCache.get(user)
+        if user_profile is None:
             raise ValidationError("User profile not found.")
 
         preferences = {
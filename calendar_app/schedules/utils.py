@@ -14,32 +14,17 @@ import jwt
 import colorsys
 from dateutil.rrule import rrulestr
 
+from .profile_cache import ProfileCache
+from .push_delivery import PushDelivery
+
 logger = logging.getLogger(__name__)
 
 def send_push_notification(token, title, body):
     """
-    Send a push notification using Firebase Cloud Messaging (FCM).
+    Send a push notification to one device using Firebase Cloud Messaging (FCM).
+    To reach many devices, use PushDelivery.send, which batches them.
     """
-    if not settings.FCM_SERVER_KEY:
-        logger.error("FCM_SERVER_KEY is not set. Cannot send push notification.")
-        return False
-
-    url = "https://fcm.googleapis.com/fcm/send"
-    headers = {
-        "Authorization": f"key={settings.FCM_SERVER_KEY}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "to": token,
-        "notification": {
-            "title": title,
-            "body": body
-        }
-    }
-    response = requests.post(url, json=payload, headers=headers)
-    if response.status_code != 200:
-        logger.error(f"Failed to send push notification. Status: {response.status_code}, Response: {response.text}")
-    return response.status_code == 200
+    return PushDelivery.send([token], title, body).get(token, 'NoToken') is None
 
 def calculate_eta(start_location, end_location):
     """
@@ -213,7 +198,7 @@ def get_user_timezone(user):
     """
     Get the user's timezone, defaulting to UTC if not set.
     """
-    tz_name = getattr(user.userprofile, 'timezone', 'UTC')
+    tz_name = ProfileCache.timezone_name(user)
     try:
         return pytz.timezone(tz_name)
     except Exception as e:
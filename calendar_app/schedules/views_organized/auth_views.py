@@ -1,7 +1,6 @@
 import base64
 import uuid
 import logging
-from django.core.mail import send_mail
 from django.shortcuts import get_object_or_404
 from django.conf import settings
 from Crypto.Cipher import AES
@@ -14,9 +13,13 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from django.contrib.auth import authenticate
 from rest_framework_simplejwt.views import TokenRefreshView
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 
 from ..models import CustomUser, UserProfile
 from ..serializers import UserSerializer
+from ..cache_warming import CalendarWarmer
+from ..email_delivery import EmailDispatcher
 
 logger = logging.getLogger(__name__)
 
@@ -61,6 +64,7 @@ class AuthView(APIView):
                 'refresh_token': str(refresh),
             }
             logger.info(f"User {username} authenticated successfully.")
+            CalendarWarmer.schedule(user)
             return Response({'data': response_data}, status=status.HTTP_200_OK)
 
         logger.warning(f"Invalid credentials for user {username}.")
@@ -143,6 +147,7 @@ class LoginView(APIView):
                 'refresh_token': str(refresh),
             }
             logger.info(f"Login successful for user {username}.")
+            CalendarWarmer.schedule(user)
             return Response({'data': response_data}, status=status.HTTP_200_OK)
 
         logger.warning(f"Login failed for user {username}: Invalid credentials.")
@@ -172,14 +177,10 @@ class PasswordResetView(APIView):
             user.profile.reset_token = reset_token
             user.profile.save()
             reset_link = f"{settings.FRONTEND_URL}/reset-password/{reset_token}"
-            send_mail(
-                'Password Reset',
-                f'Click this link to reset your password: {reset_link}',
-                settings.DEFAULT_FROM_EMAIL,
-                [email],
-                fail_silently=False,
-            )
-            logger.info(f"Password reset email sent to {email}.")
+            EmailDispatcher.enqueue([
+                EmailDispatcher.message('Password Reset', f'Click this link to reset your password: {reset_link}', email)
+            ])
+            logger.info(f"Password reset email queued for {email}.")
             return Response({'data': {'message': 'Password reset email sent'}})
         except Exception as e:
             logger.error(f"Error resetting password for {email}: {str(e)}")
@@ -216,7 +217,17 @@ class CustomTokenRefreshView(TokenRefreshView):
         try:
             logger.info("Refreshing token.")
             response = super().post(request, *args, **kwargs)
+            self.warm_calendar(response.data.get('access'))
             return Response({'data': response.data}, status=status.HTTP_200_OK)
         except Exception as e:
             logger.error(f"Token refresh failed: {str(e)}")
-            return Response({'data': {'error': 'Token refresh failed'}}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+            return Response({'data': {'error': 'Token refresh failed'}}, status=status.HTTP_400_BAD_REQUEST)
+
+    def warm_calendar(self, access_token):
+        try:
+            user_id = AccessToken(access_token)[jwt_settings.USER_ID_CLAIM]
+            user = CustomUser.objects.get(**{jwt_settings.USER_ID_FIELD: user_id})
+        except Exception as e:
+            logger.warning(f"Skipping calendar warm-up after token refresh: {e}")
+            return
+        CalendarWarmer.schedule(user)
@@ -1,18 +1,19 @@
 from rest_framework import permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.db.models import Q
 from django.utils import timezone
 from django.http import HttpResponse
 import csv
 from datetime import datetime
 from django.core.exceptions import ValidationError
-import zoneinfo
 
 from ..models import Event
 from ..serializers import CalendarViewSerializer, EventSerializer, EventExportSerializer
 from ..utils import find_common_free_time, generate_ical
 from ..external_calendar_sync import ExternalCalendarSync
+from ..event_access import visible_events
+from ..range_cache import CalendarRangeCache
+from ..single_flight import SingleFlight
 
 
 class CalendarView(APIView):
@@ -25,8 +26,16 @@ class CalendarView(APIView):
         end_date = serializer.validated_data['end_date']
         view_type = serializer.validated_data['view_type']
 
-        events = Event.objects.filter(
-            Q(created_by=request.user) | Q(shared_with=request.user),
+        payload = CalendarRangeCache.get_or_compute(
+            request.user.id, view_type, {'start': start_date.isoformat(), 'end': end_date.isoformat()},
+            lambda: self.get_events_payload(request.user, start_date, end_date, view_type)
+        )
+        return Response(payload, status=status.HTTP_200_OK)
+
+    def get_events_payload(self, user, start_date, end_date, view_type):
+        events = visible_events(
+            user,
+            include_groups=False,
             start_time__date__gte=start_date,
             end_time__date__lte=end_date
         )
@@ -38,18 +47,7 @@ class CalendarView(APIView):
             week_end = week_start + timezone.timedelta(days=6)
             events = events.filter(start_time__date__range=[week_start, week_end])
 
-        # Add awareness to the event datetimes if not already
-        # This ensures that if events are naive, they are converted to the user's timezone or UTC as fallback
-        for event in events:
-            if timezone.is_naive(event.start_time):
-                tz = zoneinfo.ZoneInfo(event.event_timezone if event.event_timezone else 'UTC')
-                event.start_time = timezone.make_aware(event.start_time, tz)
-            if timezone.is_naive(event.end_time):
-                tz = zoneinfo.ZoneInfo(event.event_timezone if event.event_timezone else 'UTC')
-                event.end_time = timezone.make_aware(event.end_time, tz)
-
-        serializer = EventSerializer(events, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return EventSerializer(events, many=True).data
 
 
 class FreeBusyView(APIView):
@@ -74,17 +72,24 @@ class FreeBusyView(APIView):
         if not user_ids:
             return Response({'error': 'At least one user_id must be provided'}, status=status.HTTP_400_BAD_REQUEST)
 
+        common_free_time = SingleFlight.do(
+            'free_busy', {'users': sorted(set(map(str, user_ids))), 'start': start_date, 'end': end_date},
+            lambda: self.get_free_time(user_ids, start_date, end_date)
+        )
+        return Response({'free_time': common_free_time}, status=status.HTTP_200_OK)
+
+    def get_free_time(self, user_ids, start_date, end_date):
         user_events = {}
         for user_id in user_ids:
-            events = Event.objects.filter(
-                Q(created_by_id=user_id) | Q(shared_with__id=user_id),
+            events = visible_events(
+                user_id,
+                include_groups=False,
                 start_time__lt=end_date,
                 end_time__gt=start_date
             )
             user_events[user_id] = events
 
-        common_free_time = find_common_free_time(user_events, start_date, end_date)
-        return Response({'free_time': common_free_time}, status=status.HTTP_200_OK)
+        return find_common_free_time(user_events, start_date, end_date)
 
 
 class ImportExportView(APIView):
@@ -5,24 +5,31 @@ from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
 from django.shortcuts import get_object_or_404
 from django.db.models import Q
 from django.utils import timezone
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpRequest, QueryDict
+from django.conf import settings
 import csv
 from dateutil.rrule import rrule, WEEKLY, DAILY, MONTHLY, YEARLY, MO, TU, WE, TH, FR, SA, SU
 import zoneinfo
 
-from ..models import Event, EventReminder, RecurringSchedule, CustomUser
+from ..models import Event, EventChange, EventReminder, RecurringSchedule, CustomUser
 from ..serializers import EventSerializer, EventExportSerializer, RecurringScheduleSerializer
-from ..tasks import send_event_reminder
 from ..utils import generate_ical
 from ..permissions import IsEventOwnerOrShared
+from ..permission_resolver import PermissionResolver
+from ..event_access import visible_among, visible_events
+from ..range_cache import CalendarRangeCache
+from ..pagination import CountFreePagination
+from ..agenda_store import AgendaStore
+from ..event_changes import EventChangeLog, SyncTokenError
 
 logger = logging.getLogger(__name__)
 
-class CustomPageNumberPagination(PageNumberPagination):
+class CustomPageNumberPagination(CountFreePagination):
+    count_mode = 'cached'
     page_size_query_param = 'page_size'
     max_page_size = 100
 
@@ -107,20 +114,21 @@ class EventViewSet(viewsets.ModelViewSet):
                 end_dt = timezone.make_aware(end_dt, dt_timezone.utc)
         except ValueError:
             return Response({'error': 'Invalid date format.'}, status=status.HTTP_400_BAD_REQUEST)
-        events = Event.objects.filter(
-            Q(created_by__id=user_id) | Q(shared_with__id=user_id),
-            start_time__lte=end_dt,
-            end_time__gte=start_dt
-        ).order_by('start_time')
-        for event in events:
-            if timezone.is_naive(event.start_time):
-                tz = zoneinfo.ZoneInfo(event.event_timezone if event.event_timezone else 'UTC')
-                event.start_time = timezone.make_aware(event.start_time, tz)
-            if timezone.is_naive(event.end_time):
-                tz = zoneinfo.ZoneInfo(event.event_timezone if event.event_timezone else 'UTC')
-                event.end_time = timezone.make_aware(event.end_time, tz)
-        serializer = self.get_serializer(events, many=True)
-        return Response({"data": serializer.data})
+
+        def compute():
+            events = visible_events(
+                user_id,
+                include_groups=False,
+                start_time__lte=end_dt,
+                end_time__gte=start_dt
+            ).order_by('start_time')
+            serializer = self.get_serializer(events, many=True)
+            return {"data": serializer.data}
+
+        payload = CalendarRangeCache.get_or_compute(
+            user_id, 'by_date_range', {'start': start_dt.isoformat(), 'end': end_dt.isoformat()}, compute
+        )
+        return Response(payload)
 
     def get_rrule(self, schedule, dtstart):
         frequency_map = {
@@ -164,11 +172,6 @@ class EventViewSet(viewsets.ModelViewSet):
         user = self.request.user
         start_date_str = self.request.query_params.get('start_date')
         end_date_str = self.request.query_params.get('end_date')
-        queryset = Event.objects.filter(
-            Q(created_by=user) |
-            Q(shared_with=user) |
-            Q(group__members=user)
-        ).distinct()
 
         # If date range is provided, filter accordingly
         if start_date_str and end_date_str:
@@ -186,13 +189,22 @@ class EventViewSet(viewsets.ModelViewSet):
             except ValueError:
                 raise ValidationError("Invalid date format. Use ISO format (YYYY-MM-DD).")
 
-            non_recurring_events = queryset.filter(
-                recurring=False,
-                start_time__lt=end_dt,
-                end_time__gt=start_dt
-            )
+            # With the agenda store on, both queries become a primary-key fetch of its candidates.
+            candidate_ids = AgendaStore.range_ids(user.id, start_dt, end_dt)
+            if candidate_ids is not None:
+                candidates = visible_among(user, candidate_ids)
+                non_recurring_events = candidates.filter(
+                    recurring=False, start_time__lt=end_dt, end_time__gt=start_dt
+                )
+                recurring_events = candidates.filter(recurring=True)
+            else:
+                non_recurring_events = visible_events(
+                    user,
+                    start_time__lt=end_dt,
+                    end_time__gt=start_dt
+                ).filter(recurring=False)
+                recurring_events = visible_events(user).filter(recurring=True)
 
-            recurring_events = queryset.filter(recurring=True)
             recurring_event_instances = []
             for event in recurring_events:
                 schedule = event.recurring_schedule
@@ -228,12 +240,12 @@ class EventViewSet(viewsets.ModelViewSet):
 
         # No date range: show all currently happening or future events
         now = timezone.now()
-        non_recurring_events = queryset.filter(
-            recurring=False,
+        non_recurring_events = visible_events(
+            user,
             end_time__gte=now  # events that haven't ended yet
-        )
+        ).filter(recurring=False)
 
-        recurring_events = queryset.filter(recurring=True)
+        recurring_events = visible_events(user).filter(recurring=True)
         recurring_event_instances = []
         # We'll look up to a certain future horizon, say one year
         future_end = now + timedelta(days=365)
@@ -274,6 +286,29 @@ class EventViewSet(viewsets.ModelViewSet):
         return all_events
 
     def list(self, request, *args, **kwargs):
+        params = request.query_params
+        if params.get('start_date') and params.get('end_date') and request.user.is_authenticated:
+            payload = CalendarRangeCache.get_or_compute(
+                request.user.id, 'list', params.dict(), lambda: self.get_list_payload()
+            )
+            return Response(payload)
+        return Response(self.get_list_payload())
+
+    @classmethod
+    def compute_list_payload(cls, user, params):
+        """
+        Build the list payload for the given query parameters outside a request (cache warming).
+        """
+        http_request = HttpRequest()
+        http_request.method = 'GET'
+        http_request.GET = QueryDict(mutable=True)
+        http_request.GET.update(params)
+        request = Request(http_request)
+        request.user = user
+        view = cls(request=request, args=(), kwargs={}, format_kwarg=None, action='list')
+        return view.get_list_payload()
+
+    def get_list_payload(self):
         queryset = self.get_queryset()
         page = self.paginate_queryset(queryset)
         if page is not None:
@@ -283,19 +318,13 @@ class EventViewSet(viewsets.ModelViewSet):
             paginated_data = paginated_response.data
             if 'results' in paginated_data:
                 paginated_data['data'] = paginated_data.pop('results')
-            return Response(paginated_data)
+            return paginated_data
 
         serializer = self.get_serializer(queryset, many=True)
-        return Response({"data": serializer.data})
+        return {"data": serializer.data}
 
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
-        if timezone.is_naive(instance.start_time):
-            tz = zoneinfo.ZoneInfo(instance.event_timezone if instance.event_timezone else 'UTC')
-            instance.start_time = timezone.make_aware(instance.start_time, tz)
-        if timezone.is_naive(instance.end_time):
-            tz = zoneinfo.ZoneInfo(instance.event_timezone if instance.event_timezone else 'UTC')
-            instance.end_time = timezone.make_aware(instance.end_time, tz)
         serializer = self.get_serializer(instance)
         return Response({"data": serializer.data})
 
@@ -308,8 +337,7 @@ class EventViewSet(viewsets.ModelViewSet):
             user = get_object_or_404(CustomUser, id=user_id)
             now = timezone.now()
             end_date = now + timedelta(days=7)
-            all_events = Event.objects.filter(
-                Q(created_by=user) | Q(shared_with=user),
+            all_events = visible_events(user, include_groups=False).filter(
                 Q(start_time__gte=now, start_time__lte=end_date) |
                 Q(recurring=True, recurrence_end_date__gte=now) |
                 Q(recurring=True, recurrence_end_date__isnull=True)
@@ -343,12 +371,6 @@ class EventViewSet(viewsets.ModelViewSet):
                                 event_timezone=event.event_timezone
                             ))
                 else:
-                    if timezone.is_naive(event.start_time):
-                        tz = zoneinfo.ZoneInfo(event.event_timezone if event.event_timezone else 'UTC')
-                        event.start_time = timezone.make_aware(event.start_time, tz)
-                    if timezone.is_naive(event.end_time):
-                        tz = zoneinfo.ZoneInfo(event.event_timezone if event.event_timezone else 'UTC')
-                        event.end_time = timezone.make_aware(event.end_time, tz)
                     upcoming_events.append(event)
 
             upcoming_events.sort(key=lambda x: x.start_time)
@@ -368,6 +390,59 @@ class EventViewSet(viewsets.ModelViewSet):
             logger.error(f"Error fetching upcoming events: {str(e)}")
             return Response({'error': 'Failed to fetch upcoming events.'}, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['get'])
+    def sync(self, request):
+        """
+        Delta sync for mobile clients. Without a sync_token every visible event is returned, a page
+        at a time; with one, only events changed since it plus ids of events that were deleted or
+        unshared. Keep calling with the returned sync_token while has_more is true.
+        """
+        user = request.user
+        token = request.query_params.get('sync_token')
+        try:
+            limit = min(int(request.query_params.get('limit', settings.EVENT_SYNC_PAGE_SIZE)), settings.EVENT_SYNC_PAGE_SIZE)
+        except ValueError:
+            return Response({'error': 'limit must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({'error': 'limit must be positive.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        after = None
+        if token:
+            try:
+                cursor, after = EventChangeLog.read_token(user, token)
+            except SyncTokenError as e:
+                return Response({'error': str(e), 'full_sync_required': True}, status=status.HTTP_410_GONE)
+        else:
+            # Changes made while the pages are fetched are picked up by the first delta sync.
+            cursor = EventChangeLog.current_cursor()
+            after = 0
+
+        if after is not None:
+            events = list(visible_events(user).filter(id__gt=after).order_by('id')[:limit + 1])
+            has_more = len(events) > limit
+            events = events[:limit]
+            return Response({'data': {
+                'full_sync': True,
+                'events': self.get_serializer(events, many=True).data,
+                'deleted': [],
+                'sync_token': EventChangeLog.make_token(user, cursor, events[-1].id if has_more else None),
+                'has_more': has_more,
+            }})
+
+        actions, next_cursor, has_more = EventChangeLog.changes_since(user, cursor, limit)
+        upserted = [event_id for event_id, action in actions.items() if action == EventChange.UPSERT]
+        events = list(visible_events(user).filter(id__in=upserted).order_by('id'))
+        found = {event.id for event in events}
+        deleted = sorted(event_id for event_id in actions if event_id not in found)
+
+        return Response({'data': {
+            'full_sync': False,
+            'events': self.get_serializer(events, many=True).data,
+            'deleted': deleted,
+            'sync_token': EventChangeLog.make_token(user, next_cursor),
+            'has_more': has_more,
+        }})
+
     @action(detail=False, methods=['post'])
     def export(self, request):
         try:
@@ -387,12 +462,6 @@ class EventViewSet(viewsets.ModelViewSet):
                 writer = csv.writer(response)
                 writer.writerow(['Title', 'Description', 'Start Time', 'End Time'])
                 for event in events:
-                    if timezone.is_naive(event.start_time):
-                        tz = zoneinfo.ZoneInfo(event.event_timezone if event.event_timezone else 'UTC')
-                        event.start_time = timezone.make_aware(event.start_time, tz)
-                    if timezone.is_naive(event.end_time):
-                        tz = zoneinfo.ZoneInfo(event.event_timezone if event.event_timezone else 'UTC')
-                        event.end_time = timezone.make_aware(event.end_time, tz)
                     writer.writerow([event.title, event.description, event.start_time, event.end_time])
                 return response
             else:
@@ -433,14 +502,6 @@ class RecurringScheduleViewSet(viewsets.ModelViewSet):
             recurring_schedule = self.get_object()
             end_date = request.data.get('end_date', recurring_schedule.end_date)
             events = recurring_schedule.generate_events(end_date=end_date)
-            # ensure times are aware
-            for event in events:
-                if timezone.is_naive(event.start_time):
-                    tz = zoneinfo.ZoneInfo(event.event_timezone if event.event_timezone else 'UTC')
-                    event.start_time = timezone.make_aware(event.start_time, tz)
-                if timezone.is_naive(event.end_time):
-                    tz = zoneinfo.ZoneInfo(event.event_timezone if event.event_timezone else 'UTC')
-                    event.end_time = timezone.make_aware(event.end_time, tz)
             serializer = EventSerializer(events, many=True)
             return Response(serializer.data)
         except Exception as e:
@@ -505,14 +566,17 @@ class EventReminderView(APIView):
     def post(self, request, event_id):
         try:
             event = get_object_or_404(Event, id=event_id)
-            if request.user != event.created_by and request.user not in event.shared_with.all():
+            if not PermissionResolver.for_request(request).is_event_owner_or_shared(event):
                 return Response({'error': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
             reminder_time = request.data.get('reminder_time')
             if not reminder_time:
                 return Response({'error': 'Reminder time is required'}, status=status.HTTP_400_BAD_REQUEST)
             reminder_minutes = int(reminder_time)
             reminder_datetime = timezone.now() + timezone.timedelta(minutes=reminder_minutes)
-            send_event_reminder.apply_async((event.id,), eta=reminder_datetime)
+            # Picked up by the reminder dispatcher (see schedules.reminders) when due.
+            EventReminder.objects.create(
+                event=event, reminder_time=event.start_time - reminder_datetime, reminder_type='in_app'
+            )
             return Response({'message': 'Reminder set successfully'}, status=status.HTTP_200_OK)
         except Exception as e:
             logger.error(f"Error setting reminder for event {event_id}: {str(e)}")
@@ -575,8 +639,7 @@ class ConflictCheckView(APIView):
             if timezone.is_naive(end_dt):
                 end_dt = timezone.make_aware(end_dt, timezone.utc)
 
-            conflicts = Event.objects.filter(
-                Q(created_by=request.user) | Q(shared_with=request.user),
+            conflicts = visible_events(request.user, include_groups=False).filter(
                 Q(start_time__lt=end_dt, end_time__gt=start_dt) |
                 Q(start_time__lte=start_dt, end_time__gte=end_dt)
             )
@@ -584,12 +647,6 @@ class ConflictCheckView(APIView):
             if conflicts.exists():
                 conflicting_events = []
                 for event in conflicts:
-                    if timezone.is_naive(event.start_time):
-                        tz = zoneinfo.ZoneInfo(event.event_timezone if event.event_timezone else 'UTC')
-                        event.start_time = timezone.make_aware(event.start_time, tz)
-                    if timezone.is_naive(event.end_time):
-                        tz = zoneinfo.ZoneInfo(event.event_timezone if event.event_timezone else 'UTC')
-                        event.end_time = timezone.make_aware(event.end_time, tz)
                     conflicting_events.append({
                         'id': event.id,
                         'title': event.title,
@@ -1,25 +1,47 @@
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
 from django.utils import timezone
 from rest_framework.views import APIView
 from datetime import datetime
-import zoneinfo
 
 from ..models import Group, CustomUser, Invitation, Availability, Event
-from ..serializers import GroupSerializer, InvitationSerializer, EventSerializer
+from ..serializers import GroupSerializer, GroupListSerializer, InvitationSerializer, EventSerializer, UserSerializer
 from ..group_management import GroupInvitationManager
+from ..permission_resolver import PermissionResolver
+from ..group_directory import PublicGroupDirectory, groups_joined_by, groups_visible_to
 from ..utils import find_common_free_time
+from ..single_flight import SingleFlight
+from ..pagination import CountFreePagination
 
-class GroupPagination(PageNumberPagination):
+class GroupPagination(CountFreePagination):
+    # The groups screen shows the total, so keep it exact (but cached).
+    count_mode = 'cached'
     page_size = 5
     page_size_query_param = 'page_size'
     max_page_size = 100
 
 
+class GroupMemberPagination(CountFreePagination):
+    """
+    Member pages of one group. The total comes from the group's member_count counter, so no
+    page runs a COUNT(*) over the membership table.
+    """
+    count_mode = 'none'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def __init__(self, member_count=None):
+        self.member_count = member_count
+
+    def get_count(self, queryset, seen):
+        if not self.has_next or self.member_count is None:
+            return super().get_count(queryset, seen)
+        return max(self.member_count, seen + 1)
+
+
 class GroupViewSet(viewsets.ModelViewSet):
     queryset = Group.objects.all()
     serializer_class = GroupSerializer
@@ -40,7 +62,15 @@ class GroupViewSet(viewsets.ModelViewSet):
         else:
             user = self.request.user
 
-        return Group.objects.filter(Q(members=user) | Q(is_public=True))
+        queryset = groups_visible_to(user)
+        if self.action == 'list':
+            queryset = queryset.order_by('name', 'id')
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return GroupListSerializer
+        return GroupSerializer
 
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
@@ -60,7 +90,6 @@ class GroupViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         group = serializer.save(admin=self.request.user)
         group.members.add(self.request.user)
-        group.save()
 
     @action(detail=True, methods=['post'])
     def join(self, request, pk=None):
@@ -76,6 +105,17 @@ class GroupViewSet(viewsets.ModelViewSet):
         group.members.remove(request.user)
         return Response({'status': 'Left group'})
 
+    @action(detail=True, methods=['get'])
+    def members(self, request, pk=None):
+        """
+        Paginated member list for a single group.
+        """
+        group = self.get_object()
+        paginator = GroupMemberPagination(member_count=group.member_count)
+        page = paginator.paginate_queryset(group.members.order_by('id'), request, view=self)
+        serializer = UserSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
     @action(detail=True, methods=['post'])
     def invite(self, request, pk=None):
         group = self.get_object()
@@ -107,7 +147,7 @@ class GroupScheduleView(APIView):
 
     def get(self, request, group_id):
         group = get_object_or_404(Group, id=group_id)
-        if request.user not in group.members.all():
+        if not PermissionResolver.for_request(request).is_group_member(group):
             return Response({"error": "Not a member of this group"}, status=status.HTTP_403_FORBIDDEN)
 
         start_date_str = request.query_params.get('start_date')
@@ -127,23 +167,22 @@ class GroupScheduleView(APIView):
         else:
             end_date = start_date + timezone.timedelta(days=30)
 
+        # Members opening the same announcement share one computation.
+        data = SingleFlight.do(
+            'group_schedule', {'group': group.id, 'start': start_date, 'end': end_date},
+            lambda: self.get_schedule_data(group, start_date, end_date)
+        )
+        return Response(data)
+
+    def get_schedule_data(self, group, start_date, end_date):
         events = Event.objects.filter(
             group=group,
             start_time__date__gte=start_date,
             end_time__date__lte=end_date
         ).order_by('start_time')
 
-        # Ensure events have aware datetimes
-        for event in events:
-            if timezone.is_naive(event.start_time):
-                tz = zoneinfo.ZoneInfo(event.event_timezone if event.event_timezone else 'UTC')
-                event.start_time = timezone.make_aware(event.start_time, tz)
-            if timezone.is_naive(event.end_time):
-                tz = zoneinfo.ZoneInfo(event.event_timezone if event.event_timezone else 'UTC')
-                event.end_time = timezone.make_aware(event.end_time, tz)
-
         serializer = EventSerializer(events, many=True)
-        return Response(serializer.data)
+        return serializer.data
 
 
 class GroupAvailabilityView(APIView):
@@ -159,7 +198,7 @@ class GroupAvailabilityView(APIView):
 
     def get(self, request, group_id):
         group = get_object_or_404(Group, id=group_id)
-        if request.user not in group.members.all():
+        if not PermissionResolver.for_request(request).is_group_member(group):
             return Response({"error": "Not a member of this group"}, status=status.HTTP_403_FORBIDDEN)
 
         start_date_str = request.query_params.get('start_date')
@@ -179,20 +218,20 @@ class GroupAvailabilityView(APIView):
         else:
             end_date = start_date + timezone.timedelta(days=30)
 
+        detailed_availability = SingleFlight.do(
+            'group_availability', {'group': group.id, 'start': start_date, 'end': end_date},
+            lambda: self.get_availability_data(group, start_date, end_date)
+        )
+        return Response({'availability': detailed_availability})
+
+    def get_availability_data(self, group, start_date, end_date):
         # For availability queries, we filter by date range as well
         availabilities = Availability.objects.filter(
-            user__in=group.members.all(),
+            user__calendar_groups=group,
             start_time__date__gte=start_date,
             end_time__date__lte=end_date
         )
 
-        # Ensure availabilities have aware datetimes
-        for availability in availabilities:
-            if timezone.is_naive(availability.start_time):
-                availability.start_time = timezone.make_aware(availability.start_time, timezone.utc)
-            if timezone.is_naive(availability.end_time):
-                availability.end_time = timezone.make_aware(availability.end_time, timezone.utc)
-
         detailed_availability = [
             {
                 'user': availability.user.username,
@@ -203,8 +242,7 @@ class GroupAvailabilityView(APIView):
             }
             for availability in availabilities
         ]
-
-        return Response({'availability': detailed_availability})
+        return detailed_availability
 
 
 class GroupMembershipView(APIView):
@@ -223,7 +261,6 @@ class GroupMembershipView(APIView):
             group.members.add(user)
         elif action == 'remove':
             group.members.remove(user)
-        group.save()
         serializer = GroupSerializer(group)
         return Response(serializer.data)
 
@@ -232,16 +269,17 @@ class GroupListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        user_groups = Group.objects.filter(members=request.user)
-        public_groups = Group.objects.filter(is_public=True).exclude(members=request.user)
+        user_groups = groups_joined_by(request.user).order_by('name', 'id')
+        user_groups_data = GroupListSerializer(user_groups, many=True).data
 
-        user_groups_serializer = GroupSerializer(user_groups, many=True)
-        public_groups_serializer = GroupSerializer(public_groups, many=True)
+        # The public directory is shared by every user; only drop the groups already listed above.
+        user_group_ids = {group['id'] for group in user_groups_data}
+        public_groups_data = [group for group in PublicGroupDirectory.get_listing() if group['id'] not in user_group_ids]
 
         return Response({
             'data': {
-                'count': len(user_groups_serializer.data) + len(public_groups_serializer.data),
-                'results': user_groups_serializer.data + public_groups_serializer.data
+                'count': len(user_groups_data) + len(public_groups_data),
+                'results': list(user_groups_data) + public_groups_data
             }
         }, status=status.HTTP_200_OK)
 
@@ -250,10 +288,8 @@ class GroupStatsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, group_id):
-        group = get_object_or_404(Group, id=group_id)
-        members_count = group.members.count()
-        events_count = Event.objects.filter(group=group).count()
-        return Response({'members_count': members_count, 'events_count': events_count})
+        group = get_object_or_404(Group.objects.only('member_count', 'event_count'), id=group_id)
+        return Response({'members_count': group.member_count, 'events_count': group.event_count})
 
 
 class GroupInvitationView(APIView):
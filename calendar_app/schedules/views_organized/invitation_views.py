@@ -10,11 +10,19 @@ import zoneinfo
 
 from ..models import Invitation, Group, CustomUser, Event
 from ..serializers import InvitationSerializer
+from ..pagination import CountFreePagination
+
+
+class InvitationPagination(CountFreePagination):
+    # Only paginates when the client passes page_size, so plain list responses are unchanged.
+    page_size_query_param = 'page_size'
+    max_page_size = 100
 
 class InvitationViewSet(viewsets.ModelViewSet):
     queryset = Invitation.objects.all()
     serializer_class = InvitationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = InvitationPagination
 
     def get_queryset(self):
         return Invitation.objects.filter(Q(sender=self.request.user) | Q(recipient=self.request.user))
@@ -1,15 +1,24 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.http import Http404
 from django.shortcuts import get_object_or_404
-from django.utils import timezone
-import zoneinfo
 
 from ..models import Notification, Event, WorkSchedule
 from ..serializers import NotificationSerializer
 from ..notification_service import NotificationManager
-from ..permissions import IsEventOwnerOrShared
+from ..notification_inbox import NotificationInbox
+
+
+class NotificationPagination(CursorPagination):
+    # Keyset pagination over the (recipient, created_at, id) index. Only paginates when the
+    # client passes page_size, so plain list responses are unchanged.
+    ordering = NotificationInbox.ORDERING
+    page_size = None
+    page_size_query_param = 'page_size'
+    max_page_size = 100
 
 class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     """
@@ -18,21 +27,34 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Notification.objects.all()
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NotificationPagination
 
     def get_queryset(self):
         """
-        Get notifications specific to the current user.
+        Get notifications specific to the current user, newest first. ?unread=true lists unread ones only.
+        """
+        unread_only = self.request.query_params.get('unread') in ('1', 'true')
+        return NotificationInbox.queryset(self.request.user, unread_only=unread_only)
+
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        """
+        Returns the current user's unread notification count.
         """
-        return Notification.objects.filter(recipient=self.request.user)
+        return Response({'unread_count': NotificationInbox.unread_count(request.user.id)}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'])
     def mark_as_read(self, request, pk=None):
         """
         Marks a specific notification as read.
         """
-        notification = self.get_object()
-        notification.is_read = True
-        notification.save()
+        try:
+            pk = int(pk)
+        except (TypeError, ValueError):
+            raise Http404
+        if not NotificationInbox.mark_read(request.user, ids=[pk]):
+            if not Notification.objects.filter(pk=pk, recipient=request.user).exists():
+                raise Http404
         return Response({'status': 'Notification marked as read'}, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['post'])
@@ -40,24 +62,40 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
         """
         Marks all unread notifications for the current user as read.
         """
-        notifications = Notification.objects.filter(recipient=request.user, is_read=False)
-        notifications.update(is_read=True)
+        NotificationInbox.mark_read(request.user)
         return Response({'status': 'All notifications marked as read'}, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['post'])
+    def mark_read(self, request):
+        """
+        Marks the given notifications as read: a list of 'ids', or 'up_to' a notification id to
+        mark it and everything older.
+        """
+        ids = request.data.get('ids')
+        up_to = request.data.get('up_to')
+        try:
+            if ids is not None:
+                ids = [int(notification_id) for notification_id in ids]
+            if up_to is not None:
+                up_to = int(up_to)
+        except (TypeError, ValueError):
+            return Response({'error': "'ids' must be a list of ids and 'up_to' an id."}, status=status.HTTP_400_BAD_REQUEST)
+        if ids is None and up_to is None:
+            return Response({'error': "Provide 'ids' or 'up_to'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        updated = NotificationInbox.mark_read(request.user, ids=ids, up_to=up_to)
+        return Response(
+            {'updated': updated, 'unread_count': NotificationInbox.unread_count(request.user.id)},
+            status=status.HTTP_200_OK
+        )
+
     @action(detail=True, methods=['post'])
     def send_event_notification(self, request, pk=None):
         """
         Sends a notification related to a specific event.
         """
         event = get_object_or_404(Event, pk=pk)
-        # Ensure event times are aware
-        if event.start_time and timezone.is_naive(event.start_time):
-            tz = zoneinfo.ZoneInfo(event.event_timezone if event.event_timezone else 'UTC')
-            event.start_time = timezone.make_aware(event.start_time, tz)
-        if event.end_time and timezone.is_naive(event.end_time):
-            tz = zoneinfo.ZoneInfo(event.event_timezone if event.event_timezone else 'UTC')
-            event.end_time = timezone.make_aware(event.end_time, tz)
-        NotificationManager.send_event_notification(event)
+        NotificationManager(event=event).send_event_notification()
         return Response({'status': 'Event notification sent'}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'])
@@ -65,13 +103,8 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
         """
         Sends a notification when there is a change in the work schedule.
         """
-        schedule = get_object_or_404(WorkSchedule, pk=pk)
-        # Ensure no naive times in WorkSchedule if time fields are involved
-        # (WorkSchedule uses TimeFields which are not naive datetimes, so no conversion needed)
-        # But we can still handle effective_date and end_date as needed if they're used
-        # Typically date fields are date-only, not naive datetimes.
-        
-        NotificationManager.send_schedule_change_notification(schedule)
+        schedule = get_object_or_404(WorkSchedule, pk=pk, user=request.user)
+        NotificationManager(work_schedule=schedule).send_work_schedule_change_notification()
         return Response({'status': 'Schedule change notification sent'}, status=status.HTTP_200_OK)
 
 
@@ -5,12 +5,13 @@ from rest_framework.views import APIView
 from rest_framework.decorators import action
 from django.forms import ValidationError
 from django.utils import timezone
-import zoneinfo
-from django.db.models import Q
 
 from ..permissions import IsEventOwnerOrShared
 from ..models import RecurringSchedule, WorkSchedule, Availability, Event
 from ..serializers import EventSerializer, RecurringScheduleSerializer, WorkScheduleSerializer, AvailabilitySerializer
+from ..event_access import visible_events
+from ..profile_cache import ProfileCache
+from ..single_flight import SingleFlight
 
 def find_common_free_time(user_events, start_date, end_date):
     """
@@ -24,13 +25,6 @@ def find_common_free_time(user_events, start_date, end_date):
     free_time_slots = []
     for user_id, events in user_events.items():
         for event in events:
-            # Ensure event times are aware
-            if event.start_time and timezone.is_naive(event.start_time):
-                tz = zoneinfo.ZoneInfo(event.event_timezone if event.event_timezone else 'UTC')
-                event.start_time = timezone.make_aware(event.start_time, tz)
-            if event.end_time and timezone.is_naive(event.end_time):
-                tz = zoneinfo.ZoneInfo(event.event_timezone if event.event_timezone else 'UTC')
-                event.end_time = timezone.make_aware(event.end_time, tz)
             busy_slot = (event.start_time, event.end_time)
             free_time_slots.append(busy_slot)
 
@@ -115,20 +109,13 @@ class UserAvailabilityView(APIView):
         else:
             end_date = start_date + timezone.timedelta(days=7)
 
-        events = request.user.event_set.filter(
+        events = visible_events(
+            request.user,
+            include_groups=False,
             start_time__date__gte=start_date,
             end_time__date__lte=end_date
         )
 
-        # Ensure event times are aware
-        for event in events:
-            if timezone.is_naive(event.start_time):
-                tz = zoneinfo.ZoneInfo(event.event_timezone if event.event_timezone else 'UTC')
-                event.start_time = timezone.make_aware(event.start_time, tz)
-            if timezone.is_naive(event.end_time):
-                tz = zoneinfo.ZoneInfo(event.event_timezone if event.event_timezone else 'UTC')
-                event.end_time = timezone.make_aware(event.end_time, tz)
-
         work_schedules = WorkSchedule.objects.filter(
             user=request.user,
             day_of_week__in=[d.weekday() for d in [start_date + timezone.timedelta(days=i) for i in range((end_date - start_date).days + 1)]]
@@ -200,12 +187,20 @@ class FreeBusyView(APIView):
         except ValueError:
             return Response({'error': 'Invalid date format, must be ISO 8601.'}, status=status.HTTP_400_BAD_REQUEST)
 
+        formatted_free_time = SingleFlight.do(
+            'free_busy_formatted', {'users': sorted(set(map(str, user_ids))), 'start': start_date, 'end': end_date},
+            lambda: self.get_free_time(user_ids, start_date, end_date)
+        )
+        return Response({'free_time': formatted_free_time})
+
+    def get_free_time(self, user_ids, start_date, end_date):
         user_events = {}
         for user_id in user_ids:
             # Assuming you want the events of the specified user_id, not just the request user's events.
             # If it's intended to fetch the request user's events only, remove user_id filtering.
-            events = Event.objects.filter(
-                Q(created_by_id=user_id) | Q(shared_with__id=user_id),
+            events = visible_events(
+                user_id,
+                include_groups=False,
                 start_time__lt=end_date,
                 end_time__gt=start_date
             )
@@ -213,13 +208,12 @@ class FreeBusyView(APIView):
 
         common_free_time = find_common_free_time(user_events, start_date, end_date)
         # Convert free times to isoformat for response
-        formatted_free_time = [
+        return [
             {
                 "start": ft[0].isoformat(),
                 "end": ft[1].isoformat()
             } for ft in common_free_time
         ]
-        return Response({'free_time': formatted_free_time})
 
 
 class RecurringScheduleViewSet(viewsets.ModelViewSet):
@@ -253,7 +247,7 @@ class RecurringScheduleViewSet(viewsets.ModelViewSet):
             },
             'color': schedule.color,
             'recurring_schedule': schedule,
-            'event_timezone': request.user.userprofile.timezone if request.user.userprofile else 'UTC'
+            'event_timezone': ProfileCache.timezone_name(request.user)
         }
         Event.objects.create(**event_data)
 
@@ -279,14 +273,5 @@ class RecurringScheduleViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Invalid date format'}, status=status.HTTP_400_BAD_REQUEST)
 
         events = recurring_schedule.generate_events(end_date=end_date)
-        # Ensure events are aware
-        for event in events:
-            if timezone.is_naive(event.start_time):
-                tz = zoneinfo.ZoneInfo(event.event_timezone if event.event_timezone else 'UTC')
-                event.start_time = timezone.make_aware(event.start_time, tz)
-            if timezone.is_naive(event.end_time):
-                tz = zoneinfo.ZoneInfo(event.event_timezone if event.event_timezone else 'UTC')
-                event.end_time = timezone.make_aware(event.end_time, tz)
-
         serializer = EventSerializer(events, many=True)
         return Response(serializer.data)
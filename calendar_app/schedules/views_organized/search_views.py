@@ -4,8 +4,9 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
 from django.db.models import Q
 
-from ..models import Event, Group, CustomUser
+from ..models import Group, CustomUser
 from ..serializers import EventSerializer, GroupSerializer, UserSerializer
+from ..event_access import visible_events
 
 
 class SearchView(APIView):
@@ -21,10 +22,9 @@ class SearchView(APIView):
         if not query:
             return Response({"error": "Search query is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        events = Event.objects.filter(
-            (Q(title__icontains=query) | Q(description__icontains=query)) &
-            (Q(created_by=request.user) | Q(shared_with=request.user))
-        ).distinct()
+        events = visible_events(request.user, include_groups=False).filter(
+            Q(title__icontains=query) | Q(description__icontains=query)
+        )
 
         groups = Group.objects.filter(
             (Q(name__icontains=query) | Q(description__icontains=query)) &
@@ -1,12 +1,10 @@
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.utils import timezone
-from django.db.models import Q
-import zoneinfo
 
-from ..models import Tag, Event, Group, UserProfile
-from ..serializers import TagSerializer, EventSerializer, GroupSerializer, UserProfileSerializer
+from ..models import Tag, UserProfile
+from ..serializers import TagSerializer, UserProfileSerializer
+from ..dashboard import DashboardSummary
 
 
 class TagViewSet(viewsets.ModelViewSet):
@@ -32,37 +30,13 @@ class TagViewSet(viewsets.ModelViewSet):
 class DashboardView(APIView):
     """
     API view for the user dashboard.
-    Provides a summary of upcoming events, recent groups, 
-    as well as counts of events and groups for the requesting user.
+    Provides a summary of upcoming events (including the next occurrence of recurring series),
+    recent groups, as well as counts of events and groups for the requesting user.
     """
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        now = timezone.now()
-        # Get upcoming events (either created by or shared with the user)
-        upcoming_events = Event.objects.filter(
-            Q(created_by=request.user) | Q(shared_with=request.user),
-            start_time__gte=now
-        ).order_by('start_time')[:5]
-
-        # Ensure event times are aware
-        for event in upcoming_events:
-            if event.start_time and timezone.is_naive(event.start_time):
-                tz = zoneinfo.ZoneInfo(event.event_timezone if event.event_timezone else 'UTC')
-                event.start_time = timezone.make_aware(event.start_time, tz)
-            if event.end_time and timezone.is_naive(event.end_time):
-                tz = zoneinfo.ZoneInfo(event.event_timezone if event.event_timezone else 'UTC')
-                event.end_time = timezone.make_aware(event.end_time, tz)
-
-        # Get recent groups the user is a member of
-        recent_groups = Group.objects.filter(members=request.user).order_by('-created_at')[:5]
-
-        return Response({
-            "upcoming_events": EventSerializer(upcoming_events, many=True).data,
-            "recent_groups": GroupSerializer(recent_groups, many=True).data,
-            "event_count": Event.objects.filter(created_by=request.user).count(),
-            "group_count": Group.objects.filter(members=request.user).count(),
-        }, status=status.HTTP_200_OK)
+        return Response(DashboardSummary.get(request.user), status=status.HTTP_200_OK)
 
 
 class SettingsView(APIView):
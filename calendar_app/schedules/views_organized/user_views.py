@@ -9,13 +9,13 @@ from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 from rest_framework.permissions import IsAuthenticated
 from django.utils.functional import Promise
-from django.utils import timezone
-import zoneinfo
 
 from ..models import UserDeviceToken, UserProfile, CustomUser, Event
 from ..serializers import EventSerializer, UserDeviceTokenSerializer, UserProfileSerializer, UserSerializer
 from ..user_preferences import UserPreferencesManager
 from ..eta_service import ETACalculator
+from ..permission_resolver import PermissionResolver
+from ..counters import CounterCache
 
 class UserProfileViewSet(viewsets.ModelViewSet):
     """
@@ -85,11 +85,10 @@ class UserStatsView(APIView):
         """
         Get user-specific stats like number of events and groups.
         """
-        events_count = request.user.event_set.count()
-        groups_count = request.user.group_set.count()
+        counts = CounterCache.get_user_counts(request.user)
         return Response({
-            'events_count': events_count,
-            'groups_count': groups_count
+            'events_count': counts['event_count'],
+            'groups_count': counts['group_count']
         }, status=status.HTTP_200_OK)
 
 
@@ -154,10 +153,10 @@ class UserDeviceTokenViewSet(viewsets.ModelViewSet):
         device_type = request.data.get('device_type')
         if not token or not device_type:
             return Response({'error': 'Token and device type are required'}, status=status.HTTP_400_BAD_REQUEST)
+        # Keyed by the token: re-registering reactivates it, and a device that changed hands moves to its new user.
         device, created = UserDeviceToken.objects.update_or_create(
-            user=request.user,
-            device_type=device_type,
-            defaults={'token': token, 'is_active': True}
+            token=token,
+            defaults={'user': request.user, 'device_type': device_type, 'is_active': True}
         )
         serializer = self.get_serializer(device)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -169,17 +168,9 @@ class ETAUpdateView(APIView):
     def post(self, request, event_id):
         event = get_object_or_404(Event, id=event_id)
 
-        if request.user not in event.shared_with.all() and request.user != event.created_by:
+        if not PermissionResolver.for_request(request).is_event_owner_or_shared(event):
             return Response({"error": "Not authorized to update ETA for this event"}, status=status.HTTP_403_FORBIDDEN)
 
-        # Ensure event times are aware
-        if event.start_time and timezone.is_naive(event.start_time):
-            tz = zoneinfo.ZoneInfo(event.event_timezone if event.event_timezone else 'UTC')
-            event.start_time = timezone.make_aware(event.start_time, tz)
-        if event.end_time and timezone.is_naive(event.end_time):
-            tz = zoneinfo.ZoneInfo(event.event_timezone if event.event_timezone else 'UTC')
-            event.end_time = timezone.make_aware(event.end_time, tz)
-
         ETACalculator.calculate_and_update_eta(event)
         serializer = EventSerializer(event)
         self.send_real_time_update(event)
@@ -190,11 +181,6 @@ class ETAUpdateView(APIView):
         """
         Broadcast the updated ETA to all users connected to the event's WebSocket channel.
         """
-        if event.eta and timezone.is_naive(event.eta):
-            tz = zoneinfo.ZoneInfo(event.event_timezone if event.event_timezone else 'UTC')
-            event.eta = timezone.make_aware(event.eta, tz)
-            event.save()
-
         channel_layer = get_channel_layer()
         group_name = f'event_{event.id}'
 
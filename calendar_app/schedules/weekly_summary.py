@@ -0,0 +1,190 @@
+import logging
+from datetime import datetime, time, timedelta
+from itertools import groupby, islice
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Event, EventAccess, UserProfile, WeeklySummaryPartition
+from .db_router import use_primary
+from .email_delivery import EmailDispatcher
+from .recurrence import occurrences_between
+
+logger = logging.getLogger(__name__)
+
+SUBJECT = "Your Weekly Event Summary"
+
+
+class WeeklySummary:
+    """
+    Weekly summary emails of each recipient's events from today through the same weekday next week.
+    Recipients (users with email notifications on and an address) are split by id into partitions of
+    WEEKLY_SUMMARY_PARTITION_SIZE, recorded as WeeklySummaryPartition rows and sent by parallel
+    subtasks. Each subtask streams its recipients' events in one query over EventAccess, ordered by
+    recipient, expands recurring series into the week's occurrences, sends EMAIL_BATCH_SIZE emails per
+    connection and checkpoints after every batch. Starting the same week again only resumes the
+    partitions that have not completed.
+    """
+
+    @staticmethod
+    def window(today=None):
+        today = today or timezone.localdate()
+        start = timezone.make_aware(datetime.combine(today, time.min))
+        return start, start + timedelta(days=8)
+
+    @staticmethod
+    def start(today=None):
+        """
+        Plan the week's partitions and hand each unfinished one to a subtask. If the broker is
+        unreachable a partition is sent right away instead. Returns how many were dispatched.
+        """
+        # Imported here because tasks imports this module.
+        from .tasks import send_weekly_summary_partition
+
+        week_start = today or timezone.localdate()
+        partition_ids = WeeklySummary.plan(week_start)
+        for partition_id in partition_ids:
+            try:
+                send_weekly_summary_partition.delay(partition_id)
+            except Exception as e:
+                logger.warning(f"Could not enqueue weekly summary partition {partition_id}, sending it now: {e}")
+                WeeklySummary.send_partition(partition_id)
+        logger.info(f"Dispatched {len(partition_ids)} weekly summary partitions for {week_start}.")
+        return len(partition_ids)
+
+    @staticmethod
+    def plan(week_start):
+        """
+        Ids of the week's unfinished partitions, creating them on the first call for the week.
+        """
+        with use_primary():
+            existing = WeeklySummaryPartition.objects.filter(week_start=week_start)
+            if not existing.exists():
+                WeeklySummaryPartition.objects.bulk_create(
+                    [
+                        WeeklySummaryPartition(week_start=week_start, first_user_id=first, last_user_id=last)
+                        for first, last in WeeklySummary._partition_bounds()
+                    ],
+                    batch_size=1000, ignore_conflicts=True
+                )
+            return list(
+                existing.filter(completed_at__isnull=True).order_by('first_user_id').values_list('id', flat=True)
+            )
+
+    @staticmethod
+    def _partition_bounds():
+        size = settings.WEEKLY_SUMMARY_PARTITION_SIZE
+        user_ids = (
+            UserProfile.objects.filter(email_notifications=True).exclude(user__email='')
+            .order_by('user_id').values_list('user_id', flat=True).iterator(chunk_size=size)
+        )
+        while True:
+            chunk = list(islice(user_ids, size))
+            if not chunk:
+                break
+            yield chunk[0], chunk[-1]
+
+    @staticmethod
+    def send_partition(partition_id):
+        """
+        Send one partition's summaries, resuming after its checkpoint. Returns how many were sent,
+        or 0 if the partition is done or another worker holds its lease.
+        """
+        partition = WeeklySummary._claim(partition_id)
+        if partition is None:
+            return 0
+
+        start, end = WeeklySummary.window(partition.week_start)
+        sent = 0
+        for batch in WeeklySummary._batches(WeeklySummary._events_by_recipient(partition, start, end)):
+            messages = WeeklySummary._messages(batch, start, end)
+            batch_sent = EmailDispatcher.send_batch(messages) if messages else 0
+            sent += batch_sent
+            WeeklySummary._checkpoint(partition, batch[-1][0], batch_sent)
+
+        now = timezone.now()
+        WeeklySummaryPartition.objects.filter(id=partition.id).update(completed_at=now, leased_until=None)
+        logger.info(f"Sent {sent} weekly summaries for users {partition.first_user_id}-{partition.last_user_id}.")
+        return sent
+
+    @staticmethod
+    def _claim(partition_id):
+        now = timezone.now()
+        claimed = WeeklySummaryPartition.objects.filter(
+            Q(leased_until__isnull=True) | Q(leased_until__lt=now), id=partition_id, completed_at__isnull=True
+        ).update(leased_until=now + timedelta(seconds=settings.WEEKLY_SUMMARY_LEASE_SECONDS))
+        if not claimed:
+            return None
+        with use_primary():
+            return WeeklySummaryPartition.objects.get(id=partition_id)
+
+    @staticmethod
+    def _checkpoint(partition, user_id, sent):
+        partition.checkpoint_user_id = user_id
+        partition.sent_count += sent
+        partition.leased_until = timezone.now() + timedelta(seconds=settings.WEEKLY_SUMMARY_LEASE_SECONDS)
+        partition.save(update_fields=['checkpoint_user_id', 'sent_count', 'leased_until'])
+
+    @staticmethod
+    def _events_by_recipient(partition, start, end):
+        """
+        (user_id, email, [(event_id, title, start_time, recurring)]) for each recipient in the
+        partition past its checkpoint with events in [start, end) that they created or that were
+        shared with them, from one streamed query. EventAccess has one row per user and event, so
+        nothing is listed twice.
+        """
+        first_user_id = partition.first_user_id
+        if partition.checkpoint_user_id is not None:
+            first_user_id = max(first_user_id, partition.checkpoint_user_id + 1)
+
+        rows = EventAccess.objects.filter(
+            direct=True, user__userprofile__email_notifications=True
+        ).exclude(user__email='').filter(
+            Q(start_time__gte=start, start_time__lt=end)
+            | Q(start_time__lt=start, event__recurring=True)
+            & (Q(event__recurrence_end_date__isnull=True) | Q(event__recurrence_end_date__gte=start)),
+            user_id__gte=first_user_id, user_id__lte=partition.last_user_id,
+        ).order_by('user_id', 'start_time', 'event_id').values_list(
+            'user_id', 'user__email', 'event_id', 'event__title', 'start_time', 'event__recurring'
+        ).iterator(chunk_size=2000)
+
+        for (user_id, email), events in groupby(rows, key=lambda row: row[:2]):
+            yield user_id, email, [row[2:] for row in events]
+
+    @staticmethod
+    def _batches(recipients):
+        while True:
+            batch = list(islice(recipients, settings.EMAIL_BATCH_SIZE))
+            if not batch:
+                break
+            yield batch
+
+    @staticmethod
+    def _messages(batch, start, end):
+        """
+        Summary emails for a batch of recipients. Recurring series are loaded once per batch and
+        listed by their occurrences in the window.
+        """
+        series_ids = {event_id for _, _, events in batch for event_id, _, _, recurring in events if recurring}
+        series = {}
+        if series_ids:
+            series = Event.objects.filter(id__in=series_ids).select_related('recurring_schedule').only(
+                'id', 'start_time', 'event_timezone', 'recurrence_rule', 'recurrence_end_date', 'recurring_schedule'
+            ).in_bulk()
+
+        messages = []
+        for _, email, events in batch:
+            upcoming = []
+            for event_id, title, start_time, recurring in events:
+                occurrences = occurrences_between(series[event_id], start, end) if event_id in series else []
+                if occurrences:
+                    upcoming.extend((occurrence, title) for occurrence in occurrences)
+                elif start <= start_time < end:
+                    upcoming.append((start_time, title))
+            if not upcoming:
+                continue
+            upcoming.sort(key=lambda occurrence: occurrence[0])
+            event_list = "\n".join(f"- {title} on {when.strftime('%Y-%m-%d %H:%M')}" for when, title in upcoming)
+            body = f"Here are your upcoming events for the next week:\n\n{event_list}"
+            messages.append(EmailDispatcher.message(SUBJECT, body, email))
+        return messages